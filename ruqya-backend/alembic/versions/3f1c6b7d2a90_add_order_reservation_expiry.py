@@ -0,0 +1,31 @@
+"""Add order reservation expiry
+
+Revision ID: 3f1c6b7d2a90
+Revises: 477b2a98ec15
+Create Date: 2026-10-19 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c6b7d2a90'
+down_revision: Union[str, Sequence[str], None] = '477b2a98ec15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing pending orders keep their stock until an admin cancels them
+    op.add_column('orders', sa.Column('reserved_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_orders_reserved_until'), 'orders', ['reserved_until'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orders_reserved_until'), table_name='orders')
+    op.drop_column('orders', 'reserved_until')
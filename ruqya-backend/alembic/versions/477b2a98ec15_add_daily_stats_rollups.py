@@ -0,0 +1,42 @@
+"""Add daily_stats rollups
+
+Revision ID: 477b2a98ec15
+Revises: 85d89459880d
+Create Date: 2026-10-19 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '477b2a98ec15'
+down_revision: Union[str, Sequence[str], None] = '85d89459880d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # History is backfilled by the compaction task on first application start
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('revenue', sa.Float(), server_default='0', nullable=False),
+    sa.Column('order_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('cancelled_orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('appointments_pending', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('appointments_confirmed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('appointments_completed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('appointments_cancelled', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('new_users', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('chat_sessions', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_stats')
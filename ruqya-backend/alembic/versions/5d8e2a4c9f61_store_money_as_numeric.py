@@ -0,0 +1,46 @@
+"""Store money as numeric
+
+Revision ID: 5d8e2a4c9f61
+Revises: c7a0e5f38b16
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2a4c9f61'
+down_revision: Union[str, Sequence[str], None] = 'c7a0e5f38b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONEY_COLUMNS = [
+    ('products', 'price', 12),
+    ('services', 'price', 12),
+    ('orders', 'total_amount', 12),
+    ('order_items', 'price', 12),
+    ('daily_stats', 'revenue', 14),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, precision in MONEY_COLUMNS:
+        op.alter_column(table, column,
+                   existing_type=sa.Float(),
+                   type_=sa.Numeric(precision, 2),
+                   existing_nullable=False,
+                   postgresql_using=f'round({column}::numeric, 2)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, precision in reversed(MONEY_COLUMNS):
+        op.alter_column(table, column,
+                   existing_type=sa.Numeric(precision, 2),
+                   type_=sa.Float(),
+                   existing_nullable=False)
@@ -0,0 +1,39 @@
+"""Add login throttles
+
+Revision ID: 6c3e8a1f5d92
+Revises: 2a6f9d3e1b47
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3e8a1f5d92'
+down_revision: Union[str, Sequence[str], None] = '2a6f9d3e1b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('login_throttles',
+    sa.Column('key', sa.String(length=320), nullable=False),
+    sa.Column('window_index', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('previous_attempts', sa.Integer(), nullable=False),
+    sa.Column('failures', sa.Integer(), nullable=False),
+    sa.Column('last_failure_at', sa.Float(), nullable=False),
+    sa.Column('blocked_until', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_login_throttles_window_index'), 'login_throttles', ['window_index'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_login_throttles_window_index'), table_name='login_throttles')
+    op.drop_table('login_throttles')
@@ -0,0 +1,30 @@
+"""Add dashboard indexes
+
+Revision ID: 85d89459880d
+Revises: ca9402ca9ba8
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '85d89459880d'
+down_revision: Union[str, Sequence[str], None] = 'ca9402ca9ba8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_created_at_status', 'orders', ['created_at', 'status'], unique=False)
+    op.create_index(op.f('ix_appointments_status'), 'appointments', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_appointments_status'), table_name='appointments')
+    op.drop_index('ix_orders_created_at_status', table_name='orders')
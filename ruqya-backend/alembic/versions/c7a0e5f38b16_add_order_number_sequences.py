@@ -0,0 +1,33 @@
+"""Add order_number_sequences
+
+Revision ID: c7a0e5f38b16
+Revises: 9b2e4d1f7c35
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a0e5f38b16'
+down_revision: Union[str, Sequence[str], None] = '9b2e4d1f7c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing ORD-XXXXXXXX-XXXX numbers cannot clash with the dated format
+    op.create_table('order_number_sequences',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_number_sequences')
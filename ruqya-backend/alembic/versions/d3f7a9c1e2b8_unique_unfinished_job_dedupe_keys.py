@@ -0,0 +1,43 @@
+"""Unique unfinished job dedupe keys
+
+Revision ID: d3f7a9c1e2b8
+Revises: 8e1d4b7a2c56
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7a9c1e2b8'
+down_revision: Union[str, Sequence[str], None] = '8e1d4b7a2c56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNFINISHED = sa.text("status IN ('QUEUED', 'RUNNING')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Drop queued duplicates left by earlier races, keeping a running one or the first queued
+    op.execute("""
+        DELETE FROM jobs
+        WHERE status = 'QUEUED' AND dedupe_key IS NOT NULL AND EXISTS (
+            SELECT 1 FROM jobs AS other
+            WHERE other.dedupe_key = jobs.dedupe_key
+              AND other.id <> jobs.id
+              AND (other.status = 'RUNNING' OR (other.status = 'QUEUED' AND other.id < jobs.id))
+        )
+    """)
+    op.create_index(
+        'uq_jobs_dedupe_key_unfinished', 'jobs', ['dedupe_key'], unique=True,
+        postgresql_where=UNFINISHED, sqlite_where=UNFINISHED
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_jobs_dedupe_key_unfinished', table_name='jobs')
@@ -0,0 +1,42 @@
+"""Add appointment end time and overlap guard
+
+Revision ID: e4b9c2d7a813
+Revises: 5d8e2a4c9f61
+Create Date: 2026-10-19 18:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c2d7a813'
+down_revision: Union[str, Sequence[str], None] = '5d8e2a4c9f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('appointments', sa.Column('ends_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE appointments SET ends_at = appointments.appointment_date + services.duration * interval '1 minute' "
+        "FROM services WHERE services.id = appointments.service_id"
+    )
+    op.alter_column('appointments', 'ends_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index('ix_appointments_date_status', 'appointments', ['appointment_date', 'status'], unique=False)
+    # Fails if existing pending/confirmed bookings overlap; cancel or move them first
+    op.execute(
+        "ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap "
+        "EXCLUDE USING gist (tstzrange(appointment_date, ends_at) WITH &&) "
+        "WHERE (status IN ('PENDING', 'CONFIRMED'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE appointments DROP CONSTRAINT appointments_no_overlap")
+    op.drop_index('ix_appointments_date_status', table_name='appointments')
+    op.drop_column('appointments', 'ends_at')
@@ -1,100 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import date
 from typing import Optional
+import logging
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User, UserRole
-from app.models.order import Order, OrderStatus
-from app.models.appointment import Appointment, AppointmentStatus
-from app.models.product import Product
-from app.models.article import Article
-from app.models.chat import ChatSession, ChatMessage, ChatStatus
-from app.schemas.admin import DashboardStats, RevenueStats, AdminUserListResponse
+from app.schemas.admin import (
+    DashboardStats,
+    AnalyticsPoint,
+    AnalyticsSeriesResponse,
+    AdminUserListResponse,
+    EmailMetrics,
+    LoginThrottleMetrics,
+    ProfileInfo,
+    ProfileListResponse,
+    ProfileStartResponse,
+)
 from app.schemas.user import UserResponse, UserUpdateAdmin
-from app.core.security import get_current_admin_user
+from app.core.security import get_current_admin_user, verify_websocket_token
+from app.core.dashboard import build_dashboard_stats, dashboard_cache
+from app.core.principals import Principal, principal_cache
+from app.core.throttling import login_throttle
+from app.core.profiler import profiler, list_profiles, read_profile
+from app.core import mailer, rollups
+from app.core.responses import json_response
+
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+MAX_ANALYTICS_DAYS = 1100
+
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get dashboard statistics (Admin only)."""
-    # Count totals
-    total_users = db.query(User).count()
-    total_appointments = db.query(Appointment).count()
-    total_orders = db.query(Order).count()
-    total_products = db.query(Product).count()
-    total_articles = db.query(Article).count()
-    
-    # Count pending/active items
-    pending_appointments = db.query(Appointment).filter(
-        Appointment.status == AppointmentStatus.PENDING
-    ).count()
-    
-    active_chats = db.query(ChatSession).filter(
-        ChatSession.status == ChatStatus.ACTIVE
-    ).count()
-    
-    # Get recent orders (last 5)
-    from app.schemas.order import OrderSummaryResponse
-    recent_orders = db.query(Order).order_by(
-        Order.created_at.desc()
-    ).limit(5).all()
-    
-    # Get recent appointments (last 5)
-    from app.schemas.appointment import AppointmentResponse
-    recent_appointments = db.query(Appointment).order_by(
-        Appointment.created_at.desc()
-    ).limit(5).all()
-    
-    # Calculate revenue
-    now = datetime.utcnow()
-    today_start = datetime(now.year, now.month, now.day)
-    week_start = now - timedelta(days=now.weekday())
-    month_start = datetime(now.year, now.month, 1)
-    year_start = datetime(now.year, 1, 1)
-    
-    revenue_today = db.query(func.sum(Order.total_amount)).filter(
-        Order.created_at >= today_start,
-        Order.status != OrderStatus.CANCELLED
-    ).scalar() or 0.0
-    
-    revenue_week = db.query(func.sum(Order.total_amount)).filter(
-        Order.created_at >= week_start,
-        Order.status != OrderStatus.CANCELLED
-    ).scalar() or 0.0
-    
-    revenue_month = db.query(func.sum(Order.total_amount)).filter(
-        Order.created_at >= month_start,
-        Order.status != OrderStatus.CANCELLED
-    ).scalar() or 0.0
-    
-    revenue_year = db.query(func.sum(Order.total_amount)).filter(
-        Order.created_at >= year_start,
-        Order.status != OrderStatus.CANCELLED
-    ).scalar() or 0.0
-    
-    return DashboardStats(
-        total_users=total_users,
-        total_appointments=total_appointments,
-        total_orders=total_orders,
-        total_products=total_products,
-        total_articles=total_articles,
-        pending_appointments=pending_appointments,
-        active_chats=active_chats,
-        recent_orders=[OrderSummaryResponse.model_validate(o) for o in recent_orders],
-        recent_appointments=[AppointmentResponse.model_validate(a) for a in recent_appointments],
-        revenue=RevenueStats(
-            today=revenue_today,
-            this_week=revenue_week,
-            this_month=revenue_month,
-            this_year=revenue_year
+    if not settings.DASHBOARD_CACHE_ENABLED:
+        return build_dashboard_stats(db)
+    
+    return await dashboard_cache.get()
+
+
+@router.websocket("/dashboard/ws")
+async def dashboard_websocket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    db: Session = Depends(get_db)
+):
+    """Push dashboard updates to admins (snapshot on connect, then deltas)."""
+    user = await verify_websocket_token(token, db)
+    if not user or user.role != UserRole.ADMIN:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    try:
+        await dashboard_cache.subscribe(websocket)
+        # Nothing is expected from the client; wait for it to disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(
+            "Dashboard WebSocket error: %s", e,
+            exc_info=e, extra={"sample_key": "admin.dashboard_websocket_error"}
+        )
+    finally:
+        dashboard_cache.unsubscribe(websocket)
+
+
+@router.get("/email/metrics", response_model=EmailMetrics)
+async def get_email_metrics(current_user: Principal = Depends(get_current_admin_user)):
+    """Get delivery counters for emails sent by this process (Admin only)."""
+    return EmailMetrics(**mailer.get_mailer().metrics())
+
+
+@router.get("/auth/throttle/metrics", response_model=LoginThrottleMetrics)
+async def get_login_throttle_metrics(current_user: Principal = Depends(get_current_admin_user)):
+    """Get login throttling counters for this process (Admin only)."""
+    return LoginThrottleMetrics(**login_throttle.metrics())
+
+
+@router.post("/profiler", response_model=ProfileStartResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_profiler(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Sample the worker handling this request for ``seconds`` (Admin only)."""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiler is disabled"
+        )
+    
+    profile_id = profiler.run_for(seconds)
+    if profile_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This worker is already being profiled"
+        )
+    
+    return ProfileStartResponse(id=profile_id, seconds=seconds)
+
+
+@router.get("/profiles", response_model=ProfileListResponse)
+async def get_profiles(current_user: Principal = Depends(get_current_admin_user)):
+    """List saved profiles, newest first (Admin only)."""
+    return ProfileListResponse(items=[ProfileInfo(**info) for info in list_profiles()])
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, current_user: Principal = Depends(get_current_admin_user)):
+    """Download a profile as folded stacks for flamegraph.pl or speedscope (Admin only)."""
+    folded = read_profile(profile_id)
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    
+    return PlainTextResponse(folded)
+
+
+@router.get("/analytics", response_model=AnalyticsSeriesResponse)
+async def get_analytics(
+    start: date,
+    end: date,
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Get revenue and activity time series from the daily rollups (Admin only)."""
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
         )
+    
+    if (end - start).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range cannot exceed {MAX_ANALYTICS_DAYS} days"
+        )
+    
+    points = [AnalyticsPoint(**point) for point in rollups.get_series(db, start, end, interval)]
+    totals = AnalyticsPoint(
+        period_start=start,
+        **{
+            column: sum(getattr(point, column) for point in points)
+            for column in rollups.COUNTER_COLUMNS
+        }
+    )
+    
+    return AnalyticsSeriesResponse(
+        start=start,
+        end=end,
+        interval=interval,
+        totals=totals,
+        points=points
     )
 
 
@@ -105,7 +175,7 @@ async def get_all_users(
     role: Optional[UserRole] = None,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get all users with filtering (Admin only)."""
     query = db.query(User)
@@ -119,10 +189,7 @@ async def get_all_users(
     total = query.count()
     users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
     
-    return AdminUserListResponse(
-        total=total,
-        items=[UserResponse.model_validate(u) for u in users]
-    )
+    return json_response(AdminUserListResponse, {"total": total, "items": users})
 
 
 @router.patch("/users/{user_id}", response_model=UserResponse)
@@ -130,7 +197,7 @@ async def update_user_admin(
     user_id: str,
     user_data: UserUpdateAdmin,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update user role or status (Admin only)."""
     user = db.query(User).filter(User.id == user_id).first()
@@ -154,6 +221,7 @@ async def update_user_admin(
         setattr(user, field, value)
     
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     
     return UserResponse.model_validate(user)
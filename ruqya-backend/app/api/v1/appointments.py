@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
+from datetime import date, timedelta
+import calendar
 import uuid
 
 from app.database import get_db
 from app.models.appointment import Appointment, AppointmentStatus
-from app.models.user import User
+from app.models.service import Service
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
@@ -13,8 +15,16 @@ from app.schemas.appointment import (
     AppointmentDetailResponse,
     AppointmentListResponse,
     AppointmentStatusUpdate,
+    AvailabilityDay,
+    AvailabilityResponse,
+    AvailabilityMonthDay,
+    AvailabilityMonthResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_user, get_current_admin_user
+from app.core import availability, idempotency, notifications, rollups
+from app.core.responses import json_response
+from app.config import settings
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
@@ -26,7 +36,7 @@ async def get_appointments(
     status: Optional[AppointmentStatus] = None,
     user_id: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get appointments. Admin sees all, users see only their own."""
     query = db.query(Appointment)
@@ -43,11 +53,78 @@ async def get_appointments(
         query = query.filter(Appointment.status == status)
     
     total = query.count()
-    appointments = query.order_by(Appointment.appointment_date.desc()).offset(skip).limit(limit).all()
+    appointments = query.options(
+        joinedload(Appointment.user),
+        joinedload(Appointment.service)
+    ).order_by(Appointment.appointment_date.desc()).offset(skip).limit(limit).all()
     
-    return AppointmentListResponse(
-        total=total,
-        items=[AppointmentDetailResponse.model_validate(a) for a in appointments]
+    return json_response(AppointmentListResponse, {"total": total, "items": appointments})
+
+
+MAX_AVAILABILITY_DAYS = 62
+
+
+@router.get("/availability", response_model=AvailabilityResponse)
+async def get_availability(
+    service_id: str,
+    start: date,
+    end: date,
+    db: Session = Depends(get_db)
+):
+    """Get open appointment start times for a service between two dates (inclusive)."""
+    if end < start or (end - start).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"end must be on or after start and within {MAX_AVAILABILITY_DAYS} days"
+        )
+    
+    service = db.query(Service).filter(Service.id == service_id, Service.is_active == True).first()
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    days = availability.free_slots(db, service.duration, start, end)
+    
+    return AvailabilityResponse(
+        service_id=service.id,
+        duration=service.duration,
+        slot_minutes=settings.BOOKING_SLOT_MINUTES,
+        timezone=settings.BOOKING_TIMEZONE,
+        days=[AvailabilityDay(date=day, slots=slots) for day, slots in days.items()]
+    )
+
+
+@router.get("/availability/month", response_model=AvailabilityMonthResponse)
+async def get_availability_month(
+    service_id: str,
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM"),
+    db: Session = Depends(get_db)
+):
+    """Get a compact free/taken slot bitmap for every day of a month."""
+    service = db.query(Service).filter(Service.id == service_id, Service.is_active == True).first()
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    year, month_number = (int(part) for part in month.split("-"))
+    start = date(year, month_number, 1)
+    end = date(year, month_number, calendar.monthrange(year, month_number)[1])
+    days = availability.slot_bitmaps(db, service.duration, start, end)
+    
+    return AvailabilityMonthResponse(
+        service_id=service.id,
+        month=month,
+        duration=service.duration,
+        slot_minutes=settings.BOOKING_SLOT_MINUTES,
+        timezone=settings.BOOKING_TIMEZONE,
+        days=[
+            AvailabilityMonthDay(date=day, opens_at=opens_at, slots=slots)
+            for day, (opens_at, slots) in days.items()
+        ]
     )
 
 
@@ -55,30 +132,73 @@ async def get_appointments(
 async def create_appointment(
     appointment_data: AppointmentCreate,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    current_user: Optional[Principal] = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
-    """Create a new appointment."""
+    """Create a new appointment. Retries with the same Idempotency-Key replay the first response."""
+    # Keys are scoped per user
+    scope = f"appointments:{current_user.id if current_user else 'guest'}"
+    request_hash = idempotency.fingerprint(appointment_data)
+    replay = idempotency.lookup(db, scope, idempotency_key, request_hash)
+    if replay:
+        return replay
+    
+    service = db.query(Service).filter(
+        Service.id == appointment_data.service_id,
+        Service.is_active == True
+    ).first()
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    starts_at = availability.to_utc(appointment_data.appointment_date)
+    availability.check_start(starts_at, service.duration)
     new_appointment = Appointment(
         id=str(uuid.uuid4()),
         user_id=current_user.id if current_user else None,
-        **appointment_data.model_dump()
+        **appointment_data.model_dump(exclude={"appointment_date"}),
+        appointment_date=starts_at,
+        ends_at=starts_at + timedelta(minutes=service.duration)
     )
     
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
+    rollups.record_appointment(db, None, AppointmentStatus.PENDING)
+    try:
+        availability.book(db, new_appointment)
+    except HTTPException as e:
+        # A concurrent duplicate of this request may be what holds the slot.
+        # Our flush waited for it to finish, so its key is committed by now
+        if e.status_code == status.HTTP_409_CONFLICT:
+            replay = idempotency.lookup(db, scope, idempotency_key, request_hash)
+            if replay:
+                return replay
+        raise
+    notifications.queue_appointment_reminder(db, new_appointment)
+    
+    response = AppointmentResponse.model_validate(new_appointment)
+    idempotency.remember(db, scope, idempotency_key, request_hash, response)
+    
+    replay = idempotency.commit(db, scope, idempotency_key, request_hash)
+    if replay:
+        return replay
     
-    return AppointmentResponse.model_validate(new_appointment)
+    availability.availability_cache.booking_added(new_appointment)
+    return response
 
 
 @router.get("/{appointment_id}", response_model=AppointmentDetailResponse)
 async def get_appointment(
     appointment_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get a specific appointment by ID."""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = db.query(Appointment).options(
+        joinedload(Appointment.user),
+        joinedload(Appointment.service)
+    ).filter(Appointment.id == appointment_id).first()
     
     if not appointment:
         raise HTTPException(
@@ -101,7 +221,7 @@ async def update_appointment(
     appointment_id: str,
     appointment_data: AppointmentUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update an appointment."""
     appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
@@ -121,12 +241,30 @@ async def update_appointment(
     
     # Update fields
     update_data = appointment_data.model_dump(exclude_unset=True)
+    # Admins may move a booking anywhere; customers only to an offered slot
+    if update_data.get("appointment_date") is not None and current_user.role != "admin":
+        availability.check_start(update_data["appointment_date"], appointment.service.duration)
+    booked = (appointment.appointment_date, appointment.ends_at, appointment.status)
+    if update_data.get("status") is not None:
+        rollups.record_appointment_status_change(db, appointment, appointment.status, update_data["status"])
+    
     for field, value in update_data.items():
         setattr(appointment, field, value)
     
+    # Moving or reactivating a booking must not overlap another one
+    if "appointment_date" in update_data or "status" in update_data:
+        appointment.appointment_date = availability.to_utc(appointment.appointment_date)
+        appointment.ends_at = appointment.appointment_date + timedelta(minutes=appointment.service.duration)
+        availability.book(db, appointment)
+        notifications.queue_appointment_reminder(db, appointment)
+    
     db.commit()
     db.refresh(appointment)
     
+    if "appointment_date" in update_data or "status" in update_data:
+        availability.availability_cache.booking_removed(*booked)
+        availability.availability_cache.booking_added(appointment)
+    
     return AppointmentResponse.model_validate(appointment)
 
 
@@ -134,7 +272,7 @@ async def update_appointment(
 async def delete_appointment(
     appointment_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete an appointment."""
     appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
@@ -152,7 +290,10 @@ async def delete_appointment(
             detail="Not authorized to delete this appointment"
         )
     
+    rollups.record_appointment(db, appointment.created_at, appointment.status, delta=-1)
+    booked = (appointment.appointment_date, appointment.ends_at, appointment.status)
     db.delete(appointment)
     db.commit()
+    availability.availability_cache.booking_removed(*booked)
     
     return None
@@ -6,16 +6,17 @@ from slugify import slugify
 
 from app.database import get_db
 from app.models.article import Article
-from app.models.user import User
 from app.schemas.article import (
     ArticleCreate,
     ArticleUpdate,
     ArticleResponse,
-    ArticleSummaryResponse,
     ArticleListResponse,
     ArticleRelatedResponse,
+    ArticleSummaryResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user
+from app.core.responses import json_response, schema_columns
 
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
@@ -38,12 +39,12 @@ async def get_articles(
         query = query.filter(Article.category == category)
     
     total = query.count()
-    articles = query.order_by(Article.published_at.desc()).offset(skip).limit(limit).all()
-    
-    return ArticleListResponse(
-        total=total,
-        items=[ArticleSummaryResponse.model_validate(a) for a in articles]
+    articles = (
+        query.options(schema_columns(Article, ArticleSummaryResponse))
+        .order_by(Article.published_at.desc()).offset(skip).limit(limit).all()
     )
+    
+    return json_response(ArticleListResponse, {"total": total, "items": articles})
 
 
 @router.get("/slug/{slug}", response_model=ArticleResponse)
@@ -80,19 +81,19 @@ async def get_articles_by_category(
     )
     
     total = query.count()
-    articles = query.order_by(Article.published_at.desc()).offset(skip).limit(limit).all()
-    
-    return ArticleListResponse(
-        total=total,
-        items=[ArticleSummaryResponse.model_validate(a) for a in articles]
+    articles = (
+        query.options(schema_columns(Article, ArticleSummaryResponse))
+        .order_by(Article.published_at.desc()).offset(skip).limit(limit).all()
     )
+    
+    return json_response(ArticleListResponse, {"total": total, "items": articles})
 
 
 @router.post("", response_model=ArticleResponse, status_code=status.HTTP_201_CREATED)
 async def create_article(
     article_data: ArticleCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new article (Admin only)."""
     # Generate slug from title
@@ -123,7 +124,7 @@ async def update_article(
     article_id: str,
     article_data: ArticleUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update an article (Admin only)."""
     article = db.query(Article).filter(Article.id == article_id).first()
@@ -165,7 +166,7 @@ async def update_article(
 async def delete_article(
     article_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete an article (Admin only)."""
     article = db.query(Article).filter(Article.id == article_id).first()
@@ -201,7 +202,7 @@ async def get_related_articles(
         Article.category == article.category,
         Article.id != article_id,
         Article.is_published == True
-    ).limit(limit).all()
+    ).options(schema_columns(Article, ArticleRelatedResponse)).limit(limit).all()
     
-    return [ArticleRelatedResponse.model_validate(a) for a in related]
+    return json_response(list[ArticleRelatedResponse], related)
     
\ No newline at end of file
@@ -5,7 +5,6 @@ import uuid
 
 from app.database import get_db
 from app.models.audio import Audio
-from app.models.user import User
 from app.schemas.audio import (
     AudioCreate,
     AudioUpdate,
@@ -13,7 +12,9 @@ from app.schemas.audio import (
     AudioListResponse,
     AudioDownloadResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user
+from app.core.responses import json_response, schema_columns
 
 router = APIRouter(prefix="/audio", tags=["Audio Files"])
 
@@ -36,12 +37,12 @@ async def get_audio_files(
         query = query.filter(Audio.category == category)
     
     total = query.count()
-    audio_files = query.order_by(Audio.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return AudioListResponse(
-        total=total,
-        items=[AudioResponse.model_validate(a) for a in audio_files]
+    audio_files = (
+        query.options(schema_columns(Audio, AudioResponse))
+        .order_by(Audio.created_at.desc()).offset(skip).limit(limit).all()
     )
+    
+    return json_response(AudioListResponse, {"total": total, "items": audio_files})
 
 
 @router.get("/{audio_id}", response_model=AudioResponse)
@@ -62,7 +63,7 @@ async def get_audio_file(audio_id: str, db: Session = Depends(get_db)):
 async def create_audio_file(
     audio_data: AudioCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new audio file (Admin only)."""
     new_audio = Audio(
@@ -82,7 +83,7 @@ async def update_audio_file(
     audio_id: str,
     audio_data: AudioUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update an audio file (Admin only)."""
     audio = db.query(Audio).filter(Audio.id == audio_id).first()
@@ -108,7 +109,7 @@ async def update_audio_file(
 async def delete_audio_file(
     audio_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete an audio file (Admin only)."""
     audio = db.query(Audio).filter(Audio.id == audio_id).first()
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import Optional
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import uuid
@@ -17,13 +19,21 @@ from app.schemas.user import (
     MessageResponse,
 )
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
+    needs_rehash,
     create_access_token,
     create_refresh_token,
     decode_token,
+    password_fingerprint,
+    user_claims,
     get_current_user,
+    security,
 )
+from app.core.principals import Principal, principal_cache
+from app.core.revocation import revocation_list
+from app.core.throttling import client_ip, login_throttle
+from app.core import notifications, rollups
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -43,7 +53,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     new_user = User(
         id=str(uuid.uuid4()),
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         full_name=user_data.full_name,
         phone=user_data.phone,
         role=UserRole.USER,
@@ -51,11 +61,12 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
+    rollups.record_user_created(db)
     db.commit()
     db.refresh(new_user)
     
     # Create tokens
-    access_token = create_access_token(data={"sub": new_user.id})
+    access_token = create_access_token(data=user_claims(new_user))
     refresh_token = create_refresh_token(data={"sub": new_user.id})
     
     return TokenResponse(
@@ -66,18 +77,25 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login user and return tokens."""
+    # Reject throttled callers before spending a password hash on them
+    ip = client_ip(request)
+    login_throttle.admit(ip, credentials.email)
+    
     # Find user
     user = db.query(User).filter(User.email == credentials.email).first()
     if not user:
+        login_throttle.record(ip, credentials.email, success=False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     # Verify password
-    if not verify_password(credentials.password, user.hashed_password):
+    verified = await verify_password_async(credentials.password, user.hashed_password)
+    login_throttle.record(ip, credentials.email, success=verified)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -90,8 +108,13 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="User account is inactive"
         )
     
+    # Upgrade hashes made with an older work factor while we have the password
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(credentials.password)
+        db.commit()
+    
     # Create tokens
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=user_claims(user))
     refresh_token = create_refresh_token(data={"sub": user.id})
     
     return TokenResponse(
@@ -128,8 +151,15 @@ async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(g
                 detail="User not found or inactive"
             )
         
+        # Rotate: each refresh token can be exchanged once
+        if not revocation_list.revoke(db, payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token already used"
+            )
+        
         # Create new tokens
-        access_token = create_access_token(data={"sub": user.id})
+        access_token = create_access_token(data=user_claims(user))
         new_refresh_token = create_refresh_token(data={"sub": user.id})
         
         return TokenResponse(
@@ -148,14 +178,34 @@ async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(g
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get current user information."""
-    return UserResponse.model_validate(current_user)
+    user = db.query(User).filter(User.id == current_user.id).first()
+    return UserResponse.model_validate(user)
 
 
 @router.post("/logout", response_model=MessageResponse)
-async def logout(current_user: User = Depends(get_current_user)):
-    """Logout user (client should discard tokens)."""
+async def logout(
+    token_data: Optional[RefreshTokenRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Logout user, revoking the access token and the refresh token if one is sent."""
+    revocation_list.revoke(db, decode_token(credentials.credentials))
+    
+    if token_data:
+        payload = decode_token(token_data.refresh_token)
+        if payload.get("type") != "refresh" or payload.get("sub") != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid refresh token"
+            )
+        revocation_list.revoke(db, payload)
+    
     return MessageResponse(message="Successfully logged out")
 
 
@@ -165,10 +215,9 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
     user = db.query(User).filter(User.email == request.email).first()
     
     # Always return success to prevent email enumeration
-    if user:
-        # TODO: Generate reset token and send email
-        # For now, just return success message
-        pass
+    if user and user.is_active:
+        notifications.queue_password_reset(db, user)
+        db.commit()
     
     return MessageResponse(
         message="If the email exists, a password reset link has been sent"
@@ -182,22 +231,24 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         payload = decode_token(request.token)
         user_id = payload.get("sub")
         
-        if not user_id:
+        if not user_id or payload.get("type") != "password_reset":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reset token"
             )
         
         user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        # A token stops working once the password it was issued against changes
+        if not user or payload.get("pwd") != password_fingerprint(user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reset token"
             )
         
         # Update password
-        user.hashed_password = get_password_hash(request.new_password)
+        user.hashed_password = await get_password_hash_async(request.new_password)
         db.commit()
+        principal_cache.invalidate(user.id)
         
         return MessageResponse(message="Password successfully reset")
     
@@ -213,19 +264,22 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
 @router.post("/change-password", response_model=MessageResponse)
 async def change_password(
     request: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Change password for authenticated user."""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    
     # Verify current password
-    if not verify_password(request.current_password, current_user.hashed_password):
+    if not await verify_password_async(request.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
     
     # Update password
-    current_user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await get_password_hash_async(request.new_password)
     db.commit()
+    principal_cache.invalidate(user.id)
     
     return MessageResponse(message="Password successfully changed")
@@ -4,15 +4,13 @@ from sqlalchemy import func
 from typing import Optional
 import uuid
 import time
-import random
+import logging
 
 from app.database import get_db
 from app.models.chat import ChatSession, ChatMessage, ChatStatus
-from app.models.user import User
 from app.schemas.chat import (
     ChatSessionCreate,
     ChatSessionResponse,
-    ChatSessionWithUnreadResponse,
     ChatSessionListResponse,
     ChatMessageCreate,
     ChatMessageResponse,
@@ -21,12 +19,23 @@ from app.schemas.chat import (
     WSMessage,
     WSMessageResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user, verify_websocket_token
 from app.core.websocket_manager import manager
+from app.core import rollups, tracing
+from app.core.responses import json_response
+
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
+def generate_message_id() -> str:
+    """Generate a unique chat message ID."""
+    return f"msg_{int(time.time())}_{uuid.uuid4().hex[:12]}"
+
+
 # REST Endpoints
 
 @router.post("/sessions", response_model=ChatSessionResponse, status_code=status.HTTP_201_CREATED)
@@ -43,6 +52,7 @@ async def create_chat_session(
     )
     
     db.add(new_session)
+    rollups.record_chat_session_created(db)
     db.commit()
     db.refresh(new_session)
     
@@ -55,7 +65,7 @@ async def get_chat_sessions(
     limit: int = Query(20, ge=1, le=100),
     status: Optional[ChatStatus] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get all chat sessions (Admin only)."""
     query = db.query(ChatSession)
@@ -66,23 +76,20 @@ async def get_chat_sessions(
     total = query.count()
     sessions = query.order_by(ChatSession.last_activity.desc()).offset(skip).limit(limit).all()
     
-    # Calculate unread count for each session
-    session_responses = []
-    for session in sessions:
-        unread_count = db.query(ChatMessage).filter(
-            ChatMessage.session_id == session.id,
+    # Unread counts for the whole page in one grouped query
+    unread_counts = dict(
+        db.query(ChatMessage.session_id, func.count(ChatMessage.id)).filter(
+            ChatMessage.session_id.in_([session.id for session in sessions]),
             ChatMessage.sender == "user",
             ChatMessage.read == False
-        ).count()
-        
-        session_dict = ChatSessionResponse.model_validate(session).model_dump()
-        session_dict["unread_count"] = unread_count
-        session_responses.append(ChatSessionWithUnreadResponse(**session_dict))
+        ).group_by(ChatMessage.session_id).all()
+    ) if sessions else {}
     
-    return ChatSessionListResponse(
-        total=total,
-        items=session_responses
-    )
+    for session in sessions:
+        # Not a column; read from the instance like the mapped attributes
+        session.unread_count = unread_counts.get(session.id, 0)
+    
+    return json_response(ChatSessionListResponse, {"total": total, "items": sessions})
 
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
@@ -122,10 +129,7 @@ async def get_chat_messages(
     total = query.count()
     messages = query.order_by(ChatMessage.timestamp.asc()).offset(skip).limit(limit).all()
     
-    return ChatMessageListResponse(
-        total=total,
-        items=[ChatMessageResponse.model_validate(m) for m in messages]
-    )
+    return json_response(ChatMessageListResponse, {"total": total, "items": messages})
 
 
 @router.post("/sessions/{session_id}/messages", response_model=ChatMessageResponse, status_code=status.HTTP_201_CREATED)
@@ -151,7 +155,7 @@ async def create_chat_message(
     
     # Create message
     new_message = ChatMessage(
-        id=f"msg_{int(time.time())}_{random.randint(1000, 9999)}",
+        id=generate_message_id(),
         session_id=session_id,
         sender=message_data.sender,
         message=message_data.message,
@@ -187,7 +191,7 @@ async def create_chat_message(
 async def close_chat_session(
     session_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Close a chat session (Admin only)."""
     session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
@@ -218,7 +222,7 @@ async def close_chat_session(
 async def mark_messages_as_read(
     session_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Mark all messages in a session as read (Admin only)."""
     session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
@@ -244,7 +248,7 @@ async def mark_messages_as_read(
 @router.get("/unread-count", response_model=UnreadCountResponse)
 async def get_unread_count(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get total unread message count across all sessions (Admin only)."""
     total_unread = db.query(ChatMessage).filter(
@@ -291,47 +295,51 @@ async def websocket_endpoint(
             # Receive message from client
             data = await websocket.receive_json()
             
-            # Validate message structure
-            try:
-                ws_message = WSMessage(**data)
-            except Exception:
-                continue
-            
-            if ws_message.type == "message":
-                # Save message to database
-                new_message = ChatMessage(
-                    id=f"msg_{int(time.time())}_{random.randint(1000, 9999)}",
-                    session_id=session_id,
-                    sender=ws_message.sender,
-                    message=ws_message.message,
-                    read=False
-                )
-                db.add(new_message)
+            # One trace per message: its SQL and broadcasts nest under it
+            with tracing.span("chat.ws.message", "server", {"chat.session_id": session_id}, root=True) as span:
+                # Validate message structure
+                try:
+                    ws_message = WSMessage(**data)
+                except Exception:
+                    span.set_attribute("chat.message_type", "invalid")
+                    continue
+                span.set_attribute("chat.message_type", ws_message.type)
                 
-                # Update session last_activity
-                session.last_activity = func.now()
+                if ws_message.type == "message":
+                    # Save message to database
+                    new_message = ChatMessage(
+                        id=generate_message_id(),
+                        session_id=session_id,
+                        sender=ws_message.sender,
+                        message=ws_message.message,
+                        read=False
+                    )
+                    db.add(new_message)
+                    
+                    # Update session last_activity
+                    session.last_activity = func.now()
+                    
+                    db.commit()
+                    db.refresh(new_message)
+                    
+                    # Broadcast to all connected clients in this session
+                    await manager.broadcast_to_session({
+                        "type": "message",
+                        "id": new_message.id,
+                        "session_id": session_id,
+                        "sender": ws_message.sender,
+                        "message": ws_message.message,
+                        "timestamp": int(new_message.timestamp.timestamp()),
+                        "read": False
+                    }, session_id)
                 
-                db.commit()
-                db.refresh(new_message)
-                
-                # Broadcast to all connected clients in this session
-                await manager.broadcast_to_session({
-                    "type": "message",
-                    "id": new_message.id,
-                    "session_id": session_id,
-                    "sender": ws_message.sender,
-                    "message": ws_message.message,
-                    "timestamp": int(new_message.timestamp.timestamp()),
-                    "read": False
-                }, session_id)
-            
-            elif ws_message.type == "typing":
-                # Broadcast typing indicator (don't save to DB)
-                await manager.broadcast_to_session({
-                    "type": "typing",
-                    "sender": ws_message.sender,
-                    "is_typing": ws_message.is_typing
-                }, session_id)
+                elif ws_message.type == "typing":
+                    # Broadcast typing indicator (don't save to DB)
+                    await manager.broadcast_to_session({
+                        "type": "typing",
+                        "sender": ws_message.sender,
+                        "is_typing": ws_message.is_typing
+                    }, session_id)
     
     except WebSocketDisconnect:
         manager.disconnect(websocket, session_id)
@@ -342,4 +350,7 @@ async def websocket_endpoint(
         }, session_id)
     except Exception as e:
         manager.disconnect(websocket, session_id)
-        print(f"WebSocket error: {e}")
+        logger.warning(
+            "Chat WebSocket error in session %s: %s", session_id, e,
+            exc_info=e, extra={"sample_key": "chat.websocket_error"}
+        )
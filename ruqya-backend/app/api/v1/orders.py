@@ -1,32 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from sqlalchemy import case, insert, update
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, Optional
 import uuid
-import random
-import string
 
 from app.database import get_db
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.product import Product
-from app.models.user import User
 from app.schemas.order import (
     OrderCreate,
     OrderUpdate,
     OrderStatusUpdate,
     OrderResponse,
-    OrderSummaryResponse,
     OrderListResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_user, get_current_admin_user
+from app.core import idempotency, notifications, pricing, rollups, reservations
+from app.core.order_numbers import order_number_allocator
+from app.core.responses import json_response
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
-def generate_order_number() -> str:
-    """Generate a unique order number."""
-    timestamp = str(int(uuid.uuid4().int))[:8]
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"ORD-{timestamp}-{random_str}"
+def reserve_stock(db: Session, quantities: Dict[str, int], products: Dict[str, Product]):
+    """
+    Atomically decrement stock for every product in the cart.
+    
+    A single conditional UPDATE only touches rows that still have enough stock,
+    so concurrent checkouts cannot oversell. If any product falls short the
+    whole transaction is rolled back.
+    """
+    products_table = Product.__table__
+    quantity = case(quantities, value=products_table.c.id)
+    reserved = db.execute(
+        update(products_table)
+        .where(
+            products_table.c.id.in_(list(quantities)),
+            products_table.c.stock_quantity >= quantity
+        )
+        .values(stock_quantity=products_table.c.stock_quantity - quantity)
+        .returning(products_table.c.id)
+    ).scalars().all()
+    
+    missing = set(quantities) - set(reserved)
+    if missing:
+        db.rollback()
+        product = products[sorted(missing)[0]]
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient stock for {product.name}"
+        )
+
+
+def order_detail_query(db: Session):
+    """Orders with their items and products loaded up front for OrderResponse."""
+    return db.query(Order).options(
+        selectinload(Order.items).selectinload(OrderItem.product)
+    )
 
 
 @router.get("", response_model=OrderListResponse)
@@ -36,7 +67,7 @@ async def get_orders(
     status: Optional[OrderStatus] = None,
     user_id: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get orders. Admin sees all, users see only their own."""
     query = db.query(Order)
@@ -55,29 +86,38 @@ async def get_orders(
     total = query.count()
     orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
     
-    return OrderListResponse(
-        total=total,
-        items=[OrderSummaryResponse.model_validate(o) for o in orders]
-    )
+    return json_response(OrderListResponse, {"total": total, "items": orders})
 
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
-    """Create a new order."""
-    # Calculate total amount and validate products
-    total_amount = 0.0
-    order_items_data = []
+    """Create a new order. Retries with the same Idempotency-Key replay the first response."""
+    request_hash = idempotency.fingerprint(order_data)
+    replay = idempotency.lookup(db, "orders", idempotency_key, request_hash)
+    if replay:
+        return replay
     
+    # Combine repeated lines so each product is validated and reserved once
+    quantities = {}
     for item in order_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(list(quantities)))
+    }
+    
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
         
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product {item.product_id} not found"
+                detail=f"Product {product_id} not found"
             )
         
         if not product.is_active:
@@ -86,64 +126,77 @@ async def create_order(
                 detail=f"Product {product.name} is not available"
             )
         
-        if product.stock_quantity < item.quantity:
+        if product.stock_quantity < quantity:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Insufficient stock for {product.name}"
             )
-        
-        item_total = product.price * item.quantity
-        total_amount += item_total
-        
-        order_items_data.append({
-            "product_id": item.product_id,
-            "quantity": item.quantity,
-            "price": product.price
-        })
-        
-        # Decrease stock
-        product.stock_quantity -= item.quantity
+    
+    # Allocated before this transaction writes anything; a block refill runs in
+    # its own transaction and must not wait on ours
+    order_number = order_number_allocator.next()
+    
+    reserve_stock(db, quantities, products)
+    
+    quote = pricing.price_cart(
+        (item.product_id, item.quantity, products[item.product_id].price)
+        for item in order_data.items
+    )
     
     # Create order
     new_order = Order(
         id=str(uuid.uuid4()),
-        order_number=generate_order_number(),
+        order_number=order_number,
         user_id=None,  # Guest checkout for now
         customer_name=order_data.customer_name,
         customer_email=order_data.customer_email,
         customer_phone=order_data.customer_phone,
         shipping_address=order_data.shipping_address,
         payment_method=order_data.payment_method,
-        total_amount=total_amount,
-        status=OrderStatus.PENDING
+        total_amount=quote.total,
+        status=OrderStatus.PENDING,
+        reserved_until=reservations.hold_expiry()
     )
     
     db.add(new_order)
-    db.flush()  # Get order ID before adding items
-    
-    # Create order items
-    for item_data in order_items_data:
-        order_item = OrderItem(
-            id=str(uuid.uuid4()),
-            order_id=new_order.id,
-            **item_data
-        )
-        db.add(order_item)
+    db.flush()  # Order row must exist before its items reference it
     
-    db.commit()
-    db.refresh(new_order)
+    # Create order items in one statement
+    db.execute(insert(OrderItem), [
+        {
+            "id": str(uuid.uuid4()),
+            "order_id": new_order.id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": line.unit_price,
+        }
+        for item, line in zip(order_data.items, quote.lines)
+    ])
     
-    return OrderResponse.model_validate(new_order)
+    rollups.record_order_created(db, quote.total)
+    notifications.queue_order_confirmation(db, new_order)
+    
+    # Build the response inside the transaction so it can be stored with the key
+    response = OrderResponse.model_validate(
+        order_detail_query(db).filter(Order.id == new_order.id).one()
+    )
+    idempotency.remember(db, "orders", idempotency_key, request_hash, response)
+    
+    replay = idempotency.commit(db, "orders", idempotency_key, request_hash)
+    if replay:
+        return replay
+    
+    return response
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: str,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    current_user: Optional[Principal] = Depends(get_current_user)
 ):
     """Get a specific order by ID."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = order_detail_query(db).filter(Order.id == order_id).first()
     
     if not order:
         raise HTTPException(
@@ -167,10 +220,10 @@ async def update_order_status(
     order_id: str,
     status_data: OrderStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update order status (Admin only)."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = order_detail_query(db).filter(Order.id == order_id).first()
     
     if not order:
         raise HTTPException(
@@ -178,15 +231,38 @@ async def update_order_status(
             detail="Order not found"
         )
     
-    # If cancelling order, restore stock
-    if status_data.status == OrderStatus.CANCELLED and order.status != OrderStatus.CANCELLED:
-        for item in order.items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                product.stock_quantity += item.quantity
+    previous_status = order.status
+    changes = {"status": status_data.status}
+    if status_data.status != OrderStatus.PENDING:
+        # Leaving pending either sells the held stock or releases it below
+        changes["reserved_until"] = None
+    elif previous_status == OrderStatus.CANCELLED:
+        changes["reserved_until"] = reservations.hold_expiry()
+    
+    # Conditional on the status we read, like the reservation sweeper's own
+    # UPDATE, so a concurrent cancel is never restocked or overwritten twice
+    orders = Order.__table__
+    claimed = db.execute(
+        update(orders)
+        .where(orders.c.id == order_id, orders.c.status == previous_status)
+        .values(**changes)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Order status changed concurrently; reload it and try again"
+        )
+    
+    quantities = reservations.reserved_quantities(db, [order_id])
+    if status_data.status == OrderStatus.CANCELLED and previous_status != OrderStatus.CANCELLED:
+        reservations.release_stock(db, quantities)
+    elif previous_status == OrderStatus.CANCELLED and status_data.status != OrderStatus.CANCELLED:
+        # Its stock went back on sale when it was cancelled
+        reserve_stock(db, quantities, {item.product_id: item.product for item in order.items})
     
-    order.status = status_data.status
+    rollups.record_order_status_change(db, order, previous_status, status_data.status)
     db.commit()
-    db.refresh(order)
+    order = order_detail_query(db).filter(Order.id == order_id).one()
     
     return OrderResponse.model_validate(order)
@@ -5,14 +5,15 @@ import uuid
 
 from app.database import get_db
 from app.models.podcast import Podcast
-from app.models.user import User
 from app.schemas.podcast import (
     PodcastCreate,
     PodcastUpdate,
     PodcastResponse,
     PodcastListResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user
+from app.core.responses import json_response, schema_columns
 
 router = APIRouter(prefix="/podcasts", tags=["Podcasts"])
 
@@ -31,19 +32,19 @@ async def get_podcasts(
         query = query.filter(Podcast.is_published == is_published)
     
     total = query.count()
-    podcasts = query.order_by(Podcast.published_at.desc()).offset(skip).limit(limit).all()
-    
-    return PodcastListResponse(
-        total=total,
-        items=[PodcastResponse.model_validate(p) for p in podcasts]
+    podcasts = (
+        query.options(schema_columns(Podcast, PodcastResponse))
+        .order_by(Podcast.published_at.desc()).offset(skip).limit(limit).all()
     )
+    
+    return json_response(PodcastListResponse, {"total": total, "items": podcasts})
 
 
 @router.post("", response_model=PodcastResponse, status_code=status.HTTP_201_CREATED)
 async def create_podcast(
     podcast_data: PodcastCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new podcast (Admin only)."""
     new_podcast = Podcast(
@@ -77,7 +78,7 @@ async def update_podcast(
     podcast_id: str,
     podcast_data: PodcastUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update a podcast (Admin only)."""
     podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
@@ -103,7 +104,7 @@ async def update_podcast(
 async def delete_podcast(
     podcast_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete a podcast (Admin only)."""
     podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
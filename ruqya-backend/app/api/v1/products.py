@@ -5,14 +5,15 @@ import uuid
 
 from app.database import get_db
 from app.models.product import Product
-from app.models.user import User
 from app.schemas.product import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
     ProductListResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user
+from app.core.responses import json_response
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -33,10 +34,7 @@ async def get_products(
     total = query.count()
     products = query.order_by(Product.created_at.desc()).offset(skip).limit(limit).all()
     
-    return ProductListResponse(
-        total=total,
-        items=[ProductResponse.model_validate(p) for p in products]
-    )
+    return json_response(ProductListResponse, {"total": total, "items": products})
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
@@ -57,7 +55,7 @@ async def get_product(product_id: str, db: Session = Depends(get_db)):
 async def create_product(
     product_data: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new product (Admin only)."""
     new_product = Product(
@@ -77,7 +75,7 @@ async def update_product(
     product_id: str,
     product_data: ProductUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update a product (Admin only)."""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -103,7 +101,7 @@ async def update_product(
 async def delete_product(
     product_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete a product (Admin only)."""
     product = db.query(Product).filter(Product.id == product_id).first()
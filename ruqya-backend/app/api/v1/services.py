@@ -5,14 +5,15 @@ import uuid
 
 from app.database import get_db
 from app.models.service import Service
-from app.models.user import User
 from app.schemas.service import (
     ServiceCreate,
     ServiceUpdate,
     ServiceResponse,
     ServiceListResponse,
 )
+from app.core.principals import Principal
 from app.core.security import get_current_user, get_current_admin_user
+from app.core.responses import json_response
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
@@ -33,17 +34,14 @@ async def get_services(
     total = query.count()
     services = query.offset(skip).limit(limit).all()
     
-    return ServiceListResponse(
-        total=total,
-        items=[ServiceResponse.model_validate(s) for s in services]
-    )
+    return json_response(ServiceListResponse, {"total": total, "items": services})
 
 
 @router.post("", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
 async def create_service(
     service_data: ServiceCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Create a new service (Admin only)."""
     new_service = Service(
@@ -77,7 +75,7 @@ async def update_service(
     service_id: str,
     service_data: ServiceUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update a service (Admin only)."""
     service = db.query(Service).filter(Service.id == service_id).first()
@@ -103,7 +101,7 @@ async def update_service(
 async def delete_service(
     service_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Delete a service (Admin only)."""
     service = db.query(Service).filter(Service.id == service_id).first()
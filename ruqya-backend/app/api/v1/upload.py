@@ -4,9 +4,10 @@ import uuid
 import os
 from pathlib import Path
 
-from app.models.user import User
 from app.schemas.upload import FileUploadResponse, ImageUploadResponse, AudioUploadResponse
+from app.core.principals import Principal
 from app.core.security import get_current_admin_user
+from app.core import tracing
 
 router = APIRouter(prefix="/upload", tags=["File Upload"])
 
@@ -31,12 +32,17 @@ def save_upload_file(upload_file: UploadFile, directory: str) -> dict:
     
     # Save file
     file_path = upload_path / unique_filename
-    with open(file_path, "wb") as buffer:
-        content = upload_file.file.read()
-        buffer.write(content)
-    
-    # Get file size
-    file_size = os.path.getsize(file_path)
+    with tracing.span("upload.save", attributes={
+        "upload.directory": directory,
+        "upload.content_type": upload_file.content_type,
+    }) as span:
+        with open(file_path, "wb") as buffer:
+            content = upload_file.file.read()
+            buffer.write(content)
+        
+        # Get file size
+        file_size = os.path.getsize(file_path)
+        span.set_attribute("upload.bytes", file_size)
     
     # Return file URL (adjust this based on your setup)
     file_url = f"/uploads/{directory}/{unique_filename}"
@@ -51,7 +57,7 @@ def save_upload_file(upload_file: UploadFile, directory: str) -> dict:
 @router.post("/image", response_model=ImageUploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Upload an image file (Admin only)."""
     # Validate file type
@@ -81,7 +87,7 @@ async def upload_image(
 @router.post("/audio", response_model=AudioUploadResponse)
 async def upload_audio(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Upload an audio file (Admin only)."""
     # Validate file type
@@ -118,7 +124,7 @@ async def upload_audio(
 @router.post("/podcast", response_model=AudioUploadResponse)
 async def upload_podcast(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Upload a podcast file (Admin only)."""
     # Same as audio upload but in different directory
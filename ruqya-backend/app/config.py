@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
+from decimal import Decimal
 
 
 class Settings(BaseSettings):
@@ -11,6 +12,26 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    PRINCIPAL_CACHE_SECONDS: int = 30  # per-process cache of user role/status for authenticated requests (0 = off)
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False  # accept role/active claims from access tokens on a cache miss
+    REVOCATION_SYNC_SECONDS: float = 5.0  # how quickly other workers see a logout or used refresh token
+    REVOCATION_BLOOM_CAPACITY: int = 100_000  # revoked tokens per filter before it is rebuilt larger
+    
+    # Password hashing (bcrypt); existing hashes are upgraded on login when the rounds change
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # concurrent hashes per API process
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # or "process"
+    
+    # Login throttling, checked before the password is verified (see app.core.throttling)
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_BACKEND: str = "memory"  # per process; "database" shares counters between workers
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 300
+    LOGIN_THROTTLE_IP_ATTEMPTS: int = 30  # per window
+    LOGIN_THROTTLE_EMAIL_ATTEMPTS: int = 10  # per window
+    LOGIN_BACKOFF_FREE_FAILURES: int = 5  # consecutive failures before lockouts start
+    LOGIN_BACKOFF_BASE_SECONDS: float = 2.0  # doubles with each further failure
+    LOGIN_BACKOFF_MAX_SECONDS: float = 900.0
+    TRUSTED_PROXY_HOPS: int = 0  # reverse proxies appending to X-Forwarded-For in front of the API
     
     # Frontend
     FRONTEND_URL: str
@@ -24,6 +45,89 @@ class Settings(BaseSettings):
     # Email
     RESEND_API_KEY: Optional[str] = None
     EMAIL_FROM: str = "noreply@ruqyahealinghub.com"
+    EMAIL_BACKEND: Optional[str] = None  # resend, smtp, console or fake; defaults to resend when RESEND_API_KEY is set
+    EMAIL_SMTP_HOST: str = "localhost"  # smtp backend, e.g. Mailpit or `python -m aiosmtpd -n`
+    EMAIL_SMTP_PORT: int = 1025
+    EMAIL_BATCH_SIZE: int = 50  # messages per provider call (Resend allows up to 100)
+    EMAIL_RATE_LIMIT_PER_SECOND: float = 2.0  # provider calls per worker process (0 = unlimited)
+    EMAIL_RATE_LIMIT_BURST: int = 2
+    EMAIL_FAKE_LATENCY_MS: float = 0  # simulated round-trip for the fake backend
+    PASSWORD_RESET_EXPIRE_MINUTES: int = 30
+    APPOINTMENT_REMINDER_HOURS: int = 24  # before the appointment (0 = no reminders)
+    
+    # Background jobs
+    JOB_QUEUE_BACKEND: str = "database"  # or "memory": per-process and lost on restart, for tests
+    JOB_WORKER_IN_PROCESS: bool = True  # run a worker in each API process; otherwise run `python -m app.worker`
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_BATCH_SIZE: int = 20
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_SECONDS: int = 30  # doubles after each failed attempt
+    JOB_LEASE_SECONDS: int = 300  # a running job is handed out again after this (worker died)
+    JOB_RETENTION_DAYS: int = 7  # completed jobs are deleted after this
+    JOB_FAILED_RETENTION_DAYS: int = 30  # jobs that used up their attempts, kept longer for inspection
+    
+    # Pricing
+    ORDER_TAX_RATE: Decimal = Decimal("0")  # fraction added to order totals, e.g. 0.2 for 20%
+    
+    # Appointment booking hours, in BOOKING_TIMEZONE
+    BOOKING_TIMEZONE: str = "UTC"
+    BOOKING_OPEN_HOUR: int = 9
+    BOOKING_CLOSE_HOUR: int = 17
+    BOOKING_WORKING_DAYS: List[int] = [0, 1, 2, 3, 4]  # Monday = 0
+    BOOKING_SLOT_MINUTES: int = 30
+    AVAILABILITY_CACHE_SECONDS: int = 60  # per-worker calendar cache; bounds staleness from other workers
+    
+    # Order stock holds
+    ORDER_RESERVATION_MINUTES: int = 30  # pending orders release their stock after this (0 = never)
+    ORDER_RESERVATION_SWEEP_SECONDS: int = 60
+    
+    # Order numbers (ORD-YYYYMMDD-NNNNN), reserved from the database in blocks per worker
+    ORDER_NUMBER_BLOCK_SIZE: int = 20
+    
+    # Idempotency-Key replay window
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    
+    # Admin dashboard snapshot
+    DASHBOARD_CACHE_ENABLED: bool = True
+    DASHBOARD_REFRESH_SECONDS: int = 30
+    DASHBOARD_REFRESH_DEBOUNCE_SECONDS: float = 1.0
+    
+    # Analytics rollups
+    ANALYTICS_COMPACTION_ENABLED: bool = True
+    ANALYTICS_COMPACTION_HOUR: int = 2  # UTC hour of the nightly rebuild
+    ANALYTICS_COMPACTION_DAYS: int = 3  # trailing days rebuilt each night
+    
+    # Prometheus metrics at GET /metrics, per worker process
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None  # "Authorization: Bearer <token>"; required outside development, or /metrics is 404
+    
+    # Sampling profiler for admins (X-Profile: 1 header, or POST /admin/profiler)
+    PROFILER_ENABLED: bool = True
+    PROFILER_INTERVAL_MS: float = 5
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_DIR: str = "profiles"  # folded stacks, shared by the workers on a host
+    PROFILER_KEEP: int = 50  # newest profiles kept
+    
+    # Distributed tracing, OTLP/JSON (see app.core.tracing)
+    TRACING_EXPORTER: str = "none"  # "file", "otlp" or "none"
+    TRACING_FILE: str = "traces/spans.jsonl"  # for "file": one OTLP export request per line
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"  # for "otlp": a collector's OTLP/HTTP receiver
+    TRACING_SAMPLE_RATE: float = 1.0  # fraction of new traces recorded; a caller's traceparent decides for its own
+    TRACING_SERVICE_NAME: str = "ruqya-backend"
+    
+    # Logging (see app.core.logs)
+    LOG_FORMAT: str = "json"  # or "text" for local development
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: Dict[str, str] = {}  # per module, e.g. {"app.database": "WARNING"}
+    LOG_QUEUE_SIZE: int = 10_000  # records waiting to be written; more are dropped
+    LOG_SAMPLE_BURST: int = 10  # records per sample_key per window, e.g. WebSocket errors
+    LOG_SAMPLE_WINDOW_SECONDS: float = 60.0
+    
+    # Debugging
+    SQL_DEBUG_MAX_QUERIES: int = 0  # log requests issuing more SQL statements than this (0 = off)
+    SLOW_QUERY_MS: float = 200  # log statements slower than this, with the route (0 = off)
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.0  # fraction of slow SELECTs to log a plan for (re-runs them under EXPLAIN ANALYZE on PostgreSQL)
+    SERVER_TIMING_ENABLED: bool = True  # Server-Timing header with SQL count and time per response
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -0,0 +1,292 @@
+"""Appointment slot availability and double-booking protection.
+
+Bookings share one practitioner calendar: any pending or confirmed
+appointment blocks its time for every service. Free slots are the working
+hours from the BOOKING_* settings minus those bookings, offered every
+BOOKING_SLOT_MINUTES. Each day is cached as a row of 5-minute cells, and the
+free start times for a service are derived from it with bit shifts.
+
+New bookings must start on a slot the availability API could offer (see
+check_start). They are written first and checked for overlap afterwards. On
+SQLite the write holds the database lock, so the check sees every competing
+booking. On Postgres, two concurrent bookings cannot both see each other, so
+the ``appointments_no_overlap`` exclusion constraint rejects the second.
+"""
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.appointment import Appointment, AppointmentStatus
+
+
+BLOCKING_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+OVERLAP_CONSTRAINT = "appointments_no_overlap"
+
+# Upper bound on a booking's length; keeps overlap lookups a bounded range scan
+MAX_APPOINTMENT_LENGTH = timedelta(days=1)
+
+
+def to_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def booked_intervals(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    exclude_id: Optional[str] = None,
+) -> List[Tuple[datetime, datetime]]:
+    """(start, end) of active bookings overlapping ``start``..``end``, by start time."""
+    query = db.query(Appointment.appointment_date, Appointment.ends_at).filter(
+        Appointment.appointment_date >= start - MAX_APPOINTMENT_LENGTH,
+        Appointment.appointment_date < end,
+        Appointment.status.in_(BLOCKING_STATUSES),
+        Appointment.ends_at > start
+    )
+    if exclude_id:
+        query = query.filter(Appointment.id != exclude_id)
+    return [
+        (to_utc(booked_start), to_utc(booked_end))
+        for booked_start, booked_end in query.order_by(Appointment.appointment_date)
+    ]
+
+
+def working_hours(day: date) -> Optional[Tuple[datetime, datetime]]:
+    """Opening and closing time (UTC) on ``day``, or None when closed."""
+    if day.weekday() not in settings.BOOKING_WORKING_DAYS:
+        return None
+    tz = ZoneInfo(settings.BOOKING_TIMEZONE)
+    opens = datetime.combine(day, time(settings.BOOKING_OPEN_HOUR), tz)
+    closes = datetime.combine(day, time(settings.BOOKING_CLOSE_HOUR), tz)
+    return opens.astimezone(timezone.utc), closes.astimezone(timezone.utc)
+
+
+CELL_MINUTES = 5
+
+
+class DayCalendar:
+    """Working hours of one day as 5-minute cells, each counting active bookings."""
+    
+    def __init__(self, day: date):
+        self.day = day
+        self.built_at = monotonic()
+        hours = working_hours(day)
+        self.opens, self.closes = hours if hours else (None, None)
+        size = int((self.closes - self.opens) / timedelta(minutes=CELL_MINUTES)) if hours else 0
+        self.cells = bytearray(size)
+    
+    def apply(self, start: datetime, end: datetime, delta: int):
+        """Add (``delta=1``) or remove (``-1``) a booking; cells it touches are rounded outward."""
+        if self.opens is None or end <= self.opens or start >= self.closes:
+            return
+        cell = timedelta(minutes=CELL_MINUTES)
+        first = max(0, (start - self.opens) // cell)
+        last = min(len(self.cells), -((self.opens - end) // cell))
+        for index in range(first, last):
+            self.cells[index] = max(0, min(255, self.cells[index] + delta))
+    
+    def start_mask(self, duration_minutes: int) -> int:
+        """Bit ``i`` set when a booking of this length can start at cell ``i`` on the slot grid."""
+        if not self.cells:
+            return 0
+        free = 0
+        for index, count in enumerate(self.cells):
+            if not count:
+                free |= 1 << index
+        # A start is free when the next ``length`` cells all are
+        length = -(-duration_minutes // CELL_MINUTES)
+        starts = free
+        for offset in range(1, length):
+            starts &= free >> offset
+        step = max(1, settings.BOOKING_SLOT_MINUTES // CELL_MINUTES)
+        grid = sum(1 << index for index in range(0, len(self.cells), step))
+        return starts & grid
+    
+    def slots(self, duration_minutes: int, now: datetime) -> List[datetime]:
+        mask = self.start_mask(duration_minutes)
+        slots = (
+            self.opens + timedelta(minutes=index * CELL_MINUTES)
+            for index in range(len(self.cells)) if mask >> index & 1
+        )
+        return [slot for slot in slots if slot > now]
+    
+    def bitmap(self, duration_minutes: int, now: datetime) -> str:
+        """One '0'/'1' per BOOKING_SLOT_MINUTES step from opening time."""
+        mask = self.start_mask(duration_minutes)
+        step = max(1, settings.BOOKING_SLOT_MINUTES // CELL_MINUTES)
+        return "".join(
+            "1" if mask >> index & 1 and self.opens + timedelta(minutes=index * CELL_MINUTES) > now else "0"
+            for index in range(0, len(self.cells), step)
+        )
+
+
+class AvailabilityCache:
+    """Process-local DayCalendar cache, built lazily and kept current by booking deltas.
+    
+    Deltas only reach the worker that handled the booking, so entries are
+    rebuilt after AVAILABILITY_CACHE_SECONDS to pick up changes made elsewhere.
+    Booking itself never trusts the cache.
+    """
+    
+    def __init__(self):
+        self._days: Dict[date, DayCalendar] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _fresh(self, calendar: Optional[DayCalendar]) -> bool:
+        return calendar is not None and monotonic() - calendar.built_at < settings.AVAILABILITY_CACHE_SECONDS
+    
+    def days(self, db: Session, start_day: date, end_day: date) -> List[DayCalendar]:
+        """Calendars for ``start_day``..``end_day``, loading any missing days in one query."""
+        wanted = [start_day + timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+        with self._lock:
+            missing = [day for day in wanted if not self._fresh(self._days.get(day))]
+            self.hits += len(wanted) - len(missing)
+            self.misses += len(missing)
+        
+        if missing:
+            built = {day: DayCalendar(day) for day in missing}
+            tz = ZoneInfo(settings.BOOKING_TIMEZONE)
+            range_start = datetime.combine(missing[0], time.min, tz).astimezone(timezone.utc)
+            range_end = datetime.combine(missing[-1] + timedelta(days=1), time.min, tz).astimezone(timezone.utc)
+            for booked_start, booked_end in booked_intervals(db, range_start, range_end):
+                for calendar in built.values():
+                    calendar.apply(booked_start, booked_end, 1)
+            with self._lock:
+                self._days.update(built)
+                # Bound memory to roughly a year of viewed days
+                if len(self._days) > 400:
+                    for day in sorted(self._days)[:len(self._days) - 400]:
+                        del self._days[day]
+        
+        with self._lock:
+            return [self._days[day] for day in wanted]
+    
+    def _apply(self, start: datetime, end: datetime, delta: int):
+        start, end = to_utc(start), to_utc(end)
+        with self._lock:
+            for calendar in self._days.values():
+                calendar.apply(start, end, delta)
+    
+    def booking_added(self, appointment: Appointment):
+        if appointment.status in BLOCKING_STATUSES:
+            self._apply(appointment.appointment_date, appointment.ends_at, 1)
+    
+    def booking_removed(self, start: datetime, end: datetime, status: AppointmentStatus):
+        if status in BLOCKING_STATUSES:
+            self._apply(start, end, -1)
+    
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+
+# Global instance
+availability_cache = AvailabilityCache()
+
+
+def free_slots(
+    db: Session,
+    duration_minutes: int,
+    start_day: date,
+    end_day: date,
+    now: Optional[datetime] = None,
+) -> Dict[date, List[datetime]]:
+    """Start times (UTC) for a ``duration_minutes`` booking on each day of the range."""
+    now = to_utc(now or datetime.now(timezone.utc))
+    return {
+        calendar.day: calendar.slots(duration_minutes, now)
+        for calendar in availability_cache.days(db, start_day, end_day)
+    }
+
+
+def slot_bitmaps(
+    db: Session,
+    duration_minutes: int,
+    start_day: date,
+    end_day: date,
+    now: Optional[datetime] = None,
+) -> Dict[date, Tuple[Optional[datetime], str]]:
+    """Opening time (UTC, None when closed) and slot bitmap for each day of the range."""
+    now = to_utc(now or datetime.now(timezone.utc))
+    return {
+        calendar.day: (calendar.opens, calendar.bitmap(duration_minutes, now))
+        for calendar in availability_cache.days(db, start_day, end_day)
+    }
+
+
+def check_start(starts_at: datetime, duration_minutes: int, now: Optional[datetime] = None):
+    """Fail with 400 unless ``starts_at`` is a start time free_slots could offer.
+    
+    That is in the future, on the BOOKING_SLOT_MINUTES grid from opening
+    time, and within working hours for the whole booking. Whether the slot
+    is still free is for book() to decide.
+    """
+    starts_at = to_utc(starts_at)
+    now = to_utc(now or datetime.now(timezone.utc))
+    if starts_at <= now:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Appointments must start in the future"
+        )
+    
+    hours = working_hours(starts_at.astimezone(ZoneInfo(settings.BOOKING_TIMEZONE)).date())
+    if hours is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Appointments cannot be booked on this day"
+        )
+    
+    opens, closes = hours
+    if starts_at < opens or starts_at + timedelta(minutes=duration_minutes) > closes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Appointments must fit within working hours"
+        )
+    
+    # The same grid DayCalendar.start_mask offers starts on
+    step = timedelta(minutes=max(1, settings.BOOKING_SLOT_MINUTES // CELL_MINUTES) * CELL_MINUTES)
+    if (starts_at - opens) % step:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Appointments start every {step // timedelta(minutes=1)} minutes from opening time"
+        )
+
+
+def slot_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="This time slot is no longer available"
+    )
+
+
+def book(db: Session, appointment: Appointment):
+    """Flush ``appointment`` and fail with 409 if it overlaps an active booking.
+    
+    The transaction is rolled back on conflict.
+    """
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if OVERLAP_CONSTRAINT in str(e.orig):
+            raise slot_taken()
+        raise
+    
+    if appointment.status not in BLOCKING_STATUSES:
+        return
+    
+    if booked_intervals(db, appointment.appointment_date, appointment.ends_at, exclude_id=appointment.id):
+        db.rollback()
+        raise slot_taken()
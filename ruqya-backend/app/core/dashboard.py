@@ -0,0 +1,278 @@
+"""Admin dashboard statistics and the shared snapshot cache.
+
+Every admin dashboard view reads the same numbers, so the API serves one
+process-local snapshot instead of recomputing ``DashboardStats`` per request.
+A background task refreshes it every ``DASHBOARD_REFRESH_SECONDS``, and sooner
+after any commit that touches a table the dashboard reads. Admins subscribed
+to the ``/admin/dashboard/ws`` channel receive only the fields that changed.
+
+Each worker process keeps its own snapshot; with several workers, writes
+handled by another worker are picked up on the next interval.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import WebSocket
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.order import Order
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.product import Product
+from app.models.article import Article
+from app.models.chat import ChatSession, ChatStatus
+from app.models.analytics import DailyStats
+from app.schemas.admin import DashboardStats, RevenueStats
+from app.schemas.order import OrderSummaryResponse
+from app.schemas.appointment import AppointmentResponse
+from app.core import tracing
+from app.core.websocket_manager import ConnectionManager
+
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes change the dashboard
+DASHBOARD_TABLES = {
+    "users",
+    "appointments",
+    "orders",
+    "products",
+    "articles",
+    "chat_sessions",
+}
+
+CHANNEL = "dashboard"
+
+
+def build_dashboard_stats(db: Session) -> DashboardStats:
+    """Compute dashboard statistics from the database."""
+    now = datetime.utcnow()
+    today_start = datetime(now.year, now.month, now.day)
+    week_start = today_start - timedelta(days=now.weekday())
+    month_start = datetime(now.year, now.month, 1)
+    year_start = datetime(now.year, 1, 1)
+    
+    # Revenue windows in a single pass over the daily rollups
+    revenue = select(
+        func.coalesce(func.sum(DailyStats.revenue).filter(DailyStats.day >= today_start.date()), 0).label("today"),
+        func.coalesce(func.sum(DailyStats.revenue).filter(DailyStats.day >= week_start.date()), 0).label("this_week"),
+        func.coalesce(func.sum(DailyStats.revenue).filter(DailyStats.day >= month_start.date()), 0).label("this_month"),
+        func.coalesce(func.sum(DailyStats.revenue).filter(DailyStats.day >= year_start.date()), 0).label("this_year"),
+    ).where(
+        DailyStats.day >= min(week_start, year_start).date()
+    ).subquery()
+    
+    def count_of(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+    
+    # Counts and revenue in one round-trip
+    stats = db.execute(
+        select(
+            count_of(User).label("total_users"),
+            count_of(Appointment).label("total_appointments"),
+            count_of(Order).label("total_orders"),
+            count_of(Product).label("total_products"),
+            count_of(Article).label("total_articles"),
+            count_of(Appointment, Appointment.status == AppointmentStatus.PENDING).label("pending_appointments"),
+            count_of(ChatSession, ChatSession.status == ChatStatus.ACTIVE).label("active_chats"),
+            revenue.c.today,
+            revenue.c.this_week,
+            revenue.c.this_month,
+            revenue.c.this_year,
+        )
+    ).one()
+    
+    # Get recent orders (last 5)
+    recent_orders = db.query(Order).order_by(
+        Order.created_at.desc()
+    ).limit(5).all()
+    
+    # Get recent appointments (last 5)
+    recent_appointments = db.query(Appointment).order_by(
+        Appointment.created_at.desc()
+    ).limit(5).all()
+    
+    return DashboardStats(
+        computed_at=datetime.utcnow(),
+        total_users=stats.total_users,
+        total_appointments=stats.total_appointments,
+        total_orders=stats.total_orders,
+        total_products=stats.total_products,
+        total_articles=stats.total_articles,
+        pending_appointments=stats.pending_appointments,
+        active_chats=stats.active_chats,
+        recent_orders=[OrderSummaryResponse.model_validate(o) for o in recent_orders],
+        recent_appointments=[AppointmentResponse.model_validate(a) for a in recent_appointments],
+        revenue=RevenueStats(
+            today=stats.today,
+            this_week=stats.this_week,
+            this_month=stats.this_month,
+            this_year=stats.this_year
+        )
+    )
+
+
+class DashboardCache:
+    """Process-local DashboardStats snapshot with change notifications."""
+    
+    def __init__(self):
+        self.snapshot: Optional[DashboardStats] = None
+        self.subscribers = ConnectionManager()
+        # Bound to the loop that uses them; see _bind_loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._dirty: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+    
+    def _bind_loop(self):
+        """Create the lock and event in the running loop, again if it has changed."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._lock = asyncio.Lock()
+            self._dirty = asyncio.Event()
+            self._loop = loop
+    
+    def mark_dirty(self):
+        """Request an early refresh. Safe to call from any thread."""
+        loop, dirty = self._loop, self._dirty
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(dirty.set)
+    
+    def is_stale(self) -> bool:
+        if self.snapshot is None or (self._dirty is not None and self._dirty.is_set()):
+            return True
+        age = datetime.utcnow() - self.snapshot.computed_at
+        return age > timedelta(seconds=settings.DASHBOARD_REFRESH_SECONDS)
+    
+    async def get(self) -> DashboardStats:
+        """Return the current snapshot, refreshing it first if stale."""
+        self._bind_loop()
+        if self.is_stale():
+            self.misses += 1
+            await self.refresh(force=False)
+        else:
+            self.hits += 1
+        return self.snapshot
+    
+    async def refresh(self, force: bool = True):
+        self._bind_loop()
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if not force and not self.is_stale():
+                return
+            self._dirty.clear()
+            previous = self.snapshot
+            self.snapshot = await asyncio.to_thread(_compute_snapshot)
+            # Under the lock, so subscribers get deltas in the order they were computed
+            await self._publish(previous, self.snapshot)
+    
+    async def _publish(self, previous: Optional[DashboardStats], current: DashboardStats):
+        """Push the fields that changed to subscribed dashboards."""
+        if not self.subscribers.is_user_online(CHANNEL):
+            return
+        
+        current_data = current.model_dump(mode="json")
+        previous_data = previous.model_dump(mode="json") if previous else {}
+        changes = {
+            field: value for field, value in current_data.items()
+            if field != "computed_at" and previous_data.get(field) != value
+        }
+        if not changes:
+            return
+        
+        await self.broadcast({
+            "type": "delta",
+            "computed_at": current_data["computed_at"],
+            "changes": changes,
+        })
+    
+    async def broadcast(self, message: dict):
+        subscribers = list(self.subscribers.active_connections.get(CHANNEL, []))
+        with tracing.span("ws.broadcast", "producer", {
+            "ws.channel": CHANNEL,
+            "ws.message_type": message.get("type"),
+            "ws.recipients": len(subscribers),
+        }):
+            for websocket in subscribers:
+                try:
+                    await websocket.send_json(message)
+                except Exception:
+                    # Its handler sees the dead socket too and unsubscribes it
+                    pass
+    
+    async def subscribe(self, websocket: WebSocket):
+        """Accept a dashboard subscriber and send it the full snapshot."""
+        await self.subscribers.connect(websocket, CHANNEL)
+        snapshot = await self.get()
+        await websocket.send_json({
+            "type": "snapshot",
+            "computed_at": snapshot.computed_at.isoformat(),
+            "data": snapshot.model_dump(mode="json"),
+        })
+    
+    def unsubscribe(self, websocket: WebSocket):
+        self.subscribers.disconnect(websocket, CHANNEL)
+    
+    async def run(self):
+        """Refresh on an interval, or shortly after relevant writes."""
+        while True:
+            self._bind_loop()
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=settings.DASHBOARD_REFRESH_SECONDS)
+                # Coalesce bursts of writes into one refresh
+                await asyncio.sleep(settings.DASHBOARD_REFRESH_DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            
+            try:
+                with tracing.span("dashboard.refresh", root=True):
+                    await self.refresh()
+            except Exception as e:
+                logger.exception("Dashboard refresh failed: %s", e)
+
+
+def _compute_snapshot() -> DashboardStats:
+    db = SessionLocal()
+    try:
+        return build_dashboard_stats(db)
+    finally:
+        db.close()
+
+
+# Global instance
+dashboard_cache = DashboardCache()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_dashboard_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in DASHBOARD_TABLES:
+            session.info["dashboard_dirty"] = True
+            return
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_dashboard_statements(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement.table, "name", None)
+        if table in DASHBOARD_TABLES:
+            orm_execute_state.session.info["dashboard_dirty"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _refresh_dashboard_after_commit(session):
+    if session.info.pop("dashboard_dirty", False):
+        dashboard_cache.mark_dirty()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_dashboard_writes(session):
+    session.info.pop("dashboard_dirty", None)
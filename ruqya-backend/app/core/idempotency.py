@@ -0,0 +1,131 @@
+"""Idempotency-Key support for create endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header gets the
+stored response of the first attempt instead of a second order or
+appointment. The key is written in the same transaction as the resource it
+created, so a stored key always means the work was committed. A concurrent
+duplicate fails on the key's primary key when it commits, rolls back its own
+work and replays the winner's response. Endpoints whose work itself conflicts
+with the winner's (an appointment for the same slot) look the key up again
+when that conflict is raised.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+
+logger = logging.getLogger(__name__)
+
+REPLAY_HEADER = "Idempotent-Replayed"
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def fingerprint(payload: BaseModel) -> str:
+    """Stable hash of a request body, to reject a key reused for a different request."""
+    body = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def lookup(db: Session, scope: str, key: Optional[str], request_hash: str) -> Optional[JSONResponse]:
+    """Stored response for ``key``, or None if the request should run."""
+    if not key:
+        return None
+    
+    record = db.get(IdempotencyKey, (scope, key))
+    if record is None:
+        return None
+    
+    if _aware(record.expires_at) <= datetime.now(timezone.utc):
+        # Lapsed; free the key for this request (replaced on commit)
+        db.delete(record)
+        return None
+    
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    
+    return JSONResponse(
+        status_code=record.status_code,
+        content=json.loads(record.response_body),
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+def remember(
+    db: Session,
+    scope: str,
+    key: Optional[str],
+    request_hash: str,
+    response: BaseModel,
+    status_code: int = status.HTTP_201_CREATED,
+):
+    """Store ``response`` for ``key`` as part of the current transaction."""
+    if not key:
+        return
+    db.add(IdempotencyKey(
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=response.model_dump_json(),
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    ))
+
+
+def commit(db: Session, scope: str, key: Optional[str], request_hash: str) -> Optional[JSONResponse]:
+    """Commit the transaction, or replay the response of a concurrent request that won the key."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        replay = lookup(db, scope, key, request_hash)
+        if replay is None:
+            raise
+        return replay
+    return None
+
+
+def purge_expired() -> int:
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+        ).rowcount
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_idempotency_purge():
+    """Delete lapsed keys hourly."""
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired)
+        except Exception as e:
+            logger.exception("Idempotency key purge failed: %s", e)
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
@@ -0,0 +1,389 @@
+"""Background jobs.
+
+Request handlers call ``enqueue`` inside their own transaction, so a job
+exists only if the change that caused it was committed. Workers (the one
+``app.main`` starts in each API process, or ``python -m app.worker``) claim
+due jobs in batches, run the handler registered for each job's kind and retry
+failures with exponential backoff until JOB_MAX_ATTEMPTS. Kinds registered
+with ``batch_handler`` (emails) are handed over together, so one claim can
+become one provider call.
+
+Two backends, chosen by JOB_QUEUE_BACKEND:
+
+- ``database``: rows in ``jobs``. Claims take ``FOR UPDATE SKIP LOCKED`` on
+  Postgres, so any number of workers can poll without handing out the same
+  job twice. A running job whose lease lapses (its worker died) is claimed
+  again, so handlers must tolerate running more than once. A partial unique
+  index allows one unfinished job per ``dedupe_key``.
+- ``memory``: an in-process heap for tests and local runs. Jobs are handed
+  over when the enqueuing session commits and are lost on restart.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, event, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+from app.core import tracing
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = timedelta(hours=6)
+MAX_BACKOFF_DOUBLINGS = 16
+PURGE_INTERVAL_SECONDS = 3600
+
+# kind -> handler(db, payload); the worker commits the session afterwards
+HANDLERS: Dict[str, Callable[[Session, dict], None]] = {}
+
+# kind -> handler(db, jobs) returning one error (or None) per job. Claimed jobs
+# sharing a batch handler are passed to it together, in one session.
+BATCH_HANDLERS: Dict[str, Callable[[Session, List["ClaimedJob"]], List[Optional[Exception]]]] = {}
+
+
+def handler(kind: str):
+    """Register the function that runs jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def batch_handler(*kinds: str):
+    """Register a function that runs all claimed jobs of ``kinds`` in one call."""
+    def register(func):
+        for kind in kinds:
+            BATCH_HANDLERS[kind] = func
+        return func
+    return register
+
+
+@dataclass
+class ClaimedJob:
+    id: str
+    kind: str
+    payload: dict
+    attempts: int  # including the current one
+    max_attempts: int
+
+
+def retry_delay(attempts: int) -> timedelta:
+    doublings = min(attempts - 1, MAX_BACKOFF_DOUBLINGS)
+    return min(timedelta(seconds=settings.JOB_RETRY_BASE_SECONDS * 2 ** doublings), MAX_RETRY_DELAY)
+
+
+class DatabaseQueue:
+    """Jobs stored in the ``jobs`` table."""
+    
+    def add(self, db: Session, job: Job) -> bool:
+        if job.dedupe_key is None:
+            db.add(job)
+            return True
+        # Inserted now, in a savepoint, so losing a race on the dedupe key
+        # doesn't roll back the caller's transaction
+        try:
+            with db.begin_nested():
+                db.add(job)
+        except IntegrityError:
+            return False
+        return True
+    
+    def exists(self, db: Session, dedupe_key: str) -> bool:
+        return db.query(Job.id).filter(Job.dedupe_key == dedupe_key).first() is not None
+    
+    def claim(self, limit: int, now: datetime) -> List[ClaimedJob]:
+        jobs = Job.__table__
+        claimable = or_(
+            and_(jobs.c.status == JobStatus.QUEUED, jobs.c.run_at <= now),
+            and_(jobs.c.status == JobStatus.RUNNING, jobs.c.locked_until <= now),
+        )
+        due = select(jobs.c.id).where(claimable).order_by(jobs.c.run_at).limit(limit).with_for_update(skip_locked=True)
+        
+        db = SessionLocal()
+        try:
+            # Re-checking the condition keeps claims exclusive where SKIP LOCKED isn't available
+            rows = db.execute(
+                update(jobs)
+                .where(jobs.c.id.in_(due.scalar_subquery()), claimable)
+                .values(
+                    status=JobStatus.RUNNING,
+                    attempts=jobs.c.attempts + 1,
+                    locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                )
+                .returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+            ).all()
+            db.commit()
+        finally:
+            db.close()
+        
+        return [
+            ClaimedJob(id=row.id, kind=row.kind, payload=json.loads(row.payload),
+                       attempts=row.attempts, max_attempts=row.max_attempts)
+            for row in rows
+        ]
+    
+    def finish(self, done: List[ClaimedJob], failed: List[Tuple[ClaimedJob, str]], now: datetime):
+        jobs = Job.__table__
+        db = SessionLocal()
+        try:
+            if done:
+                db.execute(
+                    update(jobs)
+                    .where(jobs.c.id.in_([job.id for job in done]))
+                    .values(status=JobStatus.DONE, locked_until=None, last_error=None)
+                )
+            if failed:
+                db.execute(
+                    update(jobs)
+                    .where(jobs.c.id == bindparam("b_id"))
+                    .values(
+                        status=bindparam("b_status"),
+                        run_at=bindparam("b_run_at"),
+                        last_error=bindparam("b_error"),
+                        locked_until=None,
+                    ),
+                    [
+                        {
+                            "b_id": job.id,
+                            "b_status": JobStatus.FAILED if job.attempts >= job.max_attempts else JobStatus.QUEUED,
+                            "b_run_at": now + retry_delay(job.attempts),
+                            "b_error": error[:2000],
+                        }
+                        for job, error in failed
+                    ]
+                )
+            db.commit()
+        finally:
+            db.close()
+    
+    def purge(self, done_before: datetime, failed_before: datetime) -> int:
+        db = SessionLocal()
+        try:
+            deleted = db.execute(
+                delete(Job).where(or_(
+                    and_(Job.status == JobStatus.DONE, Job.run_at < done_before),
+                    and_(Job.status == JobStatus.FAILED, Job.run_at < failed_before),
+                ))
+            ).rowcount
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class MemoryQueue:
+    """Jobs held in this process only."""
+    
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._due: List[Tuple[datetime, int, str]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+    
+    def add(self, db: Session, job: Job) -> bool:
+        # Handed over by _publish_memory_jobs once the session commits
+        db.info.setdefault("queued_jobs", []).append(job)
+        return True
+    
+    def exists(self, db: Session, dedupe_key: str) -> bool:
+        pending = db.info.get("queued_jobs", [])
+        with self._lock:
+            jobs = [*self.jobs.values(), *pending]
+        return any(job.dedupe_key == dedupe_key for job in jobs)
+    
+    def push(self, job: Job):
+        with self._lock:
+            # Another session may have committed the same key since exists()
+            if job.dedupe_key and any(
+                other.dedupe_key == job.dedupe_key and other.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+                for other in self.jobs.values()
+            ):
+                return
+            self.jobs[job.id] = job
+            heapq.heappush(self._due, (job.run_at, next(self._order), job.id))
+    
+    def claim(self, limit: int, now: datetime) -> List[ClaimedJob]:
+        claimed = []
+        with self._lock:
+            while self._due and len(claimed) < limit and self._due[0][0] <= now:
+                job = self.jobs[heapq.heappop(self._due)[2]]
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                claimed.append(ClaimedJob(id=job.id, kind=job.kind, payload=json.loads(job.payload),
+                                          attempts=job.attempts, max_attempts=job.max_attempts))
+        return claimed
+    
+    def finish(self, done: List[ClaimedJob], failed: List[Tuple[ClaimedJob, str]], now: datetime):
+        with self._lock:
+            for claimed in done:
+                self.jobs[claimed.id].status = JobStatus.DONE
+            for claimed, error in failed:
+                job = self.jobs[claimed.id]
+                job.last_error = error
+                if job.attempts >= job.max_attempts:
+                    job.status = JobStatus.FAILED
+                    continue
+                job.status = JobStatus.QUEUED
+                job.run_at = now + retry_delay(job.attempts)
+                heapq.heappush(self._due, (job.run_at, next(self._order), job.id))
+    
+    def purge(self, done_before: datetime, failed_before: datetime) -> int:
+        with self._lock:
+            finished = [
+                job.id for job in self.jobs.values()
+                if (job.status == JobStatus.DONE and job.run_at < done_before)
+                or (job.status == JobStatus.FAILED and job.run_at < failed_before)
+            ]
+            for job_id in finished:
+                del self.jobs[job_id]
+        return len(finished)
+
+
+# Global instance
+queue = MemoryQueue() if settings.JOB_QUEUE_BACKEND == "memory" else DatabaseQueue()
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    run_at: Optional[datetime] = None,
+    dedupe_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+) -> Optional[str]:
+    """Queue a job with ``db``'s transaction; returns its id, or None if ``dedupe_key`` is taken."""
+    if dedupe_key and queue.exists(db, dedupe_key):
+        return None
+    job = Job(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        payload=json.dumps(payload),
+        status=JobStatus.QUEUED,
+        run_at=run_at or datetime.now(timezone.utc),
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        dedupe_key=dedupe_key,
+    )
+    if not queue.add(db, job):
+        return None
+    return job.id
+
+
+def run_job(job: ClaimedJob):
+    func = HANDLERS.get(job.kind)
+    if func is None:
+        raise LookupError(f"No handler registered for job kind {job.kind!r}")
+    db = SessionLocal()
+    try:
+        with tracing.span(f"job {job.kind}", "consumer", {
+            "job.id": job.id,
+            "job.kind": job.kind,
+            "job.attempt": job.attempts,
+        }, root=True):
+            func(db, job.payload)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_jobs(func, claimed: List[ClaimedJob]) -> List[Optional[Exception]]:
+    """Run ``claimed`` through batch handler ``func``; an exception fails them all."""
+    db = SessionLocal()
+    try:
+        with tracing.span(f"job {claimed[0].kind}", "consumer", {
+            "job.kind": claimed[0].kind,
+            "job.batch_size": len(claimed),
+        }, root=True):
+            errors = func(db, claimed)
+            db.commit()
+        return errors
+    except Exception as e:
+        db.rollback()
+        return [e] * len(claimed)
+    finally:
+        db.close()
+
+
+def run_batch(now: Optional[datetime] = None) -> int:
+    """Claim and run up to JOB_BATCH_SIZE due jobs; returns how many were claimed."""
+    now = now or datetime.now(timezone.utc)
+    claimed = queue.claim(settings.JOB_BATCH_SIZE, now)
+    
+    results: List[Tuple[ClaimedJob, Optional[Exception]]] = []
+    batches: Dict[Callable, List[ClaimedJob]] = {}
+    for job in claimed:
+        func = BATCH_HANDLERS.get(job.kind)
+        if func is not None:
+            batches.setdefault(func, []).append(job)
+            continue
+        try:
+            run_job(job)
+            results.append((job, None))
+        except Exception as e:
+            results.append((job, e))
+    for func, group in batches.items():
+        results.extend(zip(group, run_jobs(func, group)))
+    
+    done, failed = [], []
+    for job, error in results:
+        if error is None:
+            done.append(job)
+            continue
+        failed.append((job, f"{type(error).__name__}: {error}"))
+        logger.error(
+            "Job %s %s failed (attempt %d/%d): %s", job.kind, job.id, job.attempts, job.max_attempts, error,
+            extra={"job_id": job.id, "job_kind": job.kind}
+        )
+    if claimed:
+        queue.finish(done, failed, datetime.now(timezone.utc))
+    return len(claimed)
+
+
+async def run_worker():
+    """Run due jobs, polling every JOB_POLL_SECONDS while the queue is idle."""
+    last_purge = None
+    while True:
+        try:
+            claimed = await asyncio.to_thread(run_batch)
+            if last_purge is None or monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                last_purge = monotonic()
+                now = datetime.now(timezone.utc)
+                await asyncio.to_thread(
+                    queue.purge,
+                    now - timedelta(days=settings.JOB_RETENTION_DAYS),
+                    now - timedelta(days=settings.JOB_FAILED_RETENTION_DAYS),
+                )
+        except Exception as e:
+            logger.exception("Job worker error: %s", e)
+            claimed = 0
+        
+        # A full batch means more are probably due
+        if claimed < settings.JOB_BATCH_SIZE:
+            await asyncio.sleep(settings.JOB_POLL_SECONDS)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_memory_jobs(session):
+    for job in session.info.pop("queued_jobs", []):
+        queue.push(job)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_memory_jobs(session):
+    session.info.pop("queued_jobs", None)
@@ -0,0 +1,186 @@
+"""Structured application logging.
+
+Modules log through ``logging.getLogger(__name__)``. configure_logging()
+routes everything under the ``app`` logger through a queue: the calling
+thread (often the event loop) only formats the message and enqueues it, and
+a listener thread does the writing to stdout. If the queue fills up, records
+are dropped and counted instead of blocking.
+
+Every record carries the request id (the caller's X-Request-ID, or one we
+made up) and the trace and span ids of the current span, so logs join up
+with traces. LOG_FORMAT is ``json`` (one object per line) or ``text``.
+LOG_LEVEL sets the default level and LOG_LEVELS overrides it per module, e.g.
+``LOG_LEVELS='{"app.database": "WARNING"}'``.
+
+High-volume messages can be sampled by passing ``extra={"sample_key": ...}``.
+The first LOG_SAMPLE_BURST records with a key in each LOG_SAMPLE_WINDOW_SECONDS
+are written. The rest are counted, and the next record written for that key
+reports how many were suppressed.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.core import tracing
+
+
+# The id of the request being handled (see the middleware in app.main)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_CONTEXT_ATTRIBUTES = ("request_id", "trace_id", "span_id")
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _STANDARD_ATTRIBUTES and key not in _CONTEXT_ATTRIBUTES and key != "sample_key"
+    }
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, ids and any extra fields."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in _CONTEXT_ATTRIBUTES:
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single lines for development, with the ids and extra fields appended."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = (
+            f"{datetime.fromtimestamp(record.created):%H:%M:%S} {record.levelname:<7} "
+            f"{record.name}: {record.getMessage()}"
+        )
+        fields = {key: getattr(record, key, None) for key in _CONTEXT_ATTRIBUTES}
+        fields.update(_extra_fields(record))
+        rendered = " ".join(f"{key}={value}" for key, value in fields.items() if value is not None)
+        if rendered:
+            line = f"{line} [{rendered}]"
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through LOG_SAMPLE_BURST records per ``sample_key`` per window."""
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[float, int, int]] = {}  # key -> (window start, passed, suppressed)
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            started, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= settings.LOG_SAMPLE_WINDOW_SECONDS:
+                started, passed = now, 0
+            if passed >= settings.LOG_SAMPLE_BURST:
+                self._windows[key] = (started, passed, suppressed + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """Captures the request and trace ids in the logging thread and enqueues without blocking."""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener thread has none of this context, and can't format
+        # arguments that may change after this returns
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id.get()
+        span = tracing.current_span()
+        if span is not None and getattr(record, "trace_id", None) is None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[ContextQueueHandler] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging():
+    """Set up the ``app`` logger from settings; later calls do nothing."""
+    global _listener, _handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+        
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+        
+        _handler = ContextQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter())
+        
+        logger = logging.getLogger("app")
+        logger.handlers = [_handler]
+        logger.setLevel(settings.LOG_LEVEL.upper())
+        logger.propagate = False
+        for name, level in settings.LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(level.upper())
+        
+        _listener = QueueListener(_handler.queue, output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out whatever is still queued and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
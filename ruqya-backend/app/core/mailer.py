@@ -0,0 +1,306 @@
+"""Outgoing email.
+
+EMAIL_BACKEND picks the provider: ``resend`` in production, ``smtp`` for a
+local catcher such as Mailpit or ``python -m aiosmtpd -n -l localhost:1025``,
+``console``, which prints messages and is the default without a Resend key,
+and ``fake``, which keeps sent messages in memory for tests and benchmarks.
+Emails are sent from background jobs (see app.core.notifications), never
+inline in a request.
+
+Messages go out in batches of up to EMAIL_BATCH_SIZE per provider call, and
+calls are paced by a token bucket (EMAIL_RATE_LIMIT_PER_SECOND, bursting to
+EMAIL_RATE_LIMIT_BURST). The bucket is per process, so the limit applies to
+each worker separately. Templates live in app/templates/email and are parsed
+once per process.
+"""
+import logging
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage as MIMEMessage
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.core import tracing
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "templates" / "email"
+
+RESEND_MAX_BATCH = 100
+
+
+@dataclass(frozen=True)
+class EmailMessage:
+    to: str
+    subject: str
+    html: str
+    text: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Fragment:
+    """Rendered HTML and text, inserted into other templates as-is."""
+    html: str
+    text: str
+    
+    @classmethod
+    def join(cls, fragments: List["Fragment"]) -> "Fragment":
+        return cls("\n".join(f.html for f in fragments), "\n".join(f.text for f in fragments))
+
+
+@lru_cache(maxsize=None)
+def _template(filename: str) -> Template:
+    return Template((TEMPLATE_DIR / filename).read_text(encoding="utf-8"))
+
+
+def render(name: str, /, **context) -> Fragment:
+    """Render ``name``.html (values escaped) and ``name``.txt."""
+    html = _template(f"{name}.html").substitute({
+        key: value.html if isinstance(value, Fragment) else escape(str(value))
+        for key, value in context.items()
+    })
+    text = _template(f"{name}.txt").substitute({
+        key: value.text if isinstance(value, Fragment) else str(value)
+        for key, value in context.items()
+    })
+    return Fragment(html.strip(), text.strip())
+
+
+def render_message(to: str, subject: str, template: str, /, **context) -> EmailMessage:
+    """An EmailMessage from ``template``, with the HTML wrapped in layout.html."""
+    body = render(template, **context)
+    return EmailMessage(to=to, subject=subject, html=_template("layout.html").substitute(body=body.html), text=body.text)
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, up to ``capacity`` at once."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1) -> float:
+        """Block until ``tokens`` are available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class ResendProvider:
+    name = "resend"
+    max_batch = RESEND_MAX_BATCH
+    
+    def send(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        import resend
+        
+        resend.api_key = settings.RESEND_API_KEY
+        params = []
+        for message in messages:
+            email = {
+                "from": settings.EMAIL_FROM,
+                "to": [message.to],
+                "subject": message.subject,
+                "html": message.html,
+            }
+            if message.text:
+                email["text"] = message.text
+            params.append(email)
+        # The batch endpoint accepts or rejects the whole call
+        if len(params) == 1:
+            resend.Emails.send(params[0])
+        else:
+            resend.Batch.send(params)
+        return [None] * len(messages)
+
+
+class SmtpProvider:
+    name = "smtp"
+    max_batch = None
+    
+    def send(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        errors = []
+        # One connection for the whole batch
+        with smtplib.SMTP(settings.EMAIL_SMTP_HOST, settings.EMAIL_SMTP_PORT, timeout=10) as smtp:
+            for message in messages:
+                mime = MIMEMessage()
+                mime["From"] = settings.EMAIL_FROM
+                mime["To"] = message.to
+                mime["Subject"] = message.subject
+                mime.set_content(message.text or message.subject)
+                mime.add_alternative(message.html, subtype="html")
+                try:
+                    smtp.send_message(mime)
+                    errors.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    errors.append(e)
+        return errors
+
+
+class ConsoleProvider:
+    name = "console"
+    max_batch = None
+    
+    def send(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        for message in messages:
+            logger.info("Email to %s: %s", message.to, message.subject, extra={"text": message.text})
+        return [None] * len(messages)
+
+
+class FakeProvider:
+    """Records messages instead of sending them.
+    
+    ``latency`` (seconds per call) stands in for the provider round-trip;
+    ``fail_calls`` makes the next that many calls raise.
+    """
+    name = "fake"
+    
+    def __init__(self, latency: float = 0.0, max_batch: Optional[int] = RESEND_MAX_BATCH):
+        self.latency = latency
+        self.max_batch = max_batch
+        self.fail_calls = 0
+        self.calls = 0
+        self.outbox: List[EmailMessage] = []
+        self._lock = threading.Lock()
+    
+    def send(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.fail_calls:
+                self.fail_calls -= 1
+                raise ConnectionError("Fake provider failure")
+            self.outbox.extend(messages)
+        return [None] * len(messages)
+
+
+PROVIDERS = {
+    "resend": ResendProvider,
+    "smtp": SmtpProvider,
+    "console": ConsoleProvider,
+    "fake": lambda: FakeProvider(latency=settings.EMAIL_FAKE_LATENCY_MS / 1000),
+}
+
+
+def backend_name() -> str:
+    if settings.EMAIL_BACKEND:
+        return settings.EMAIL_BACKEND
+    return "resend" if settings.RESEND_API_KEY else "console"
+
+
+class Mailer:
+    """Sends messages through one provider in rate-limited batches and counts the results."""
+    
+    def __init__(self, provider, batch_size: int, bucket: Optional[TokenBucket]):
+        self.provider = provider
+        self.batch_size = min(batch_size, provider.max_batch or batch_size)
+        self.bucket = bucket
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.provider_calls = 0
+        self.failed_calls = 0
+        self.throttled_seconds = 0.0
+        self.send_seconds = 0.0
+    
+    @classmethod
+    def from_settings(cls) -> "Mailer":
+        name = backend_name()
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown EMAIL_BACKEND: {name}")
+        bucket = None
+        if settings.EMAIL_RATE_LIMIT_PER_SECOND > 0:
+            bucket = TokenBucket(settings.EMAIL_RATE_LIMIT_PER_SECOND, max(1, settings.EMAIL_RATE_LIMIT_BURST))
+        return cls(PROVIDERS[name](), max(1, settings.EMAIL_BATCH_SIZE), bucket)
+    
+    def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """Send ``messages``; returns the error for each one, or None if it was accepted."""
+        errors: List[Optional[Exception]] = []
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            waited = self.bucket.acquire() if self.bucket else 0.0
+            started = time.perf_counter()
+            try:
+                with tracing.span("email.send", "client", {
+                    "email.backend": self.provider.name,
+                    "email.batch_size": len(chunk),
+                }):
+                    results = self.provider.send(chunk)
+                call_failed = False
+            except Exception as e:
+                results = [e] * len(chunk)
+                call_failed = True
+            elapsed = time.perf_counter() - started
+            
+            failures = sum(1 for error in results if error is not None)
+            with self._lock:
+                self.provider_calls += 1
+                self.failed_calls += call_failed
+                self.sent += len(chunk) - failures
+                self.failed += failures
+                self.throttled_seconds += waited
+                self.send_seconds += elapsed
+            errors.extend(results)
+        return errors
+    
+    def send(self, message: EmailMessage):
+        """Send one message; raises on failure."""
+        error = self.send_batch([message])[0]
+        if error is not None:
+            raise error
+    
+    def metrics(self) -> Dict[str, object]:
+        templates = _template.cache_info()
+        with self._lock:
+            return {
+                "backend": self.provider.name,
+                "sent": self.sent,
+                "failed": self.failed,
+                "provider_calls": self.provider_calls,
+                "failed_calls": self.failed_calls,
+                "average_batch_size": round((self.sent + self.failed) / self.provider_calls, 2) if self.provider_calls else 0.0,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "average_call_ms": round(self.send_seconds * 1000 / self.provider_calls, 2) if self.provider_calls else 0.0,
+                "template_cache_hits": templates.hits,
+                "template_cache_misses": templates.misses,
+            }
+
+
+_mailer: Optional[Mailer] = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer() -> Mailer:
+    """The process-wide Mailer, built from settings on first use."""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = Mailer.from_settings()
+        return _mailer
+
+
+def send_batch(messages: List[EmailMessage]) -> List[Optional[Exception]]:
+    return get_mailer().send_batch(messages)
+
+
+def send(message: EmailMessage):
+    get_mailer().send(message)
@@ -0,0 +1,303 @@
+"""Process metrics in the Prometheus text format, served at GET /metrics.
+
+Request metrics are recorded by middleware in app.main: counts, in-flight
+requests and a latency histogram labelled by method, route template (such
+as ``/api/v1/products/{product_id}``, never the raw path) and status, plus
+SQL statements, SQL time and slow queries per route.
+Recording one request is a dict lookup and a few integer increments. Pool,
+WebSocket and cache figures are read from their owners at scrape time.
+
+Every worker process keeps its own numbers; scrape each worker, or sum
+them in Prometheus. Outside development the endpoint is only served when
+METRICS_TOKEN is set, and scrapers must send it as a bearer token.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cached reads (~1ms) through slow writes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+        name = f"{name}{{{rendered}}}"
+    if value == int(value):
+        return f"{name} {int(value)}"
+    return f"{name} {value}"
+
+
+class Metric:
+    type = "untyped"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+    
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (the last one is +Inf) and the sum
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = 0.0
+            counts[index] += 1
+            self._sums[labels] += value
+    
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            snapshot = [(labels, list(counts), self._sums[labels]) for labels, counts in self._counts.items()]
+        for labels, counts, total in snapshot:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", {**base, "le": le}, cumulative
+            yield f"{self.name}_count", base, cumulative
+            yield f"{self.name}_sum", base, total
+
+
+class Registry:
+    """Metrics recorded as things happen, plus collectors read at scrape time."""
+    
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]] = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def collector(self, func):
+        """Register ``func`` returning (name, type, help, samples) families; usable as a decorator."""
+        self._collectors.append(func)
+        return func
+    
+    def render(self) -> str:
+        lines = []
+        
+        def family(name: str, kind: str, help: str, samples: Iterable[Sample]):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_format(*sample) for sample in samples)
+        
+        for metric in self._metrics:
+            family(metric.name, metric.type, metric.help, metric.samples())
+        for collect in self._collectors:
+            try:
+                for name, kind, help, samples in collect():
+                    family(name, kind, help, list(samples))
+            except Exception as e:
+                logger.exception("Metrics collector %s failed: %s", collect.__name__, e)
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled"
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+
+http_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements per HTTP request", ("method", "route"), QUERY_COUNT_BUCKETS
+))
+http_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ("method", "route")
+))
+slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("method", "route")
+))
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, queries=None):
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(seconds, method, route, str(status))
+    if queries is not None:
+        http_db_queries.observe(queries.count, method, route)
+        http_db_time.observe(queries.seconds, method, route)
+        if queries.slow:
+            slow_queries.inc(method, route, amount=len(queries.slow))
+
+
+def route_template(app, scope) -> str:
+    """The path template of the route that handled ``scope``, or a fixed placeholder."""
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        templates = _route_templates(app)
+        if endpoint in templates:
+            return templates[endpoint]
+    for prefix in _mount_prefixes(app):
+        if scope.get("path", "").startswith(prefix + "/"):
+            return prefix + "/{path}"
+    return "<unmatched>"
+
+
+_templates: Dict[int, Dict[object, str]] = {}
+
+
+def _route_templates(app) -> Dict[object, str]:
+    # Built once per app; routes don't change after startup
+    templates = _templates.get(id(app))
+    if templates is None:
+        templates = {}
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is not None and hasattr(route, "path"):
+                templates.setdefault(endpoint, route.path)
+        _templates[id(app)] = templates
+    return templates
+
+
+def _mount_prefixes(app) -> List[str]:
+    return [route.path for route in app.routes if getattr(route, "endpoint", None) is None and getattr(route, "path", "")]
+
+
+def cache_families(caches: Dict[str, Tuple[int, int]]):
+    """Hit and miss counters for named caches; the ratio is hits / (hits + misses)."""
+    yield ("cache_hits_total", "counter", "Cache lookups answered from the cache",
+           [("cache_hits_total", {"cache": name}, hits) for name, (hits, _) in caches.items()])
+    yield ("cache_misses_total", "counter", "Cache lookups that had to load",
+           [("cache_misses_total", {"cache": name}, misses) for name, (_, misses) in caches.items()])
+
+
+@registry.collector
+def database_pool():
+    from app.database import engine
+    
+    pool = engine.pool
+    stats = (
+        ("size", "Connections the pool keeps open"),
+        ("checkedout", "Connections in use"),
+        ("checkedin", "Idle connections in the pool"),
+        ("overflow", "Connections open beyond the pool size"),
+    )
+    for stat, help in stats:
+        # Not every pool class (e.g. SQLite's) reports all of these
+        if hasattr(pool, stat):
+            name = f"db_pool_{stat}"
+            yield name, "gauge", help, [(name, {}, getattr(pool, stat)())]
+
+
+@registry.collector
+def websockets():
+    from app.core.websocket_manager import manager
+    from app.core.dashboard import dashboard_cache
+    
+    yield ("websocket_connections", "gauge", "Open WebSocket connections", [
+        ("websocket_connections", {"channel": "chat"}, manager.connection_count()),
+        ("websocket_connections", {"channel": "admin_dashboard"}, dashboard_cache.subscribers.connection_count()),
+    ])
+    yield ("websocket_chat_sessions", "gauge", "Chat sessions with a connected client", [
+        ("websocket_chat_sessions", {}, len(manager.active_connections)),
+    ])
+
+
+@registry.collector
+def caches():
+    from app.core.availability import availability_cache
+    from app.core.dashboard import dashboard_cache
+    from app.core.mailer import _template
+    from app.core.principals import principal_cache
+    from app.core.revocation import revocation_list
+    
+    templates = _template.cache_info()
+    revocations = revocation_list.metrics()
+    yield from cache_families({
+        "principal": (principal_cache.hits, principal_cache.misses),
+        "availability_day": (availability_cache.hits, availability_cache.misses),
+        "dashboard": (dashboard_cache.hits, dashboard_cache.misses),
+        "email_template": (templates.hits, templates.misses),
+        # A hit is a token the Bloom filter cleared without a dict lookup
+        "token_revocation_filter": (revocations["checks"] - revocations["bloom_hits"], revocations["bloom_hits"]),
+    })
+
+
+@registry.collector
+def login_attempts():
+    from app.core.throttling import login_throttle
+    
+    counters = login_throttle.metrics()
+    yield ("login_attempts_total", "counter", "Login attempts by outcome", [
+        ("login_attempts_total", {"outcome": outcome}, counters[outcome])
+        for outcome in ("rejected_ip", "rejected_email", "rejected_backoff", "succeeded", "failed")
+    ])
+
+
+@registry.collector
+def telemetry():
+    from app.core.logs import dropped_records
+    from app.core.tracing import exporter
+    
+    yield ("log_records_dropped_total", "counter", "Log records dropped because the log queue was full", [
+        ("log_records_dropped_total", {}, dropped_records()),
+    ])
+    yield ("trace_spans_exported_total", "counter", "Spans exported to the trace backend", [
+        ("trace_spans_exported_total", {}, exporter.exported),
+    ])
+    yield ("trace_spans_dropped_total", "counter", "Spans dropped by a full queue or a failed export", [
+        ("trace_spans_dropped_total", {}, exporter.dropped),
+    ])
@@ -0,0 +1,154 @@
+"""Transactional emails, sent from background jobs.
+
+The ``queue_*`` functions run inside the request's transaction and store only
+ids. Each job loads current data when it runs, so a reminder for a cancelled
+or rescheduled appointment is skipped rather than sent stale, and reset
+tokens are minted at send time instead of sitting in the jobs table.
+
+Email jobs claimed together are rendered first and sent as one batch
+through app.core.mailer.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.config import settings
+from app.models.appointment import Appointment
+from app.models.order import Order, OrderItem
+from app.models.user import User
+from app.core import jobs, mailer
+from app.core.availability import BLOCKING_STATUSES, to_utc
+from app.core.security import create_password_reset_token
+
+
+ORDER_CONFIRMATION = "email.order_confirmation"
+APPOINTMENT_REMINDER = "email.appointment_reminder"
+PASSWORD_RESET = "email.password_reset"
+
+
+# kind -> render(db, payload) returning the message, or None to skip it
+RENDERERS: Dict[str, Callable[[Session, dict], Optional[mailer.EmailMessage]]] = {}
+
+
+def renders(kind: str):
+    def register(func):
+        RENDERERS[kind] = func
+        return func
+    return register
+
+
+def queue_order_confirmation(db: Session, order: Order):
+    jobs.enqueue(db, ORDER_CONFIRMATION, {"order_id": order.id})
+
+
+def queue_appointment_reminder(db: Session, appointment: Appointment, now: Optional[datetime] = None):
+    """Schedule a reminder APPOINTMENT_REMINDER_HOURS before an active booking."""
+    if settings.APPOINTMENT_REMINDER_HOURS <= 0 or appointment.status not in BLOCKING_STATUSES:
+        return
+    now = now or datetime.now(timezone.utc)
+    starts_at = to_utc(appointment.appointment_date)
+    if starts_at <= now:
+        return
+    
+    jobs.enqueue(
+        db,
+        APPOINTMENT_REMINDER,
+        {"appointment_id": appointment.id, "starts_at": starts_at.isoformat()},
+        run_at=max(now, starts_at - timedelta(hours=settings.APPOINTMENT_REMINDER_HOURS)),
+        dedupe_key=f"{APPOINTMENT_REMINDER}:{appointment.id}:{starts_at.isoformat()}"
+    )
+
+
+def queue_password_reset(db: Session, user: User):
+    jobs.enqueue(db, PASSWORD_RESET, {"user_id": user.id})
+
+
+@renders(ORDER_CONFIRMATION)
+def order_confirmation(db: Session, payload: dict) -> Optional[mailer.EmailMessage]:
+    order = db.query(Order).options(
+        selectinload(Order.items).selectinload(OrderItem.product)
+    ).filter(Order.id == payload["order_id"]).first()
+    if not order:
+        return None
+    
+    items = mailer.Fragment.join([
+        mailer.render(
+            "order_item",
+            quantity=item.quantity,
+            name=item.product.name if item.product else "Item",
+            price=item.price,
+        )
+        for item in order.items
+    ])
+    return mailer.render_message(
+        order.customer_email,
+        f"Order {order.order_number} received",
+        "order_confirmation",
+        customer_name=order.customer_name,
+        order_number=order.order_number,
+        items=items,
+        total=order.total_amount,
+    )
+
+
+@renders(APPOINTMENT_REMINDER)
+def appointment_reminder(db: Session, payload: dict) -> Optional[mailer.EmailMessage]:
+    appointment = db.query(Appointment).options(
+        joinedload(Appointment.service)
+    ).filter(Appointment.id == payload["appointment_id"]).first()
+    # Skip bookings cancelled or moved since the reminder was scheduled
+    if (
+        not appointment
+        or appointment.status not in BLOCKING_STATUSES
+        or to_utc(appointment.appointment_date).isoformat() != payload["starts_at"]
+    ):
+        return None
+    
+    local_start = to_utc(appointment.appointment_date).astimezone(ZoneInfo(settings.BOOKING_TIMEZONE))
+    return mailer.render_message(
+        appointment.user_email,
+        f"Reminder: {appointment.service.title} on {local_start:%A %d %B}",
+        "appointment_reminder",
+        user_name=appointment.user_name,
+        service=appointment.service.title,
+        starts_at=f"{local_start:%A %d %B %Y at %H:%M}",
+        timezone=settings.BOOKING_TIMEZONE,
+    )
+
+
+@renders(PASSWORD_RESET)
+def password_reset(db: Session, payload: dict) -> Optional[mailer.EmailMessage]:
+    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    if not user or not user.is_active:
+        return None
+    
+    return mailer.render_message(
+        user.email,
+        "Reset your password",
+        "password_reset",
+        greeting=f"Assalamu alaikum {user.full_name}," if user.full_name else "Assalamu alaikum,",
+        link=f"{settings.FRONTEND_URL.rstrip('/')}/reset-password?token={create_password_reset_token(user)}",
+        expires_minutes=settings.PASSWORD_RESET_EXPIRE_MINUTES,
+    )
+
+
+@jobs.batch_handler(*RENDERERS)
+def send_emails(db: Session, claimed: List[jobs.ClaimedJob]) -> List[Optional[Exception]]:
+    """Render every claimed email job, then send them in as few provider calls as possible."""
+    errors: List[Optional[Exception]] = [None] * len(claimed)
+    messages, positions = [], []
+    for position, job in enumerate(claimed):
+        try:
+            message = RENDERERS[job.kind](db, job.payload)
+        except Exception as e:
+            errors[position] = e
+            continue
+        if message is not None:
+            messages.append(message)
+            positions.append(position)
+    
+    for position, error in zip(positions, mailer.send_batch(messages)):
+        errors[position] = error
+    return errors
@@ -0,0 +1,93 @@
+"""Human-friendly, collision-free order numbers.
+
+Numbers look like ``ORD-20261019-00042``: the UTC day plus a per-day counter
+kept in ``order_number_sequences``. Each worker reserves a block of
+ORDER_NUMBER_BLOCK_SIZE numbers with one atomic upsert and hands them out from
+memory, so most orders need no database round-trip. Blocks never overlap, so
+numbers are unique without retries. Numbers from a block that a worker never
+used are skipped, so the sequence can have gaps.
+"""
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models.order import OrderNumberSequence
+
+
+# Blocks are reserved on a dedicated connection: the request asking for a
+# number already holds one from the main pool, and waiting on that pool for a
+# second would deadlock once every connection is held by such a request
+sequence_engine = create_engine(settings.DATABASE_URL, pool_size=1, max_overflow=0, pool_pre_ping=True)
+SequenceSession = sessionmaker(autocommit=False, autoflush=False, bind=sequence_engine)
+
+
+def format_order_number(day: date, value: int) -> str:
+    return f"ORD-{day:%Y%m%d}-{value:05d}"
+
+
+def reserve_block(day: date, size: int) -> int:
+    """Reserve ``size`` numbers for ``day`` and return the first one.
+    
+    Runs in its own transaction so the block stays reserved even if the order
+    that triggered it is rolled back.
+    """
+    db = SequenceSession()
+    try:
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            stmt = dialect_insert(OrderNumberSequence).values(day=day, next_value=1 + size)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[OrderNumberSequence.day],
+                set_={"next_value": OrderNumberSequence.next_value + size},
+            ).returning(OrderNumberSequence.next_value)
+            end = db.execute(stmt).scalar_one()
+        else:
+            # Generic fallback for databases without an upsert
+            row = db.get(OrderNumberSequence, day, with_for_update=True)
+            if row is None:
+                row = OrderNumberSequence(day=day, next_value=1)
+                db.add(row)
+            row.next_value += size
+            end = row.next_value
+        db.commit()
+        return end - size
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class OrderNumberAllocator:
+    """Hands out order numbers from a block reserved for the current day."""
+    
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._next = 0
+        self._end = 0
+    
+    def next(self) -> str:
+        day = datetime.utcnow().date()
+        with self._lock:
+            if day != self._day or self._next >= self._end:
+                size = max(1, self.block_size or settings.ORDER_NUMBER_BLOCK_SIZE)
+                self._next = reserve_block(day, size)
+                self._end = self._next + size
+                self._day = day
+            value = self._next
+            self._next += 1
+        return format_order_number(day, value)
+
+
+# Global instance
+order_number_allocator = OrderNumberAllocator()
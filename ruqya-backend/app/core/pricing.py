@@ -0,0 +1,102 @@
+"""Exact order pricing.
+
+Money columns are ``Numeric(12, 2)`` and come back as ``Decimal``. A cart is
+priced in a single pass over integer minor units (cents), so totals never pick
+up float rounding error. Discounts and tax are rounded half-up per line and
+the line amounts are summed, so the total always equals the sum of the lines.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, Optional, Tuple, Union
+
+from app.config import settings
+
+
+CENT = Decimal("0.01")
+
+Amount = Union[Decimal, float, int, str]
+
+
+def to_money(amount: Amount) -> Decimal:
+    """Two-place Decimal for ``amount`` (floats are read via their shortest repr)."""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_minor(amount: Amount) -> int:
+    return int(to_money(amount).scaleb(2))
+
+
+def from_minor(minor: int) -> Decimal:
+    return Decimal(minor).scaleb(-2)
+
+
+def _apply_rate(minor: int, rate: Tuple[int, int]) -> int:
+    """``minor * rate`` rounded half-up, in integer arithmetic."""
+    numerator, denominator = rate
+    return (2 * minor * numerator + denominator) // (2 * denominator)
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    product_id: str
+    quantity: int
+    unit_price: Decimal
+    subtotal: Decimal
+    discount: Decimal
+    tax: Decimal
+    total: Decimal
+
+
+@dataclass(frozen=True)
+class Quote:
+    lines: List[PricedLine]
+    subtotal: Decimal
+    discount: Decimal
+    tax: Decimal
+    total: Decimal
+
+
+def price_cart(
+    lines: Iterable[Tuple[str, int, Amount]],
+    discount_rate: Amount = 0,
+    tax_rate: Optional[Amount] = None,
+) -> Quote:
+    """Price ``(product_id, quantity, unit_price)`` lines.
+    
+    ``discount_rate`` comes off each line before tax; ``tax_rate`` defaults to
+    ORDER_TAX_RATE. Both are fractions (``0.2`` for 20%).
+    """
+    # Rates as exact integer ratios so each line is priced without Decimal math
+    discount_rate = Decimal(str(discount_rate)).as_integer_ratio()
+    tax_rate = Decimal(str(settings.ORDER_TAX_RATE if tax_rate is None else tax_rate)).as_integer_ratio()
+    
+    priced = []
+    subtotal = discount = tax = 0
+    for product_id, quantity, unit_price in lines:
+        unit_minor = to_minor(unit_price)
+        line_subtotal = unit_minor * quantity
+        line_discount = _apply_rate(line_subtotal, discount_rate) if discount_rate[0] else 0
+        line_tax = _apply_rate(line_subtotal - line_discount, tax_rate) if tax_rate[0] else 0
+        
+        subtotal += line_subtotal
+        discount += line_discount
+        tax += line_tax
+        priced.append(PricedLine(
+            product_id=product_id,
+            quantity=quantity,
+            unit_price=from_minor(unit_minor),
+            subtotal=from_minor(line_subtotal),
+            discount=from_minor(line_discount),
+            tax=from_minor(line_tax),
+            total=from_minor(line_subtotal - line_discount + line_tax),
+        ))
+    
+    return Quote(
+        lines=priced,
+        subtotal=from_minor(subtotal),
+        discount=from_minor(discount),
+        tax=from_minor(tax),
+        total=from_minor(subtotal - discount + tax),
+    )
@@ -0,0 +1,93 @@
+"""Cached identity of authenticated callers.
+
+Authorization only needs who the caller is, their role and whether the
+account is active, so ``get_current_user`` resolves a small ``Principal``
+instead of loading the user row on every request. Principals are cached per
+process for PRINCIPAL_CACHE_SECONDS and dropped as soon as this process
+changes the user's role, status or password. Other workers pick the change
+up when their entry expires.
+
+With AUTH_TRUST_TOKEN_CLAIMS on, an access token's own ``role``/``active``
+claims stand in for the lookup on a cache miss, unless the user changed after
+the token was issued. A change made on another worker then takes effect only
+as that worker's tokens expire (ACCESS_TOKEN_EXPIRE_MINUTES).
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.models.user import User, UserRole
+
+
+# Invalidation marks are kept as long as a token issued before them is valid
+MARK_RETENTION_SECONDS = 24 * 3600
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    role: UserRole
+    is_active: bool
+
+
+class PrincipalCache:
+    """Process-local user id -> Principal cache with explicit invalidation."""
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Principal, float]] = {}
+        self._changed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and time.monotonic() < entry[1]:
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+    
+    def put(self, user: User) -> Principal:
+        principal = Principal(id=user.id, role=user.role, is_active=user.is_active)
+        if settings.PRINCIPAL_CACHE_SECONDS > 0:
+            with self._lock:
+                self._entries[user.id] = (principal, time.monotonic() + settings.PRINCIPAL_CACHE_SECONDS)
+        return principal
+    
+    def from_claims(self, payload: dict) -> Optional[Principal]:
+        """Principal from an access token's claims, or None if they can't be trusted."""
+        if not settings.AUTH_TRUST_TOKEN_CLAIMS or "role" not in payload or "active" not in payload:
+            return None
+        with self._lock:
+            changed_at = self._changed_at.get(payload["sub"])
+        # Claims minted before (or in the same second as) a change are stale
+        if changed_at is not None and payload.get("iat", 0) <= changed_at:
+            return None
+        try:
+            role = UserRole(payload["role"])
+        except ValueError:
+            return None
+        return Principal(id=payload["sub"], role=role, is_active=bool(payload["active"]))
+    
+    def invalidate(self, user_id: str):
+        """Forget ``user_id`` after its role, status or password changed."""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._changed_at[user_id] = now
+            if len(self._changed_at) > 1000:
+                cutoff = now - MARK_RETENTION_SECONDS
+                self._changed_at = {key: at for key, at in self._changed_at.items() if at > cutoff}
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance
+principal_cache = PrincipalCache()
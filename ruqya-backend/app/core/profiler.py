@@ -0,0 +1,205 @@
+"""On-demand sampling profiler.
+
+A daemon thread snapshots every thread's Python stack each
+PROFILER_INTERVAL_MS and counts identical stacks. Profiles are saved to
+PROFILER_DIR in the folded format ("thread;outer;...;inner count") that
+flamegraph.pl, speedscope and most flame graph viewers read.
+
+Two ways to start one, both admin-only:
+
+- send ``X-Profile: 1`` with an admin access token; that request is profiled
+  and the response carries ``X-Profile-Id``;
+- ``POST /admin/profiler?seconds=N`` profiles the worker that handles it
+  for N seconds.
+
+Samples cover the whole worker, so concurrent requests show up in a
+request's profile too. Time a thread spends parked (an idle event loop or
+thread pool) is left out. One profile runs per worker at a time; when
+nothing is being profiled the only cost is a header lookup per request.
+"""
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.core.security import decode_token, get_principal
+from app.database import SessionLocal
+from app.models.user import UserRole
+
+
+HEADER = "x-profile"
+PROFILE_ID = re.compile(r"^[0-9]{14}-[0-9a-f]{8}$")
+
+# Leaf frames of threads waiting for work rather than doing any
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures, blocked in its work queue
+    ("_thread.py", "run"),  # anyio's worker threads
+}
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILER_DIR)
+
+
+def new_profile_id() -> str:
+    return f"{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class Sampler:
+    """Samples the stacks of every other thread until stopped."""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+    
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or _is_idle(frame):
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+    
+    def stop(self) -> str:
+        """Stop sampling and return the profile in folded format."""
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """Runs at most one Sampler per worker and saves what it collects."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Optional[Sampler] = None
+    
+    def start(self) -> Optional[Sampler]:
+        """A running Sampler, or None if this worker is already profiling."""
+        with self._lock:
+            if self._active is not None:
+                return None
+            self._active = Sampler(settings.PROFILER_INTERVAL_MS / 1000).start()
+            return self._active
+    
+    def finish(self, sampler: Sampler, profile_id: Optional[str] = None) -> str:
+        """Stop ``sampler``, save its profile and return the profile's id."""
+        try:
+            folded = sampler.stop()
+        finally:
+            with self._lock:
+                self._active = None
+        profile_id = profile_id or new_profile_id()
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{profile_id}.folded").write_text(folded, encoding="utf-8")
+        self._prune(directory)
+        return profile_id
+    
+    def run_for(self, seconds: float) -> Optional[str]:
+        """Profile this worker for ``seconds`` in the background; returns the id the profile will have."""
+        sampler = self.start()
+        if sampler is None:
+            return None
+        profile_id = new_profile_id()
+        timer = threading.Timer(seconds, self.finish, args=(sampler, profile_id))
+        timer.daemon = True
+        timer.start()
+        return profile_id
+    
+    @staticmethod
+    def _prune(directory: Path):
+        profiles = sorted(directory.glob("*.folded"))
+        for path in profiles[:max(0, len(profiles) - settings.PROFILER_KEEP)]:
+            path.unlink(missing_ok=True)
+
+
+# Global instance
+profiler = Profiler()
+
+
+def is_admin_request(request: Request) -> bool:
+    """Whether ``request`` carries a valid access token of an active admin."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        return False
+    if payload.get("type") != "access" or not payload.get("sub"):
+        return False
+    db = SessionLocal()
+    try:
+        principal = get_principal(db, payload["sub"], payload)
+    finally:
+        db.close()
+    return principal is not None and principal.is_active and principal.role == UserRole.ADMIN
+
+
+def start_for_request(request: Request) -> Optional[Sampler]:
+    """A Sampler for a request that asked to be profiled, if it may be."""
+    if request.headers.get(HEADER, "").lower() not in ("1", "true", "yes"):
+        return None
+    if not is_admin_request(request):
+        return None
+    return profiler.start()
+
+
+def list_profiles() -> List[dict]:
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*.folded"), reverse=True):
+        stat = path.stat()
+        profiles.append({
+            "id": path.stem,
+            "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            "size_bytes": stat.st_size,
+        })
+    return profiles
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.folded"
+    return path.read_text(encoding="utf-8") if path.is_file() else None
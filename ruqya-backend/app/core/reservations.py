@@ -0,0 +1,124 @@
+"""Time-limited stock holds for pending orders.
+
+``create_order`` decrements stock up front and stamps the order with
+``reserved_until``. Moving the order on (processing, shipped, delivered)
+converts the hold into a sale by clearing the stamp; cancelling it returns the
+stock. Pending orders whose hold lapses are cancelled by the sweeper, which
+returns their stock in bulk so abandoned checkouts don't keep products out of
+stock.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.core import rollups
+
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+
+def hold_expiry(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Expiry for a new hold, or None when holds never expire."""
+    if settings.ORDER_RESERVATION_MINUTES <= 0:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return now + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+
+
+def release_stock(db: Session, quantities: Dict[str, int]):
+    """Return ``quantities`` (product id -> units) to stock in one statement."""
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+    products = Product.__table__
+    db.execute(
+        update(products)
+        .where(products.c.id == bindparam("b_id"))
+        .values(stock_quantity=products.c.stock_quantity + bindparam("b_qty")),
+        [{"b_id": product_id, "b_qty": quantity} for product_id, quantity in quantities.items()]
+    )
+
+
+def reserved_quantities(db: Session, order_ids: Iterable[str]) -> Dict[str, int]:
+    """Units per product held by ``order_ids``."""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    return dict(
+        db.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(order_ids))
+            .group_by(OrderItem.product_id)
+        ).all()
+    )
+
+
+def release_expired(db: Session, now: Optional[datetime] = None, limit: int = SWEEP_BATCH_SIZE) -> int:
+    """Cancel up to ``limit`` pending orders whose hold has lapsed and restock them.
+    
+    The status flip is a conditional UPDATE, so an order converted or
+    cancelled concurrently is never released twice.
+    """
+    now = now or datetime.now(timezone.utc)
+    expired_ids = select(Order.id).where(
+        Order.status == OrderStatus.PENDING,
+        Order.reserved_until <= now
+    ).order_by(Order.reserved_until).limit(limit)
+    
+    released = db.execute(
+        update(Order.__table__)
+        .where(
+            Order.__table__.c.id.in_(expired_ids.scalar_subquery()),
+            Order.__table__.c.status == OrderStatus.PENDING,
+            Order.__table__.c.reserved_until <= now
+        )
+        .values(status=OrderStatus.CANCELLED, reserved_until=None)
+        .returning(Order.__table__.c.id, Order.__table__.c.total_amount, Order.__table__.c.created_at)
+    ).all()
+    if not released:
+        return 0
+    
+    release_stock(db, reserved_quantities(db, [order.id for order in released]))
+    for order in released:
+        rollups.record_order_status_change(db, order, OrderStatus.PENDING, OrderStatus.CANCELLED)
+    return len(released)
+
+
+def sweep() -> int:
+    """Release every lapsed hold, one batch per transaction."""
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            released = release_expired(db)
+            db.commit()
+            total += released
+            if released < SWEEP_BATCH_SIZE:
+                return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_reservation_sweeper():
+    """Release lapsed holds every ORDER_RESERVATION_SWEEP_SECONDS."""
+    while True:
+        try:
+            released = await asyncio.to_thread(sweep)
+            if released:
+                logger.info("Released stock held by %d expired orders", released)
+        except Exception as e:
+            logger.exception("Reservation sweep failed: %s", e)
+        await asyncio.sleep(settings.ORDER_RESERVATION_SWEEP_SECONDS)
@@ -0,0 +1,58 @@
+"""JSON responses serialized in one pass by pydantic-core.
+
+When an endpoint returns models, FastAPI dumps them to dicts, validates the
+dicts against ``response_model`` again and then encodes the result, on top
+of the ``model_validate`` call the endpoint already made per row. For list
+pages that is most of the request's CPU time.
+
+json_response() validates ORM rows straight into ``schema`` with one cached
+TypeAdapter (from_attributes, so no per-row model_validate) and has
+pydantic-core write the JSON bytes. It returns a Response, which FastAPI
+passes through untouched. Keep ``response_model`` on the route for the
+OpenAPI schema; the output is the same JSON FastAPI would have produced.
+
+Other endpoints go through ORJSONResponse, the app's default response class.
+
+List queries can use schema_columns() to load only the columns a schema
+serializes, so summaries skip large Text columns such as Article.content.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+
+@lru_cache(maxsize=None)
+def adapter(schema) -> TypeAdapter:
+    """The TypeAdapter for ``schema`` (a model or a type like ``List[Model]``), built once."""
+    return TypeAdapter(schema)
+
+
+def json_response(
+    schema,
+    data: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """``data`` (ORM objects, dicts or models) validated against ``schema`` and serialized as JSON."""
+    schema_adapter = adapter(schema)
+    body = schema_adapter.dump_json(schema_adapter.validate_python(data, from_attributes=True))
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+@lru_cache(maxsize=None)
+def _serialized_columns(model, schema) -> tuple:
+    return tuple(column.key for column in inspect(model).column_attrs if column.key in schema.model_fields)
+
+
+def schema_columns(model, schema):
+    """A ``load_only`` option for the columns of ``model`` that ``schema`` reads.
+    
+    Other columns are deferred and would be loaded one row at a time if
+    touched, so only use it on rows that go straight to ``schema``.
+    Relationships are not affected; eager-load them separately.
+    """
+    return load_only(*(getattr(model, key) for key in _serialized_columns(model, schema)))
@@ -0,0 +1,213 @@
+"""Revoked JWTs.
+
+Access and refresh tokens carry a ``jti``. Logging out revokes the tokens
+presented, and refreshing revokes the refresh token it used, so every refresh
+token works once. Revocations are rows in revoked_tokens until the token
+would have expired anyway.
+
+decode_token checks tokens against a per-process copy of that table, so the
+check costs no query: a Bloom filter answers "never revoked" for almost
+every token without touching the dict of revoked ids behind it, and a
+background task pulls new rows every REVOCATION_SYNC_SECONDS. A revocation
+takes effect at once on the worker that made it and within that interval on
+the others.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.revoked_token import RevokedToken
+
+
+logger = logging.getLogger(__name__)
+
+BLOOM_ERROR_RATE = 0.01
+# Rows are re-read this far behind the last sync, for transactions that
+# committed late and for clock skew between workers
+SYNC_OVERLAP_SECONDS = 60
+PRUNE_INTERVAL_SECONDS = 600
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about ``error_rate`` false positives."""
+    
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+    
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """This process's copy of revoked_tokens."""
+    
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}  # jti -> the token's exp (epoch seconds)
+        self._bloom = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY)
+        self._lock = threading.Lock()
+        self._synced_at: Optional[datetime] = None
+        self._pruned_at = time.monotonic()
+        # Updated without the lock to keep checks cheap, so approximate
+        self.checks = 0
+        self.bloom_hits = 0
+        self.rejected = 0
+    
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Whether ``jti`` was revoked; tokens issued without one never are."""
+        if not jti:
+            return False
+        self.checks += 1
+        # Bits are only ever set, and a rebuild swaps in a whole new filter
+        if jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        expires = self._expiry.get(jti)
+        if expires is None or expires <= time.time():
+            return False
+        self.rejected += 1
+        return True
+    
+    def _add(self, jti: str, expires: float):
+        self._expiry[jti] = expires
+        self._bloom.add(jti)
+        if len(self._expiry) > self._bloom.capacity:
+            self._rebuild()
+    
+    def _rebuild(self):
+        """Drop expired ids and refill a filter sized for the rest (bits can't be removed)."""
+        now = time.time()
+        self._expiry = {jti: expires for jti, expires in self._expiry.items() if expires > now}
+        bloom = BloomFilter(max(settings.REVOCATION_BLOOM_CAPACITY, 2 * len(self._expiry)))
+        for jti in self._expiry:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._pruned_at = time.monotonic()
+    
+    def revoke(self, db: Session, payload: dict) -> bool:
+        """Revoke the token ``payload`` was decoded from, committing ``db``.
+        
+        Returns False if it was already revoked, which is what makes refresh
+        token rotation single-use even when two refreshes race.
+        """
+        jti = payload.get("jti")
+        if not jti:
+            # Issued before tokens carried an id; nothing to record
+            return True
+        expires = float(payload["exp"])
+        db.add(RevokedToken(
+            jti=jti,
+            user_id=payload.get("sub"),
+            token_type=payload.get("type", "access"),
+            expires_at=datetime.fromtimestamp(expires, timezone.utc),
+            revoked_at=datetime.now(timezone.utc)
+        ))
+        try:
+            db.commit()
+            revoked = True
+        except IntegrityError:
+            db.rollback()
+            revoked = False
+        with self._lock:
+            self._add(jti, expires)
+        return revoked
+    
+    def sync(self) -> int:
+        """Load revocations made since the last sync (all unexpired ones the first time)."""
+        started = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > started)
+            if self._synced_at is not None:
+                query = query.filter(
+                    RevokedToken.revoked_at >= self._synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+                )
+            rows = query.all()
+        finally:
+            db.close()
+        
+        with self._lock:
+            for jti, expires_at in rows:
+                self._add(jti, _aware(expires_at).timestamp())
+            if time.monotonic() - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                self._rebuild()
+        self._synced_at = started
+        return len(rows)
+    
+    def clear(self):
+        with self._lock:
+            self._expiry = {}
+            self._bloom = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY)
+            self._synced_at = None
+    
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "revoked": len(self._expiry),
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "rejected": self.rejected,
+            "synced_at": self._synced_at,
+        }
+
+
+def purge_expired() -> int:
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))
+        ).rowcount
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# Global instance
+revocation_list = RevocationList()
+
+
+async def run_revocation_sync():
+    """Pull new revocations every REVOCATION_SYNC_SECONDS and purge expired rows hourly."""
+    last_purge = None
+    while True:
+        try:
+            await asyncio.to_thread(revocation_list.sync)
+            if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                last_purge = time.monotonic()
+                await asyncio.to_thread(purge_expired)
+        except Exception as e:
+            logger.exception("Token revocation sync failed: %s", e)
+        await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
@@ -0,0 +1,307 @@
+"""Daily activity rollups for admin analytics.
+
+Write paths call the ``record_*`` helpers inside their own transaction so the
+``daily_stats`` row for the affected day is adjusted atomically with the
+change. ``rebuild`` recomputes a date range from the raw tables; it runs
+nightly over the last few days to correct any drift (for example rows written
+by scripts that bypass the API) and backfills history on first start.
+
+Days are UTC calendar days on both paths. ``rebuild`` locks the rows for its
+range before reading the raw tables, so an increment made concurrently is
+either seen by the recount or applied on top of it after the rebuild commits.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.analytics import DailyStats
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.chat import ChatSession
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = [
+    "revenue",
+    "order_count",
+    "cancelled_orders",
+    "appointments_pending",
+    "appointments_confirmed",
+    "appointments_completed",
+    "appointments_cancelled",
+    "new_users",
+    "chat_sessions",
+]
+
+
+def _day(value: Optional[datetime]) -> date:
+    """UTC calendar day of a timestamp (today when not yet populated)."""
+    if value is None:
+        return datetime.utcnow().date()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _as_date(value) -> date:
+    # SQLite's date() returns ISO strings, Postgres returns dates
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _utc_day(db: Session, column):
+    """SQL for the UTC calendar day of a timestamp column, as _day() computes it."""
+    if db.get_bind().dialect.name == "postgresql":
+        # date() of a timestamptz uses the session's time zone
+        return func.date(func.timezone("UTC", column))
+    # SQLite stores UTC timestamps without an offset
+    return func.date(column)
+
+
+def _appointment_column(status: AppointmentStatus) -> str:
+    return f"appointments_{AppointmentStatus(status).value}"
+
+
+def _upsert_insert(db: Session):
+    """The dialect's INSERT with ON CONFLICT support, or None."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def increment(db: Session, day: date, **deltas):
+    """Add ``deltas`` to the rollup row for ``day``, creating it if needed."""
+    deltas = {column: value for column, value in deltas.items() if value}
+    if not deltas:
+        return
+    
+    dialect_insert = _upsert_insert(db)
+    if dialect_insert is not None:
+        stmt = dialect_insert(DailyStats).values(day=day, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyStats.day],
+            set_={
+                **{column: getattr(DailyStats, column) + stmt.excluded[column] for column in deltas},
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+        return
+    
+    # Generic fallback for databases without an upsert
+    row = db.get(DailyStats, day, with_for_update=True)
+    if row is None:
+        row = DailyStats(day=day, **{column: 0 for column in COUNTER_COLUMNS})
+        db.add(row)
+    for column, value in deltas.items():
+        setattr(row, column, getattr(row, column) + value)
+
+
+def record_order_created(db: Session, total_amount: Decimal):
+    """Count a new (pending) order placed today."""
+    increment(db, _day(None), order_count=1, revenue=total_amount)
+
+
+def record_order_status_change(db: Session, order: Order, old_status: OrderStatus, new_status: OrderStatus):
+    """Move an order's revenue in or out of the rollup when it is (un)cancelled."""
+    was_cancelled = old_status == OrderStatus.CANCELLED
+    is_cancelled = new_status == OrderStatus.CANCELLED
+    if was_cancelled == is_cancelled:
+        return
+    sign = 1 if is_cancelled else -1
+    increment(
+        db,
+        _day(order.created_at),
+        revenue=-sign * order.total_amount,
+        cancelled_orders=sign,
+    )
+
+
+def record_appointment(db: Session, created_at: Optional[datetime], status: AppointmentStatus, delta: int = 1):
+    """Add (or with ``delta=-1`` remove) an appointment in a status bucket."""
+    increment(db, _day(created_at), **{_appointment_column(status): delta})
+
+
+def record_appointment_status_change(
+    db: Session,
+    appointment: Appointment,
+    old_status: AppointmentStatus,
+    new_status: AppointmentStatus,
+):
+    """Move an appointment between status buckets."""
+    if old_status == new_status:
+        return
+    increment(
+        db,
+        _day(appointment.created_at),
+        **{_appointment_column(old_status): -1, _appointment_column(new_status): 1},
+    )
+
+
+def record_user_created(db: Session):
+    increment(db, _day(None), new_users=1)
+
+
+def record_chat_session_created(db: Session):
+    increment(db, _day(None), chat_sessions=1)
+
+
+def _lock_range(db: Session, days: List[date]):
+    """Create missing rollup rows for ``days`` and lock them all for this transaction."""
+    in_range = DailyStats.day.between(days[0], days[-1])
+    dialect_insert = _upsert_insert(db)
+    if dialect_insert is not None:
+        db.execute(
+            dialect_insert(DailyStats).on_conflict_do_nothing(index_elements=[DailyStats.day]),
+            [{"day": day} for day in days]
+        )
+    else:
+        existing = set(db.scalars(select(DailyStats.day).where(in_range)))
+        missing = [{"day": day} for day in days if day not in existing]
+        if missing:
+            db.execute(insert(DailyStats), missing)
+    # No-op on SQLite, where the insert above already holds the write lock
+    db.execute(select(DailyStats.day).where(in_range).with_for_update()).all()
+
+
+def rebuild(db: Session, start: date, end: date):
+    """Recompute rollup rows for ``start``..``end`` (inclusive) from raw tables."""
+    start_at = datetime.combine(start, time.min, timezone.utc)
+    end_at = datetime.combine(end + timedelta(days=1), time.min, timezone.utc)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    rows: Dict[date, dict] = {
+        day: {"day": day, **{column: 0 for column in COUNTER_COLUMNS}} for day in days
+    }
+    
+    # Before reading, so increments racing with the recount aren't overwritten
+    _lock_range(db, days)
+    
+    def row_for(day) -> dict:
+        return rows[_as_date(day)]
+    
+    order_day = _utc_day(db, Order.created_at)
+    for day, count, revenue, cancelled in db.execute(
+        select(
+            order_day,
+            func.count(),
+            func.coalesce(func.sum(Order.total_amount).filter(Order.status != OrderStatus.CANCELLED), 0),
+            func.count().filter(Order.status == OrderStatus.CANCELLED),
+        ).where(Order.created_at >= start_at, Order.created_at < end_at).group_by(order_day)
+    ):
+        row = row_for(day)
+        row.update(order_count=count, revenue=revenue, cancelled_orders=cancelled)
+    
+    appointment_day = _utc_day(db, Appointment.created_at)
+    for day, status, count in db.execute(
+        select(appointment_day, Appointment.status, func.count())
+        .where(Appointment.created_at >= start_at, Appointment.created_at < end_at)
+        .group_by(appointment_day, Appointment.status)
+    ):
+        row_for(day)[_appointment_column(status)] = count
+    
+    for model, column in ((User, "new_users"), (ChatSession, "chat_sessions")):
+        created_day = _utc_day(db, model.created_at)
+        for day, count in db.execute(
+            select(created_day, func.count())
+            .where(model.created_at >= start_at, model.created_at < end_at)
+            .group_by(created_day)
+        ):
+            row_for(day)[column] = count
+    
+    # Overwrite in place (by primary key) rather than delete and re-insert
+    db.execute(update(DailyStats), list(rows.values()))
+
+
+def get_daily_rows(db: Session, start: date, end: date) -> List[DailyStats]:
+    return db.query(DailyStats).filter(
+        DailyStats.day >= start,
+        DailyStats.day <= end
+    ).order_by(DailyStats.day).all()
+
+
+def period_start(day: date, interval: str) -> date:
+    """First day of the day/week/month bucket containing ``day``."""
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def get_series(db: Session, start: date, end: date, interval: str = "day") -> List[dict]:
+    """Zero-filled totals per period for ``start``..``end`` from the rollups."""
+    buckets: Dict[date, dict] = {}
+    day = start
+    while day <= end:
+        key = period_start(day, interval)
+        if key not in buckets:
+            buckets[key] = {"period_start": key, **{column: 0 for column in COUNTER_COLUMNS}}
+        day += timedelta(days=1)
+    
+    for row in get_daily_rows(db, start, end):
+        bucket = buckets[period_start(row.day, interval)]
+        for column in COUNTER_COLUMNS:
+            bucket[column] += getattr(row, column)
+    
+    return list(buckets.values())
+
+
+def _history_start(db: Session) -> Optional[date]:
+    """Earliest day with any raw activity."""
+    earliest = [
+        db.query(func.min(model.created_at)).scalar()
+        for model in (Order, Appointment, User, ChatSession)
+    ]
+    earliest = [value for value in earliest if value is not None]
+    return _day(min(earliest)) if earliest else None
+
+
+def compact(days: Optional[int] = None):
+    """Rebuild recent rollups, or the whole history if none exist yet."""
+    db = SessionLocal()
+    try:
+        today = datetime.utcnow().date()
+        if db.query(DailyStats).first() is None:
+            start = _history_start(db)
+            if start is None:
+                return
+        else:
+            start = today - timedelta(days=days or settings.ANALYTICS_COMPACTION_DAYS)
+        rebuild(db, start, today)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _seconds_until_next_compaction() -> float:
+    now = datetime.utcnow()
+    next_run = datetime.combine(now.date(), time(hour=settings.ANALYTICS_COMPACTION_HOUR))
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def run_compaction_schedule():
+    """Compact once at startup, then nightly at ANALYTICS_COMPACTION_HOUR (UTC)."""
+    while True:
+        try:
+            await asyncio.to_thread(compact)
+        except Exception as e:
+            logger.exception("Rollup compaction failed: %s", e)
+        await asyncio.sleep(_seconds_until_next_compaction())
@@ -1,5 +1,10 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import hashlib
+import threading
+import uuid
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -7,6 +12,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.database import get_db
+from app.core.principals import Principal, principal_cache
+from app.core.revocation import revocation_list
 
 # JWT Bearer token
 security = HTTPBearer()
@@ -15,7 +22,7 @@ security = HTTPBearer()
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
+        plain_password.encode('utf-8')[:72],
         hashed_password.encode('utf-8')
     )
 
@@ -24,11 +31,59 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     # Bcrypt has a 72 byte limit, truncate if needed
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made with a different work factor than PASSWORD_HASH_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.PASSWORD_HASH_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# Bcrypt takes hundreds of milliseconds of CPU per call, so request handlers
+# run it on a small dedicated pool instead of the event loop thread
+_hash_executor: Optional[Executor] = None
+_hash_executor_lock = threading.Lock()
+
+
+def hash_executor() -> Executor:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+            else:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash"
+                )
+        return _hash_executor
+
+
+def shutdown_hash_executor():
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor(), verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor(), get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -37,40 +92,78 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def user_claims(user) -> dict:
+    """Access token claims for ``user``; role and status let requests skip the user lookup."""
+    return {"sub": user.id, "role": user.role.value, "active": user.is_active}
+
+
 def create_refresh_token(data: dict) -> str:
     """Create a JWT refresh token."""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def password_fingerprint(hashed_password: str) -> str:
+    """Short digest of a password hash; reset tokens carry it so they stop working once used."""
+    return hashlib.sha256(hashed_password.encode("utf-8")).hexdigest()[:16]
+
+
+def create_password_reset_token(user) -> str:
+    """Create a short-lived JWT for the reset-password link."""
+    expire = datetime.utcnow() + timedelta(minutes=settings.PASSWORD_RESET_EXPIRE_MINUTES)
+    to_encode = {
+        "sub": user.id,
+        "pwd": password_fingerprint(user.hashed_password),
+        "exp": expire,
+        "type": "password_reset",
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
 def decode_token(token: str) -> dict:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token, rejecting revoked ones (no database lookup)."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
+        payload = None
+    
+    if payload is None or revocation_list.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
+
+
+def get_principal(db: Session, user_id: str, payload: Optional[dict] = None) -> Optional[Principal]:
+    """The caller's Principal from the cache, trusted token claims, or the database."""
+    from app.models.user import User
+    
+    principal = principal_cache.get(user_id)
+    if principal is None and payload is not None:
+        principal = principal_cache.from_claims(payload)
+    if principal is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return None
+        principal = principal_cache.put(user)
+    return principal
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-):
-    """Get the current authenticated user."""
-    from app.models.user import User
-    
+) -> Principal:
+    """Get the current authenticated user's Principal (id, role, is_active)."""
     token = credentials.credentials
     payload = decode_token(token)
     
@@ -87,24 +180,24 @@ async def get_current_user(
             detail="Could not validate credentials"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    principal = get_principal(db, user_id, payload)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
     
-    return user
+    return principal
 
 
 async def get_current_admin_user(
-    current_user = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get the current authenticated admin user."""
     if current_user.role != "admin":
@@ -116,16 +209,17 @@ async def get_current_admin_user(
 
 
 async def verify_websocket_token(token: str, db: Session):
-    """Verify WebSocket token and return user."""
-    from app.models.user import User
-    
+    """Verify WebSocket token and return the user's Principal."""
     try:
         payload = decode_token(token)
+        # Refresh and password-reset tokens carry a sub too
+        if payload.get("type") != "access":
+            return None
         user_id = payload.get("sub")
         if user_id is None:
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
-        return user if user and user.is_active else None
+        principal = get_principal(db, user_id)
+        return principal if principal and principal.is_active else None
     except:
         return None
@@ -0,0 +1,329 @@
+"""Login throttling.
+
+Each login attempt costs a bcrypt verification, so attempts are limited per
+client IP and per email before the user is even looked up:
+
+- a sliding window of LOGIN_THROTTLE_WINDOW_SECONDS allows
+  LOGIN_THROTTLE_IP_ATTEMPTS attempts per IP and LOGIN_THROTTLE_EMAIL_ATTEMPTS
+  per email;
+- after LOGIN_BACKOFF_FREE_FAILURES consecutive failures a key is locked for
+  LOGIN_BACKOFF_BASE_SECONDS, doubling with each further failure up to
+  LOGIN_BACKOFF_MAX_SECONDS. A successful login clears the email's streak;
+  an IP's streak lapses after a full window without failures.
+
+Rejected attempts get a 429 with Retry-After and don't count toward the
+window. The window is approximated from two fixed windows, the previous one
+weighted by how much of it still overlaps, so each key needs two counters
+rather than a timestamp per attempt.
+
+LOGIN_THROTTLE_BACKEND picks where counters live: ``memory`` (per process,
+so each worker enforces the limits separately) or ``database``, shared by
+all workers through the login_throttles table. Another shared store only
+needs ``transact`` and ``purge``.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.login_throttle import LoginThrottle as ThrottleRecord
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600
+MEMORY_PRUNE_EVERY = 1000  # transactions between sweeps of idle in-memory keys
+
+
+@dataclass
+class KeyState:
+    window_index: int = 0
+    attempts: int = 0
+    previous_attempts: int = 0
+    failures: int = 0
+    last_failure_at: float = 0.0
+    blocked_until: float = 0.0
+    
+    def roll(self, now: float, window: float):
+        """Move the counters forward to the window containing ``now``."""
+        index = int(now // window)
+        if index != self.window_index:
+            self.previous_attempts = self.attempts if index == self.window_index + 1 else 0
+            self.attempts = 0
+            self.window_index = index
+        if self.failures and now - self.last_failure_at > window:
+            self.failures = 0
+    
+    def estimate(self, now: float, window: float) -> float:
+        """Attempts in the last ``window`` seconds."""
+        overlap = 1 - (now / window - self.window_index)
+        return self.attempts + self.previous_attempts * overlap
+    
+    def wait(self, now: float, window: float, limit: int) -> float:
+        """Seconds until one more attempt fits under ``limit``."""
+        elapsed = now / window - self.window_index
+        if self.attempts + 1 <= limit and self.previous_attempts:
+            # The previous window's share decays linearly
+            excess = self.estimate(now, window) + 1 - limit
+            return excess / self.previous_attempts * window
+        return (1 - elapsed) * window
+    
+    def idle(self, now: float, window: float) -> bool:
+        return (
+            self.window_index < int(now // window) - 1
+            and self.blocked_until <= now
+            and (not self.failures or now - self.last_failure_at > window)
+        )
+
+
+STATE_FIELDS = [field.name for field in fields(KeyState)]
+
+# Mutates the states of the keys in one transaction and returns a result
+Transaction = Callable[[Dict[str, KeyState]], object]
+
+
+class MemoryStore:
+    """Counters for this process only."""
+    
+    def __init__(self):
+        self.states: Dict[str, KeyState] = {}
+        self._lock = threading.Lock()
+        self._transactions = 0
+    
+    def transact(self, keys: List[str], func: Transaction):
+        with self._lock:
+            states = {key: self.states.get(key) or KeyState() for key in keys}
+            result = func(states)
+            self.states.update(states)
+            self._transactions += 1
+            if self._transactions % MEMORY_PRUNE_EVERY == 0:
+                self._prune(time.time())
+            return result
+    
+    def _prune(self, now: float):
+        window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        for key in [key for key, state in self.states.items() if state.idle(now, window)]:
+            del self.states[key]
+    
+    def purge(self) -> int:
+        with self._lock:
+            before = len(self.states)
+            self._prune(time.time())
+            return before - len(self.states)
+    
+    def size(self) -> int:
+        return len(self.states)
+
+
+class DatabaseStore:
+    """Counters shared by every process through the login_throttles table.
+    
+    The rows for an attempt's keys are locked together (in key order, so two
+    attempts never deadlock); a concurrent first insert of the same key makes
+    the loser retry against the winner's row.
+    """
+    
+    def transact(self, keys: List[str], func: Transaction):
+        for attempt in range(3):
+            db = SessionLocal()
+            try:
+                rows = {
+                    row.key: row
+                    for row in db.query(ThrottleRecord)
+                    .filter(ThrottleRecord.key.in_(keys))
+                    .order_by(ThrottleRecord.key)
+                    .with_for_update()
+                }
+                states = {
+                    key: KeyState(**{name: getattr(rows[key], name) for name in STATE_FIELDS})
+                    if key in rows else KeyState()
+                    for key in keys
+                }
+                result = func(states)
+                for key, state in states.items():
+                    row = rows.get(key)
+                    if row is None:
+                        row = ThrottleRecord(key=key)
+                        db.add(row)
+                    for name in STATE_FIELDS:
+                        setattr(row, name, getattr(state, name))
+                db.commit()
+                return result
+            except IntegrityError:
+                db.rollback()
+                if attempt == 2:
+                    raise
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    
+    def purge(self) -> int:
+        now = time.time()
+        window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        db = SessionLocal()
+        try:
+            deleted = db.execute(
+                delete(ThrottleRecord).where(
+                    ThrottleRecord.window_index < int(now // window) - 1,
+                    ThrottleRecord.blocked_until <= now,
+                    ThrottleRecord.last_failure_at < now - window,
+                )
+            ).rowcount
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def size(self) -> Optional[int]:
+        return None
+
+
+STORES = {
+    "memory": MemoryStore,
+    "database": DatabaseStore,
+}
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """The caller's address, taken from X-Forwarded-For behind TRUSTED_PROXY_HOPS proxies."""
+    if settings.TRUSTED_PROXY_HOPS > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= settings.TRUSTED_PROXY_HOPS:
+            return forwarded[-settings.TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else None
+
+
+def backoff_seconds(failures: int) -> float:
+    """Lockout after ``failures`` consecutive failures (0 while still free)."""
+    extra = failures - settings.LOGIN_BACKOFF_FREE_FAILURES
+    if extra < 0:
+        return 0.0
+    return min(settings.LOGIN_BACKOFF_MAX_SECONDS, settings.LOGIN_BACKOFF_BASE_SECONDS * 2 ** min(extra, 32))
+
+
+class LoginThrottle:
+    """Admits login attempts per IP and email, and counts what it did."""
+    
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = {"ip": 0, "email": 0, "backoff": 0}
+        self.succeeded = 0
+        self.failed = 0
+    
+    @staticmethod
+    def _limits(ip: Optional[str], email: str) -> List[Tuple[str, str, int]]:
+        limits = [("email", f"email:{email.strip().lower()}", settings.LOGIN_THROTTLE_EMAIL_ATTEMPTS)]
+        if ip:
+            limits.append(("ip", f"ip:{ip}", settings.LOGIN_THROTTLE_IP_ATTEMPTS))
+        return limits
+    
+    def admit(self, ip: Optional[str], email: str):
+        """Count an attempt, or raise 429 if ``ip`` or ``email`` is over its limit."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        limits = self._limits(ip, email)
+        window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        now = time.time()
+        
+        def attempt(states: Dict[str, KeyState]):
+            rejection = None
+            for kind, key, limit in limits:
+                state = states[key]
+                state.roll(now, window)
+                if state.blocked_until > now:
+                    wait, reason = state.blocked_until - now, "backoff"
+                elif state.estimate(now, window) + 1 > limit:
+                    wait, reason = state.wait(now, window, limit), kind
+                else:
+                    continue
+                if rejection is None or wait > rejection[0]:
+                    rejection = (wait, reason)
+            if rejection is None:
+                for state in states.values():
+                    state.attempts += 1
+            return rejection
+        
+        rejection = self.store.transact([key for _, key, _ in limits], attempt)
+        with self._lock:
+            if rejection is None:
+                self.admitted += 1
+            else:
+                self.rejected[rejection[1]] += 1
+        if rejection is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(rejection[0])))}
+            )
+    
+    def record(self, ip: Optional[str], email: str, success: bool):
+        """Clear the email's failure streak, or extend both streaks and their backoff."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        limits = self._limits(ip, email)
+        now = time.time()
+        
+        def outcome(states: Dict[str, KeyState]):
+            for kind, key, _ in limits:
+                state = states[key]
+                if success:
+                    if kind == "email":
+                        state.failures = 0
+                        state.blocked_until = 0.0
+                    continue
+                state.failures += 1
+                state.last_failure_at = now
+                lockout = backoff_seconds(state.failures)
+                if lockout:
+                    state.blocked_until = max(state.blocked_until, now + lockout)
+        
+        self.store.transact([key for _, key, _ in limits], outcome)
+        with self._lock:
+            if success:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+    
+    def metrics(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": settings.LOGIN_THROTTLE_ENABLED,
+                "backend": settings.LOGIN_THROTTLE_BACKEND,
+                "admitted": self.admitted,
+                "rejected_ip": self.rejected["ip"],
+                "rejected_email": self.rejected["email"],
+                "rejected_backoff": self.rejected["backoff"],
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "tracked_keys": self.store.size(),
+            }
+
+
+# Global instance
+login_throttle = LoginThrottle(STORES[settings.LOGIN_THROTTLE_BACKEND]())
+
+
+async def run_throttle_purge():
+    """Delete counters of idle keys hourly."""
+    while True:
+        try:
+            await asyncio.to_thread(login_throttle.store.purge)
+        except Exception as e:
+            logger.exception("Login throttle purge failed: %s", e)
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
@@ -0,0 +1,315 @@
+"""Distributed tracing.
+
+Spans follow the OpenTelemetry data model and are exported as OTLP/JSON by a
+background thread, either appended to TRACING_FILE (one export request per
+line, the format the collector's ``otlpjsonfile`` receiver reads) or posted
+to an OTLP/HTTP collector at TRACING_OTLP_ENDPOINT. With TRACING_EXPORTER
+set to ``none`` (the default) nothing is recorded and span() only checks a
+flag.
+
+A trace starts at an HTTP request (continuing the caller's W3C
+``traceparent`` header when there is one), a chat WebSocket message or a
+background job; TRACING_SAMPLE_RATE of them are kept. Inside one, SQL
+statements, WebSocket broadcasts, email sends and upload writes get child
+spans. Outside a trace they get none, so background sweeps cost nothing.
+
+current_trace_id() gives logs the trace they were written in.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = settings.TRACING_EXPORTER != "none"
+
+# OTLP enums
+KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+
+BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+QUEUE_SIZE = 8192
+
+
+def _new_id(bytes_: int) -> str:
+    return os.urandom(bytes_).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: int
+    start_ns: int
+    attributes: Dict[str, object] = field(default_factory=dict)
+    end_ns: int = 0
+    status: int = STATUS_UNSET
+    status_message: str = ""
+    events: List[dict] = field(default_factory=list)
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.events.append({
+            "name": "exception",
+            "time_ns": time.time_ns(),
+            "attributes": {"exception.type": type(exc).__name__, "exception.message": str(exc)},
+        })
+    
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def end(self):
+        self.end_ns = time.time_ns()
+        exporter.add(self)
+
+
+class NoopSpan:
+    """Stands in for a span that isn't being recorded."""
+    
+    trace_id = None
+    
+    def set_attribute(self, key: str, value):
+        pass
+    
+    def record_exception(self, exc: BaseException):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None."""
+    match = TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == INVALID_TRACE_ID or match.group(2) == INVALID_SPAN_ID:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def start_span(
+    name: str,
+    kind: str = "internal",
+    attributes: Optional[Dict[str, object]] = None,
+    root: bool = False,
+    traceparent: Optional[str] = None,
+) -> Optional[Span]:
+    """A started span, or None when it isn't recorded.
+    
+    Child spans (the default) are only recorded inside a sampled trace. A
+    ``root`` span starts a trace, continuing ``traceparent`` if it is valid and
+    otherwise sampled at TRACING_SAMPLE_RATE. End the span with ``span.end()``.
+    """
+    if not ENABLED:
+        return None
+    if root:
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = _new_id(16), None
+            sampled = random.random() < settings.TRACING_SAMPLE_RATE
+        if not sampled:
+            return None
+    else:
+        current = _current.get()
+        if current is None:
+            return None
+        trace_id, parent_id = current.trace_id, current.span_id
+    return Span(name, trace_id, _new_id(8), parent_id, KINDS[kind], time.time_ns(), dict(attributes or {}))
+
+
+def activate(span: Span) -> Token:
+    """Make ``span`` the parent of spans started in this context until deactivate()."""
+    return _current.set(span)
+
+
+def deactivate(token: Token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: str = "internal",
+    attributes: Optional[Dict[str, object]] = None,
+    root: bool = False,
+    traceparent: Optional[str] = None,
+):
+    """Record the enclosed block as a span (see start_span); exceptions mark it failed."""
+    started = start_span(name, kind, attributes, root, traceparent)
+    if started is None:
+        yield NOOP_SPAN
+        return
+    token = _current.set(started)
+    try:
+        yield started
+    except BaseException as e:
+        started.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        started.end()
+
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, object]) -> List[dict]:
+    return [{"key": key, "value": _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp_json(spans: List[Span]) -> dict:
+    """An OTLP/JSON ExportTraceServiceRequest for ``spans``."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({
+            "service.name": settings.TRACING_SERVICE_NAME,
+            "deployment.environment": settings.ENVIRONMENT,
+            "process.pid": os.getpid(),
+        })},
+        "scopeSpans": [{
+            "scope": {"name": __name__},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _attributes(span.attributes),
+                "events": [
+                    {
+                        "name": event["name"],
+                        "timeUnixNano": str(event["time_ns"]),
+                        "attributes": _attributes(event["attributes"]),
+                    }
+                    for event in span.events
+                ],
+                "status": {"code": span.status, "message": span.status_message},
+            } for span in spans],
+        }],
+    }]}
+
+
+class Exporter:
+    """Queues ended spans and exports them in batches from a daemon thread.
+    
+    Spans are dropped (and counted) rather than blocking a request when the
+    queue is full, for instance while the collector is down.
+    """
+    
+    def __init__(self):
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=QUEUE_SIZE)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+        self.failed_exports = 0
+    
+    def add(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        if self._queue.qsize() >= BATCH_SIZE:
+            self._wake.set()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(EXPORT_INTERVAL_SECONDS)
+            self._wake.clear()
+            self.flush()
+    
+    def flush(self):
+        """Export everything queued so far; also called at shutdown."""
+        with self._flush_lock:
+            while True:
+                batch: List[Span] = []
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self.export(batch)
+    
+    def export(self, batch: List[Span]):
+        body = json.dumps(otlp_json(batch), separators=(",", ":"))
+        try:
+            if settings.TRACING_EXPORTER == "file":
+                path = Path(settings.TRACING_FILE)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as out:
+                    out.write(body + "\n")
+            elif settings.TRACING_EXPORTER == "otlp":
+                request = urllib.request.Request(
+                    settings.TRACING_OTLP_ENDPOINT,
+                    data=body.encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    response.read()
+            else:
+                raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed_exports += 1
+            self.dropped += len(batch)
+            logger.warning("Trace export of %d spans failed: %s", len(batch), e)
+
+
+# Global instance
+exporter = Exporter()
@@ -1,6 +1,8 @@
 from typing import Dict, List
 from fastapi import WebSocket
 
+from app.core import tracing
+
 
 class ConnectionManager:
     """Manager for WebSocket connections."""
@@ -17,10 +19,11 @@ class ConnectionManager:
         self.active_connections[session_id].append(websocket)
     
     def disconnect(self, websocket: WebSocket, session_id: str):
-        """Remove a WebSocket connection."""
-        if session_id in self.active_connections:
-            self.active_connections[session_id].remove(websocket)
-            if not self.active_connections[session_id]:
+        """Remove a WebSocket connection; does nothing if it is already gone."""
+        connections = self.active_connections.get(session_id)
+        if connections and websocket in connections:
+            connections.remove(websocket)
+            if not connections:
                 del self.active_connections[session_id]
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
@@ -30,13 +33,23 @@ class ConnectionManager:
     async def broadcast_to_session(self, message: dict, session_id: str):
         """Broadcast a message to all connections in a session."""
         if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                await connection.send_json(message)
+            connections = self.active_connections[session_id]
+            with tracing.span("ws.broadcast", "producer", {
+                "ws.session_id": session_id,
+                "ws.message_type": message.get("type"),
+                "ws.recipients": len(connections),
+            }):
+                for connection in connections:
+                    await connection.send_json(message)
     
     def is_user_online(self, session_id: str) -> bool:
         """Check if any user is online in a session."""
         return session_id in self.active_connections and len(self.active_connections[session_id]) > 0
     
+    def connection_count(self) -> int:
+        """Number of open connections across all sessions."""
+        return sum(len(connections) for connections in self.active_connections.values())
+    
     def get_active_sessions(self) -> List[str]:
         """Get list of all active session IDs."""
         return list(self.active_connections.keys())
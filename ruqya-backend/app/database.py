@@ -1,7 +1,20 @@
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import List, Optional
+import logging
+import random
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.core import tracing
+
+
+logger = logging.getLogger(__name__)
 
 # Create database engine
 engine = create_engine(
@@ -24,3 +37,178 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    parameters: str  # shape only, never values
+    seconds: float
+
+
+@dataclass
+class QueryStats:
+    """SQL executed by one request (or any block wrapped in track_queries)."""
+    count: int = 0
+    seconds: float = 0.0
+    statements: Optional[List[str]] = None  # only kept when asked for
+    slow: List[SlowQuery] = field(default_factory=list)
+
+
+# Stats for the current request (see track_queries)
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+# Slow SELECTs are explained off the request path, one at a time
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+    """Parameter names and types of a statement, without the values."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def log_slow_query(slow: SlowQuery, where: str):
+    statement = " ".join(slow.statement.split())
+    logger.warning(
+        "Slow query (%.1fms) in %s: %s | params %s", slow.seconds * 1000, where, statement, slow.parameters,
+        extra={"duration_ms": round(slow.seconds * 1000, 1)}
+    )
+
+
+def _explain(statement: str, parameters):
+    """Log the plan of a slow SELECT, re-running it under EXPLAIN ANALYZE on PostgreSQL."""
+    if engine.dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    elif engine.dialect.name == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        prefix = "EXPLAIN "
+    try:
+        # A raw DBAPI connection takes the bound parameters as they are and skips these hooks
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(prefix + statement, parameters)
+            plan = "\n".join("    " + " | ".join(str(column) for column in row) for row in cursor.fetchall())
+            connection.rollback()
+        finally:
+            connection.close()
+        logger.info("Plan for slow query %s:\n%s", " ".join(statement.split())[:200], plan)
+    except Exception as e:
+        logger.warning("Could not explain slow query: %s", e)
+
+
+def _start_query_span(statement: str, executemany: bool):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    return tracing.start_span(operation, "client", {
+        "db.system": engine.dialect.name,
+        "db.operation": operation,
+        "db.statement": statement,  # placeholders only; parameter values are never recorded
+        "db.executemany": executemany,
+    })
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(perf_counter())
+    # Only inside a sampled trace; otherwise this is one ContextVar lookup
+    conn.info.setdefault("query_spans", []).append(
+        _start_query_span(statement, executemany) if tracing.current_span() else None
+    )
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - conn.info["query_started"].pop()
+    span = conn.info["query_spans"].pop()
+    if span is not None:
+        span.end()
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(statement)
+    
+    if settings.SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow = SlowQuery(statement, parameters_shape(parameters, executemany), elapsed)
+        if stats is not None:
+            # Logged with the route once the request finishes
+            stats.slow.append(slow)
+        else:
+            log_slow_query(slow, "background task")
+        
+        if (
+            settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE > 0
+            and not executemany
+            and statement.lstrip().upper().startswith("SELECT")
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+        ):
+            _explain_executor.submit(_explain, statement, parameters)
+
+
+@event.listens_for(engine, "handle_error")
+def _drop_query_timer(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+    if conn is not None and conn.info.get("query_spans"):
+        span = conn.info["query_spans"].pop()
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.end()
+
+
+@contextmanager
+def track_queries(statements: bool = False):
+    """Collect counts and timings (and the statements, if asked) of SQL run in the current context."""
+    stats = QueryStats(statements=[] if statements else None)
+    token = _request_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_queries.reset(token)
+
+
+class QueryCounter:
+    """Count every SQL statement executed on an engine, from any thread."""
+    
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self.count = 0
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+            self.statements.append(statement)
+    
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, bind=engine):
+    """Fail if the enclosed block executes more than ``limit`` SQL statements.
+    
+    Usage in tests::
+    
+        with assert_max_queries(3):
+            client.get("/api/v1/orders/some-id", headers=headers)
+    """
+    with QueryCounter(bind) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
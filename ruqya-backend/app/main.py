@@ -1,18 +1,39 @@
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 # Remove or comment out TrustedHostMiddleware import
 # from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+import re
+import secrets
 import time
+import uuid
 from pathlib import Path
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, log_slow_query, track_queries
 from app.api.v1 import api_router
+from app.core.rollups import run_compaction_schedule
+from app.core.dashboard import dashboard_cache
+from app.core.reservations import run_reservation_sweeper
+from app.core.idempotency import run_idempotency_purge
+from app.core.throttling import run_throttle_purge
+from app.core.revocation import run_revocation_sync
+from app.core.jobs import run_worker
+from app.core.security import shutdown_hash_executor
+from app.core import logs, metrics, tracing
+from app.core.profiler import HEADER as PROFILE_HEADER, profiler, start_for_request
 
 
+logs.configure_logging()
+logger = logging.getLogger(__name__)
+
+# Accepted from callers as X-Request-ID; anything else gets a fresh id
+REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -24,20 +45,40 @@ async def lifespan(app: FastAPI):
     Lifespan event handler for startup and shutdown events.
     """
     # Startup
-    print("🚀 Starting Ruqya Healing Hub API...")
-    print(f"📊 Environment: {settings.ENVIRONMENT}")
-    print(f"🔗 Database: Connected")
-    print(f"🌐 CORS: Enabled for {settings.FRONTEND_URL}")
+    logger.info(
+        "Starting Ruqya Healing Hub API (%s), CORS enabled for %s", settings.ENVIRONMENT, settings.FRONTEND_URL
+    )
     
     # Create database tables (in production, use Alembic migrations)
     if settings.ENVIRONMENT == "development":
-        print("📝 Creating database tables...")
+        logger.info("Creating database tables")
         Base.metadata.create_all(bind=engine)
     
+    # Background tasks
+    background_tasks = [
+        asyncio.create_task(run_idempotency_purge()),
+        asyncio.create_task(run_revocation_sync()),
+    ]
+    if settings.LOGIN_THROTTLE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_throttle_purge()))
+    if settings.ANALYTICS_COMPACTION_ENABLED:
+        background_tasks.append(asyncio.create_task(run_compaction_schedule()))
+    if settings.DASHBOARD_CACHE_ENABLED:
+        background_tasks.append(asyncio.create_task(dashboard_cache.run()))
+    if settings.ORDER_RESERVATION_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(run_reservation_sweeper()))
+    # The memory queue only exists in this process, so it always needs a local worker
+    if settings.JOB_WORKER_IN_PROCESS or settings.JOB_QUEUE_BACKEND == "memory":
+        background_tasks.append(asyncio.create_task(run_worker()))
+    
     yield
     
     # Shutdown
-    print("👋 Shutting down Ruqya Healing Hub API...")
+    logger.info("Shutting down Ruqya Healing Hub API")
+    for task in background_tasks:
+        task.cancel()
+    shutdown_hash_executor()
+    tracing.exporter.flush()
 
 
 # Initialize FastAPI app
@@ -48,6 +89,8 @@ app = FastAPI(
     docs_url="/docs",  # Always enable
     redoc_url="/redoc",  # Always enable
     lifespan=lifespan,
+    # List endpoints bypass this with app.core.responses.json_response
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -74,19 +117,95 @@ app.add_middleware(
 # Request Timing Middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    """Add processing time header to all responses."""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+    """Time and trace each request and its SQL: timing headers, metrics, spans, slow-query logs and profiles."""
+    # Ties together everything logged for this request; echoed back as X-Request-ID
+    supplied = request.headers.get("x-request-id", "")
+    request_id = supplied if REQUEST_ID.match(supplied) else uuid.uuid4().hex
+    request.state.request_id = request_id
+    request_id_token = logs.request_id.set(request_id)
+    
+    try:
+        # Admins can ask for this request to be profiled
+        sampler = None
+        if settings.PROFILER_ENABLED and PROFILE_HEADER in request.headers:
+            sampler = start_for_request(request)
+        
+        # Named once the route is known; SQL and other spans in the handler nest under it
+        span = tracing.start_span("HTTP", "server", {
+            "http.request.method": request.method,
+            "url.path": request.url.path,
+        }, root=True, traceparent=request.headers.get("traceparent"))
+        span_token = tracing.activate(span) if span else None
+        if span:
+            # For the exception handler, which runs outside this context
+            request.state.trace_id = span.trace_id
+        
+        start_time = time.perf_counter()
+        metrics.http_in_flight.inc()
+        status_code = 500
+        with track_queries(statements=settings.SQL_DEBUG_MAX_QUERIES > 0) as queries:
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+            except Exception as e:
+                if span:
+                    span.record_exception(e)
+                raise
+            finally:
+                process_time = time.perf_counter() - start_time
+                profile_id = profiler.finish(sampler) if sampler else None
+                metrics.http_in_flight.dec()
+                route = metrics.route_template(app, request.scope)
+                metrics.observe_request(request.method, route, status_code, process_time, queries)
+                for slow in queries.slow:
+                    log_slow_query(slow, f"{request.method} {route}")
+                if span:
+                    tracing.deactivate(span_token)
+                    span.name = f"{request.method} {route}"
+                    span.set_attribute("http.route", route)
+                    span.set_attribute("http.response.status_code", status_code)
+                    span.set_attribute("db.query_count", queries.count)
+                    if status_code >= 500:
+                        span.status = tracing.STATUS_ERROR
+                    span.end()
+        
+        response.headers["X-Process-Time"] = str(process_time)
+        response.headers["X-Request-ID"] = request_id
+        if span:
+            response.headers["X-Trace-Id"] = span.trace_id
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = (
+                f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries", '
+                f"app;dur={process_time * 1000:.2f}"
+            )
+        
+        # SQL statement budget (debugging N+1 queries)
+        if settings.SQL_DEBUG_MAX_QUERIES > 0 and queries.count > settings.SQL_DEBUG_MAX_QUERIES:
+            logger.warning(
+                "%s %s executed %d SQL statements (limit %d)",
+                request.method, request.url.path, queries.count, settings.SQL_DEBUG_MAX_QUERIES,
+                extra={"statements": [" ".join(statement.split()) for statement in queries.statements]}
+            )
+        return response
+    finally:
+        logs.request_id.reset(request_id_token)
 
 
 # Global Exception Handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle all unhandled exceptions."""
-    print(f"❌ Unhandled error: {exc}")
+    # Runs outside the request's context, so the ids come from request.state
+    logger.error(
+        "Unhandled error in %s %s: %s", request.method, request.url.path, exc,
+        exc_info=exc,
+        extra={
+            "request_id": getattr(request.state, "request_id", None),
+            "trace_id": getattr(request.state, "trace_id", None),
+        }
+    )
     
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -124,6 +243,25 @@ async def health_check():
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def get_metrics(request: Request):
+    """Prometheus metrics for this worker process."""
+    # Route traffic, auth counters and pool stats are only public in development
+    if not settings.METRICS_ENABLED or (not settings.METRICS_TOKEN and settings.ENVIRONMENT != "development"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not secrets.compare_digest(supplied.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid metrics token",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -5,8 +5,13 @@ from app.models.article import Article
 from app.models.podcast import Podcast
 from app.models.audio import Audio
 from app.models.product import Product
-from app.models.order import Order, OrderItem, OrderStatus
+from app.models.order import Order, OrderItem, OrderStatus, OrderNumberSequence
 from app.models.chat import ChatSession, ChatMessage, ChatStatus
+from app.models.analytics import DailyStats
+from app.models.idempotency import IdempotencyKey
+from app.models.job import Job, JobStatus
+from app.models.login_throttle import LoginThrottle
+from app.models.revoked_token import RevokedToken
 
 __all__ = [
     "User",
@@ -21,7 +26,14 @@ __all__ = [
     "Order",
     "OrderItem",
     "OrderStatus",
+    "OrderNumberSequence",
     "ChatSession",
     "ChatMessage",
     "ChatStatus",
+    "DailyStats",
+    "IdempotencyKey",
+    "Job",
+    "JobStatus",
+    "LoginThrottle",
+    "RevokedToken",
 ]
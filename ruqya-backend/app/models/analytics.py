@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Date, Numeric, Integer, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class DailyStats(Base):
+    """Per-day activity rollup, maintained incrementally by app.core.rollups."""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    revenue = Column(Numeric(14, 2), default=0, server_default="0", nullable=False)  # excludes cancelled orders
+    order_count = Column(Integer, default=0, server_default="0", nullable=False)
+    cancelled_orders = Column(Integer, default=0, server_default="0", nullable=False)
+    appointments_pending = Column(Integer, default=0, server_default="0", nullable=False)
+    appointments_confirmed = Column(Integer, default=0, server_default="0", nullable=False)
+    appointments_completed = Column(Integer, default=0, server_default="0", nullable=False)
+    appointments_cancelled = Column(Integer, default=0, server_default="0", nullable=False)
+    new_users = Column(Integer, default=0, server_default="0", nullable=False)
+    chat_sessions = Column(Integer, default=0, server_default="0", nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index, column, text, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -19,7 +20,8 @@ class Appointment(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     service_id = Column(String, ForeignKey("services.id"), nullable=False)
     appointment_date = Column(DateTime(timezone=True), nullable=False)
-    status = Column(SQLEnum(AppointmentStatus), default=AppointmentStatus.PENDING, nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)  # appointment_date + service duration
+    status = Column(SQLEnum(AppointmentStatus), default=AppointmentStatus.PENDING, nullable=False, index=True)
     notes = Column(Text, nullable=True)
     user_name = Column(String, nullable=False)
     user_email = Column(String, nullable=False)
@@ -30,3 +32,15 @@ class Appointment(Base):
     # Relationships
     user = relationship("User", back_populates="appointments")
     service = relationship("Service", back_populates="appointments")
+    
+    __table_args__ = (
+        # Availability and overlap checks scan by start time, then status
+        Index("ix_appointments_date_status", "appointment_date", "status"),
+        # Postgres rejects overlapping active bookings even under concurrency
+        ExcludeConstraint(
+            (func.tstzrange(column("appointment_date"), column("ends_at")), "&&"),
+            name="appointments_no_overlap",
+            using="gist",
+            where=text("status IN ('PENDING', 'CONFIRMED')")
+        ).ddl_if(dialect="postgresql"),
+    )
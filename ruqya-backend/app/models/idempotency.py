@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored response for a create request sent with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+    
+    scope = Column(String, primary_key=True)  # endpoint, plus the user where keys are per-user
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
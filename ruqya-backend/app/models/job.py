@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index, Enum as SQLEnum, text
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+# Enum columns store member names
+UNFINISHED = text("status IN ('QUEUED', 'RUNNING')")
+
+
+class Job(Base):
+    """Deferred work picked up by app.worker; see app.core.jobs."""
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(SQLEnum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # lease of the worker running it
+    last_error = Column(Text, nullable=True)
+    dedupe_key = Column(String, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # Workers poll for due jobs in run_at order
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        # One unfinished job per dedupe key, even when two requests enqueue at once
+        Index(
+            "uq_jobs_dedupe_key_unfinished", "dedupe_key", unique=True,
+            postgresql_where=UNFINISHED, sqlite_where=UNFINISHED
+        ),
+    )
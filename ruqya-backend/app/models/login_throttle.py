@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, Float
+from app.database import Base
+
+
+class LoginThrottle(Base):
+    """Login attempt counters for one IP or email; see app.core.throttling."""
+    __tablename__ = "login_throttles"
+    
+    key = Column(String(320), primary_key=True)  # "ip:<address>" or "email:<address>"
+    window_index = Column(Integer, nullable=False, index=True)  # epoch seconds // LOGIN_THROTTLE_WINDOW_SECONDS
+    attempts = Column(Integer, default=0, nullable=False)
+    previous_attempts = Column(Integer, default=0, nullable=False)
+    failures = Column(Integer, default=0, nullable=False)  # consecutive
+    last_failure_at = Column(Float, default=0.0, nullable=False)  # epoch seconds
+    blocked_until = Column(Float, default=0.0, nullable=False)  # epoch seconds
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, Float, Integer, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, ForeignKey, Numeric, Integer, Date, DateTime, Text, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -24,14 +24,20 @@ class Order(Base):
     customer_phone = Column(String, nullable=False)
     shipping_address = Column(Text, nullable=False)
     payment_method = Column(String, nullable=False)
-    total_amount = Column(Float, nullable=False)
+    total_amount = Column(Numeric(12, 2), nullable=False)
     status = Column(SQLEnum(OrderStatus), default=OrderStatus.PENDING, nullable=False)
+    reserved_until = Column(DateTime(timezone=True), nullable=True, index=True)  # stock hold expiry while pending
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Revenue windows and recent-order lookups scan by date, then status
+        Index("ix_orders_created_at_status", "created_at", "status"),
+    )
 
 
 class OrderItem(Base):
@@ -41,8 +47,16 @@ class OrderItem(Base):
     order_id = Column(String, ForeignKey("orders.id"), nullable=False)
     product_id = Column(String, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    price = Column(Float, nullable=False)  # Price at time of order
+    price = Column(Numeric(12, 2), nullable=False)  # Price at time of order
     
     # Relationships
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
+
+
+class OrderNumberSequence(Base):
+    """Per-day order number counter, handed out to workers in blocks."""
+    __tablename__ = "order_number_sequences"
+    
+    day = Column(Date, primary_key=True)
+    next_value = Column(Integer, nullable=False)  # first number not yet allocated
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Float, Integer, Boolean, DateTime
+from sqlalchemy import Column, String, Text, Numeric, Integer, Boolean, DateTime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -10,7 +10,7 @@ class Product(Base):
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=False)
-    price = Column(Float, nullable=False)
+    price = Column(Numeric(12, 2), nullable=False)
     image = Column(String, nullable=True)
     stock_quantity = Column(Integer, default=0, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
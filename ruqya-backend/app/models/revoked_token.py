@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from app.database import Base
+
+
+class RevokedToken(Base):
+    """A JWT that stops being accepted before it expires; see app.core.revocation."""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(String, nullable=False)
+    token_type = Column(String(16), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # the token's own exp
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)  # set by the app; workers sync from it
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime
+from sqlalchemy import Column, String, Integer, Numeric, Boolean, Text, DateTime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -12,7 +12,7 @@ class Service(Base):
     description = Column(Text, nullable=False)
     icon = Column(String, nullable=True)
     duration = Column(Integer, nullable=False)  # in minutes
-    price = Column(Float, nullable=False)
+    price = Column(Numeric(12, 2), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
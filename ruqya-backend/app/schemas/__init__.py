@@ -24,6 +24,10 @@ from app.schemas.appointment import (
     AppointmentDetailResponse,
     AppointmentListResponse,
     AppointmentStatusUpdate,
+    AvailabilityDay,
+    AvailabilityResponse,
+    AvailabilityMonthDay,
+    AvailabilityMonthResponse,
 )
 from app.schemas.article import (
     ArticleCreate,
@@ -81,7 +85,14 @@ from app.schemas.upload import (
 from app.schemas.admin import (
     DashboardStats,
     RevenueStats,
+    AnalyticsPoint,
+    AnalyticsSeriesResponse,
     AdminUserListResponse,
+    EmailMetrics,
+    LoginThrottleMetrics,
+    ProfileInfo,
+    ProfileListResponse,
+    ProfileStartResponse,
 )
 
 __all__ = [
@@ -109,6 +120,10 @@ __all__ = [
     "AppointmentDetailResponse",
     "AppointmentListResponse",
     "AppointmentStatusUpdate",
+    "AvailabilityDay",
+    "AvailabilityResponse",
+    "AvailabilityMonthDay",
+    "AvailabilityMonthResponse",
     # Article
     "ArticleCreate",
     "ArticleUpdate",
@@ -158,5 +173,12 @@ __all__ = [
     # Admin
     "DashboardStats",
     "RevenueStats",
+    "AnalyticsPoint",
+    "AnalyticsSeriesResponse",
     "AdminUserListResponse",
+    "EmailMetrics",
+    "LoginThrottleMetrics",
+    "ProfileInfo",
+    "ProfileListResponse",
+    "ProfileStartResponse",
 ]
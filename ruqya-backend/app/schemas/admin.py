@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from app.schemas.order import OrderSummaryResponse
 from app.schemas.appointment import AppointmentResponse
 from app.schemas.user import UserResponse
@@ -14,6 +14,7 @@ class RevenueStats(BaseModel):
 
 
 class DashboardStats(BaseModel):
+    computed_at: Optional[datetime] = None
     total_users: int
     total_appointments: int
     total_orders: int
@@ -26,6 +27,71 @@ class DashboardStats(BaseModel):
     revenue: RevenueStats
 
 
+class AnalyticsPoint(BaseModel):
+    """Activity totals for one day, week or month"""
+    period_start: date
+    revenue: float = 0.0
+    order_count: int = 0
+    cancelled_orders: int = 0
+    appointments_pending: int = 0
+    appointments_confirmed: int = 0
+    appointments_completed: int = 0
+    appointments_cancelled: int = 0
+    new_users: int = 0
+    chat_sessions: int = 0
+
+
+class AnalyticsSeriesResponse(BaseModel):
+    start: date
+    end: date
+    interval: str
+    totals: AnalyticsPoint
+    points: List[AnalyticsPoint]
+
+
 class AdminUserListResponse(BaseModel):
     total: int
     items: List[UserResponse]
+
+
+class EmailMetrics(BaseModel):
+    """Outgoing email counters for the worker process serving the request"""
+    backend: str
+    sent: int
+    failed: int
+    provider_calls: int
+    failed_calls: int
+    average_batch_size: float
+    throttled_seconds: float
+    average_call_ms: float
+    template_cache_hits: int
+    template_cache_misses: int
+
+
+class LoginThrottleMetrics(BaseModel):
+    """Login throttling counters for the worker process serving the request"""
+    enabled: bool
+    backend: str
+    admitted: int
+    rejected_ip: int
+    rejected_email: int
+    rejected_backoff: int
+    succeeded: int
+    failed: int
+    tracked_keys: Optional[int] = None  # memory backend only
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    created_at: datetime
+    size_bytes: int
+
+
+class ProfileListResponse(BaseModel):
+    items: List[ProfileInfo]
+
+
+class ProfileStartResponse(BaseModel):
+    """A worker profile that will be available under ``id`` once ``seconds`` have passed"""
+    id: str
+    seconds: float
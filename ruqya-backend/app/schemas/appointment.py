@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 from app.models.appointment import AppointmentStatus
 from app.schemas.service import ServiceResponse
 from app.schemas.user import UserResponse
@@ -29,6 +29,7 @@ class AppointmentResponse(AppointmentBase):
     id: str
     user_id: str
     status: AppointmentStatus
+    ends_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -49,3 +50,33 @@ class AppointmentListResponse(BaseModel):
 
 class AppointmentStatusUpdate(BaseModel):
     status: AppointmentStatus
+
+
+class AvailabilityDay(BaseModel):
+    date: date
+    slots: List[datetime]
+
+
+class AvailabilityResponse(BaseModel):
+    """Open start times (UTC) for a service over a date range"""
+    service_id: str
+    duration: int
+    slot_minutes: int
+    timezone: str
+    days: List[AvailabilityDay]
+
+
+class AvailabilityMonthDay(BaseModel):
+    date: date
+    opens_at: Optional[datetime] = None
+    slots: str  # one '0'/'1' per slot_minutes step from opens_at
+
+
+class AvailabilityMonthResponse(BaseModel):
+    """Compact month calendar: a free/taken bitmap per day"""
+    service_id: str
+    month: str
+    duration: int
+    slot_minutes: int
+    timezone: str
+    days: List[AvailabilityMonthDay]
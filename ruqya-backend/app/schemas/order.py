@@ -50,6 +50,7 @@ class OrderResponse(OrderBase):
     user_id: Optional[str] = None
     total_amount: float
     status: OrderStatus
+    reserved_until: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     items: List[OrderItemResponse] = []
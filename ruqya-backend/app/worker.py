@@ -0,0 +1,35 @@
+"""Standalone background job worker.
+
+Run with ``python -m app.worker``. Start as many as needed next to the API
+(set JOB_WORKER_IN_PROCESS=false there to keep job work off the web
+processes); workers share the ``jobs`` table safely.
+"""
+import asyncio
+import logging
+import sys
+
+from app.config import settings
+from app.core import logs
+from app.core import notifications  # noqa: F401 - registers the email job handlers
+from app.core.jobs import run_worker
+
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    logs.configure_logging()
+    if settings.JOB_QUEUE_BACKEND == "memory":
+        logger.error("JOB_QUEUE_BACKEND=memory keeps jobs inside the API process; a separate worker would never see them")
+        return 1
+    
+    logger.info("Job worker started (%s), polling every %ss", settings.ENVIRONMENT, settings.JOB_POLL_SECONDS)
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        logger.info("Job worker stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""End-to-end benchmark and load-test suite for the Ruqya Healing Hub API.
+
+Run from the ``ruqya-backend`` directory:
+
+    python -m benchmarks.run                          # SQLite stand-in, in-process
+    python -m benchmarks.run --database-url postgresql://...   # local Postgres
+    python -m benchmarks.run --base-url http://localhost:8000 --concurrency 16
+
+See ``benchmarks/README.md`` for baselines and regression checks.
+"""
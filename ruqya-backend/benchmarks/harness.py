@@ -0,0 +1,148 @@
+"""Timing, query counting and baseline comparison for benchmark scenarios."""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from app.database import QueryCounter
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    iterations: int
+    concurrency: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput: float  # operations per second
+    queries_per_op: Optional[float] = None
+
+    def as_row(self) -> str:
+        queries = "-" if self.queries_per_op is None else f"{self.queries_per_op:.1f}"
+        return (
+            f"{self.name:<24} {self.p50_ms:>9.2f} {self.p95_ms:>9.2f} {self.p99_ms:>9.2f} "
+            f"{self.throughput:>10.1f} {queries:>8}"
+        )
+
+
+HEADER = f"{'scenario':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'queries':>8}"
+
+
+def run_scenario(
+    name: str,
+    factory: Callable[[], ContextManager[Callable[[], None]]],
+    iterations: int,
+    warmup: int = 5,
+    concurrency: int = 1,
+    query_counter: Optional[QueryCounter] = None,
+) -> ScenarioResult:
+    """Run a scenario and collect latency percentiles and throughput.
+
+    ``factory`` returns a context manager yielding the operation to time, so
+    scenarios can hold per-worker state such as an open WebSocket.
+    """
+    per_worker = max(1, iterations // concurrency)
+
+    def worker() -> List[float]:
+        timings = []
+        with factory() as op:
+            for _ in range(warmup):
+                op()
+            for _ in range(per_worker):
+                start = time.perf_counter()
+                op()
+                timings.append(time.perf_counter() - start)
+        return timings
+
+    queries_before = query_counter.count if query_counter else 0
+    wall_start = time.perf_counter()
+    if concurrency == 1:
+        latencies = worker()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(concurrency)]
+            latencies = [t for f in futures for t in f.result()]
+    wall = time.perf_counter() - wall_start
+
+    queries_per_op = None
+    if query_counter:
+        total_ops = (per_worker + warmup) * concurrency
+        queries_per_op = (query_counter.count - queries_before) / total_ops
+
+    latencies.sort()
+    return ScenarioResult(
+        name=name,
+        iterations=len(latencies),
+        concurrency=concurrency,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        mean_ms=sum(latencies) / len(latencies) * 1000,
+        throughput=len(latencies) / wall if wall else 0.0,
+        queries_per_op=queries_per_op,
+    )
+
+
+def save_baseline(path: Path, results: List[ScenarioResult], meta: dict):
+    """Write results to a baseline JSON file.
+
+    Scenarios not in ``results`` keep their previously stored values, so a
+    single scenario can be re-recorded with ``--scenario``.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    scenarios = json.loads(path.read_text())["scenarios"] if path.exists() else {}
+    scenarios.update({
+        r.name: {k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(r).items()}
+        for r in results
+    })
+    payload = {"meta": meta, "scenarios": scenarios}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+
+
+def compare_to_baseline(
+    path: Path,
+    results: List[ScenarioResult],
+    tolerance: float,
+) -> List[str]:
+    """Return a list of regressions against a stored baseline.
+
+    Latency regresses when p50 exceeds the baseline by more than ``tolerance``
+    (a fraction); the median is used because tail percentiles are too noisy
+    on shared machines to gate on. Query counts are flagged when an operation
+    issues at least one extra statement on average; fractional drift comes
+    from background tasks sharing the engine.
+    """
+    baseline: Dict[str, dict] = json.loads(path.read_text())["scenarios"]
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        limit = previous["p50_ms"] * (1 + tolerance)
+        if result.p50_ms > limit:
+            regressions.append(
+                f"{result.name}: p50 {result.p50_ms:.2f}ms > {limit:.2f}ms "
+                f"(baseline {previous['p50_ms']:.2f}ms)"
+            )
+        old_queries = previous.get("queries_per_op")
+        if result.queries_per_op is not None and old_queries is not None:
+            if result.queries_per_op >= old_queries + 0.5:
+                regressions.append(
+                    f"{result.name}: {result.queries_per_op:.1f} queries/op "
+                    f"(baseline {old_queries:.1f})"
+                )
+    return regressions
@@ -0,0 +1,129 @@
+"""Latency check: how much a burst of logins slows down unrelated requests.
+
+Measures ``GET /services`` on its own, then again while ``--clients`` threads
+log in back to back. Every login costs a full bcrypt verification; when that
+runs on the event loop the probe's tail latency grows with the login rate,
+when it runs on the hashing pool it should barely move.
+
+Login throttling is switched off unless ``--throttle`` is given, in which
+case rejected (429) logins are counted instead of failing the run.
+
+Exits 1 when ``--max-p99-ms`` is given and the probe's p99 during the storm
+exceeds it. Use ``--base-url`` to measure a running server instead.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.run import BENCHMARK_DIR, configure_environment
+
+API = "/api/v1"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=f"sqlite:///{BENCHMARK_DIR / 'benchmark.db'}",
+                        help="Database to run against (default: local SQLite file)")
+    parser.add_argument("--base-url", default=None, help="Measure a running server over HTTP")
+    parser.add_argument("--clients", type=int, default=8, help="Threads logging in concurrently")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of each phase")
+    parser.add_argument("--throttle", action="store_true", help="Keep login throttling on and count rejections")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="Fail if the probe p99 during the storm exceeds this")
+    return parser.parse_args(argv)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summary(samples):
+    return (f"p50 {statistics.median(samples):7.2f}ms  p99 {percentile(samples, 0.99):7.2f}ms  "
+            f"max {max(samples):7.2f}ms  n={len(samples)}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    if not args.throttle:
+        os.environ["LOGIN_THROTTLE_ENABLED"] = "false"
+
+    from app.config import settings
+    from benchmarks.seed import ADMIN_EMAIL, ADMIN_PASSWORD
+
+    if args.base_url:
+        import httpx
+        client = httpx.Client(base_url=args.base_url, timeout=60)
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import app
+        client = TestClient(app)
+
+    credentials = {"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+
+    def probe(stop: threading.Event):
+        samples = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get(f"{API}/services")
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET /services -> {response.status_code}")
+            time.sleep(0.01)
+        return samples
+
+    def log_in(stop: threading.Event):
+        logins = rejected = 0
+        while not stop.is_set():
+            response = client.post(f"{API}/auth/login", json=credentials)
+            if response.status_code == 429 and args.throttle:
+                rejected += 1
+                continue
+            if response.status_code != 200:
+                raise RuntimeError(f"POST /auth/login -> {response.status_code}: {response.text[:200]}")
+            logins += 1
+        return logins, rejected
+
+    with client:
+        # Warm up (first login may also rehash)
+        client.post(f"{API}/auth/login", json=credentials)
+        client.get(f"{API}/services")
+
+        print(f"🔐 bcrypt rounds={settings.PASSWORD_HASH_ROUNDS}, executor={settings.PASSWORD_HASH_EXECUTOR} "
+              f"x{settings.PASSWORD_HASH_WORKERS}, throttle={'on' if settings.LOGIN_THROTTLE_ENABLED else 'off'}, "
+              f"{args.clients} login clients")
+
+        stop = threading.Event()
+        timer = threading.Timer(args.seconds, stop.set)
+        timer.start()
+        idle = probe(stop)
+        print(f"  idle   {summary(idle)}")
+
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=args.clients + 1) as pool:
+            storm = [pool.submit(log_in, stop) for _ in range(args.clients)]
+            probing = pool.submit(probe, stop)
+            time.sleep(args.seconds)
+            stop.set()
+            counts = [future.result() for future in storm]
+            loaded = probing.result()
+        logins = sum(verified for verified, _ in counts)
+        rejected = sum(rejected for _, rejected in counts)
+        print(f"  storm  {summary(loaded)}  ({logins / args.seconds:.1f} logins/s, {rejected / args.seconds:.1f} rejected/s)")
+
+    if args.max_p99_ms is not None and percentile(loaded, 0.99) > args.max_p99_ms:
+        print(f"❌ Probe p99 {percentile(loaded, 0.99):.2f}ms exceeds {args.max_p99_ms}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Concurrency check: many clients racing for the last units of one product.
+
+Creates a throwaway product with ``--stock`` units, fires ``--clients``
+simultaneous single-unit orders at it and verifies that exactly ``--stock``
+orders succeed, every other one is rejected for insufficient stock, and the
+stock and order-item totals agree.
+
+In-process runs call the ``create_order`` endpoint directly from worker
+threads, each with its own session, so the database sees truly concurrent
+transactions (TestClient would serialize them on one event loop). Use
+``--base-url`` to hammer a running multi-worker server over HTTP instead.
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.run import BENCHMARK_DIR, configure_environment
+
+ORDER = {
+    "customer_name": "Oversell Check",
+    "customer_email": "oversell@benchmark.example.com",
+    "customer_phone": "+15550000000",
+    "shipping_address": "1 Benchmark Way",
+    "payment_method": "card",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=f"sqlite:///{BENCHMARK_DIR / 'benchmark.db'}",
+                        help="Database to run against (default: local SQLite file)")
+    parser.add_argument("--base-url", default=None, help="Send orders to a running server over HTTP")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent orders to place")
+    parser.add_argument("--stock", type=int, default=10, help="Units available before the race")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from fastapi import HTTPException
+    from sqlalchemy import func
+    from app.database import SessionLocal, engine, Base
+    from app.models import OrderItem, Product
+    from app.api.v1.orders import create_order
+    from app.schemas.order import OrderCreate
+
+    Base.metadata.create_all(bind=engine)
+
+    product_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(Product(
+            id=product_id,
+            name=f"Oversell check {product_id[:8]}",
+            description="Temporary product for the oversell check",
+            price=1.0,
+            stock_quantity=args.stock,
+            is_active=True,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    payload = {**ORDER, "items": [{"product_id": product_id, "quantity": 1}]}
+    start = threading.Barrier(args.clients)
+
+    if args.base_url:
+        import httpx
+
+        def place_order() -> int:
+            with httpx.Client(base_url=args.base_url, timeout=60) as client:
+                start.wait()
+                return client.post("/api/v1/orders", json=payload).status_code
+    else:
+        def place_order() -> int:
+            session = SessionLocal()
+            try:
+                start.wait()
+                asyncio.run(create_order(OrderCreate(**payload), session, idempotency_key=None))
+                return 201
+            except HTTPException as e:
+                session.rollback()
+                return e.status_code
+            finally:
+                session.close()
+
+    print(f"🏁 {args.clients} clients racing for {args.stock} units against {engine.url.get_backend_name()}...")
+    try:
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            statuses = list(pool.map(lambda _: place_order(), range(args.clients)))
+    finally:
+        db = SessionLocal()
+        try:
+            remaining = db.query(Product.stock_quantity).filter(Product.id == product_id).scalar()
+            sold = db.query(func.coalesce(func.sum(OrderItem.quantity), 0)).filter(
+                OrderItem.product_id == product_id
+            ).scalar()
+            # Keep the product out of the catalog used by the benchmark scenarios
+            db.query(Product).filter(Product.id == product_id).update({Product.is_active: False})
+            db.commit()
+        finally:
+            db.close()
+
+    succeeded = statuses.count(201)
+    rejected = statuses.count(400)
+    expected = min(args.stock, args.clients)
+    print(f"  ✅ {succeeded} orders placed, {rejected} rejected, {sold} units sold, {remaining} left")
+
+    problems = []
+    if succeeded + rejected != len(statuses):
+        problems.append(f"unexpected statuses: {sorted(set(statuses) - {201, 400})}")
+    if succeeded != expected:
+        problems.append(f"expected {expected} successful orders, got {succeeded}")
+    if sold != succeeded:
+        problems.append(f"{sold} units recorded on order items for {succeeded} orders")
+    if remaining != args.stock - sold or remaining < 0:
+        problems.append(f"stock is {remaining}, expected {args.stock - sold}")
+
+    if problems:
+        print("❌ Oversell check failed:")
+        for line in problems:
+            print(f"  - {line}")
+        return 1
+    print("✅ No oversell")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Benchmark runner: seed a database, boot the API and time the hot paths."""
+import argparse
+import os
+import platform
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = BENCHMARK_DIR / "baselines"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ruqya Healing Hub API benchmarks")
+    parser.add_argument("--database-url", default=os.environ.get(
+        "BENCHMARK_DATABASE_URL", f"sqlite:///{BENCHMARK_DIR / 'benchmark.db'}"
+    ), help="Database to seed and benchmark (default: local SQLite file)")
+    parser.add_argument("--base-url", default=None,
+                        help="Benchmark a running server instead of booting app.main:app in-process")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for seeded row counts")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed operations per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed operations per worker")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent workers per scenario")
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="Only run the named scenario (repeatable)")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables before seeding")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed p50 regression as a fraction of baseline (default 0.3)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Point app settings at the benchmark database before app modules import."""
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production-use")
+    os.environ.setdefault("FRONTEND_URL", "http://localhost:3000")
+    # Anything but "development" so SQL echo stays off
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    # Keep background maintenance out of the measurements
+    os.environ.setdefault("ANALYTICS_COMPACTION_ENABLED", "false")
+    os.environ.setdefault("JOB_WORKER_IN_PROCESS", "false")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from app.database import SessionLocal, engine, Base, QueryCounter
+    from app.models import ChatSession, Article, Product, Service
+    from app.core.security import create_access_token
+    from benchmarks import seed as seeding
+    from benchmarks.harness import (
+        HEADER, compare_to_baseline, run_scenario, save_baseline,
+    )
+    from benchmarks.scenarios import SCENARIOS, BenchmarkContext, RemoteWebSocket
+
+    if args.reset:
+        print("🗑️  Dropping tables...")
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if seeding.is_seeded(db):
+            print("⏭️  Benchmark data already seeded")
+        else:
+            print(f"🌱 Seeding benchmark data (scale={args.scale})...")
+            counts = seeding.seed(db, scale=args.scale)
+            print("  ✅ " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+        admin = db.query(seeding.User).filter(seeding.User.email == seeding.ADMIN_EMAIL).one()
+        admin_token = create_access_token(data={"sub": admin.id})
+        article_slugs = [s for (s,) in db.query(Article.slug).filter(Article.is_published == True)]
+        product_ids = [p for (p,) in db.query(Product.id).filter(Product.is_active == True)]
+        service_ids = [s for (s,) in db.query(Service.id).filter(Service.is_active == True)]
+        chat_session_ids = [c for (c,) in db.query(ChatSession.id).filter(ChatSession.status == "active")]
+    finally:
+        db.close()
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        print(f"❌ Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+
+    if args.base_url:
+        import httpx
+        from websockets.sync.client import connect as ws_connect_remote
+
+        client = httpx.Client(base_url=args.base_url, timeout=30)
+        ws_base = args.base_url.replace("http", "ws", 1)
+
+        @contextmanager
+        def ws_connect(path):
+            with ws_connect_remote(f"{ws_base}{path}") as connection:
+                yield RemoteWebSocket(connection)
+
+        query_counter = None
+        target = args.base_url
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        client = TestClient(app)
+        ws_connect = client.websocket_connect
+        query_counter = QueryCounter(engine)
+        target = "in-process app.main:app"
+
+    print(f"🚀 Benchmarking {target} against {engine.url.get_backend_name()}")
+    results = []
+    with client, (query_counter or _null()):
+        print(HEADER)
+        for name in names:
+            ctx = BenchmarkContext(
+                client=client,
+                ws_connect=ws_connect,
+                admin_token=admin_token,
+                article_slugs=article_slugs,
+                product_ids=product_ids,
+                service_ids=service_ids,
+                chat_session_ids=chat_session_ids,
+            )
+            result = run_scenario(
+                name,
+                lambda: SCENARIOS[name](ctx),
+                iterations=args.iterations,
+                warmup=args.warmup,
+                concurrency=args.concurrency,
+                query_counter=query_counter,
+            )
+            results.append(result)
+            print(result.as_row())
+
+    meta = {
+        "database": engine.url.get_backend_name(),
+        "target": target,
+        "scale": args.scale,
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+    if args.save_baseline:
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        save_baseline(path, results, meta)
+        print(f"💾 Baseline saved to {path}")
+
+    if args.compare:
+        path = BASELINE_DIR / f"{args.compare}.json"
+        regressions = compare_to_baseline(path, results, args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"✅ No regressions against {path.name}")
+
+    return 0
+
+
+@contextmanager
+def _null():
+    yield None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
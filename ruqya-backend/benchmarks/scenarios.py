@@ -0,0 +1,203 @@
+"""Hot-path scenarios exercised by the benchmark runner."""
+import json
+import random
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+API = "/api/v1"
+
+
+@dataclass
+class BenchmarkContext:
+    """Everything a scenario needs to issue requests."""
+    client: object  # fastapi.testclient.TestClient or httpx.Client
+    ws_connect: Callable  # path -> context manager with send_json/receive_json
+    admin_token: str
+    article_slugs: List[str] = field(default_factory=list)
+    product_ids: List[str] = field(default_factory=list)
+    service_ids: List[str] = field(default_factory=list)
+    chat_session_ids: List[str] = field(default_factory=list)
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+
+    @property
+    def admin_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+    def request(self, method: str, path: str, **kwargs):
+        response = self.client.request(method, f"{API}{path}", **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+
+SCENARIOS: Dict[str, Callable] = {}
+
+
+def scenario(name: str):
+    """Register a scenario factory under ``name``."""
+    def decorator(func):
+        SCENARIOS[name] = contextmanager(func)
+        return func
+    return decorator
+
+
+@scenario("products_list")
+def products_list(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/products", params={"limit": 20})
+
+
+@scenario("articles_list")
+def articles_list(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/articles", params={"limit": 20})
+
+
+@scenario("audio_list")
+def audio_list(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/audio", params={"limit": 20})
+
+
+@scenario("podcasts_list")
+def podcasts_list(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/podcasts", params={"limit": 20})
+
+
+@scenario("services_list")
+def services_list(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/services")
+
+
+@scenario("article_by_slug")
+def article_by_slug(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", f"/articles/slug/{ctx.rng.choice(ctx.article_slugs)}")
+
+
+def order_payload(ctx: BenchmarkContext, lines: int = 3) -> dict:
+    return {
+        "customer_name": "Load Test",
+        "customer_email": "load@benchmark.example.com",
+        "customer_phone": "+15550000000",
+        "shipping_address": "1 Benchmark Way",
+        "payment_method": "card",
+        "items": [
+            {"product_id": product_id, "quantity": ctx.rng.randint(1, 3)}
+            for product_id in ctx.rng.sample(ctx.product_ids, lines)
+        ],
+    }
+
+
+@scenario("order_create")
+def order_create(ctx: BenchmarkContext):
+    yield lambda: ctx.request("POST", "/orders", json=order_payload(ctx))
+
+
+@scenario("order_create_large_cart")
+def order_create_large_cart(ctx: BenchmarkContext):
+    yield lambda: ctx.request("POST", "/orders", json=order_payload(ctx, lines=50))
+
+
+@scenario("bulk_repricing")
+def bulk_repricing(ctx: BenchmarkContext):
+    # Pricing engine alone: 200 carts of 20 lines with discount and tax
+    from app.core import pricing
+    
+    carts = [
+        [(f"p{i}", ctx.rng.randint(1, 5), round(ctx.rng.uniform(1, 200), 2)) for i in range(20)]
+        for _ in range(200)
+    ]
+    yield lambda: [pricing.price_cart(cart, discount_rate="0.1", tax_rate="0.2") for cart in carts]
+
+
+@scenario("email_batch_dispatch")
+def email_batch_dispatch(ctx: BenchmarkContext):
+    # Render and send 100 reminders through a fake provider with a 2ms round-trip
+    from app.core import mailer
+    
+    outbox = mailer.Mailer(mailer.FakeProvider(latency=0.002), batch_size=50, bucket=None)
+    
+    def op():
+        outbox.send_batch([
+            mailer.render_message(
+                f"client{i}@benchmark.example.com",
+                "Reminder",
+                "appointment_reminder",
+                user_name=f"Client {i}",
+                service="Ruqyah session",
+                starts_at="Monday 02 November 2026 at 10:00",
+                timezone="UTC",
+            )
+            for i in range(100)
+        ])
+    yield op
+
+
+@scenario("order_replay")
+def order_replay(ctx: BenchmarkContext):
+    # A client retrying a checkout that already succeeded
+    payload = order_payload(ctx)
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    ctx.request("POST", "/orders", json=payload, headers=headers)
+    yield lambda: ctx.request("POST", "/orders", json=payload, headers=headers)
+
+
+@scenario("appointment_availability")
+def appointment_availability(ctx: BenchmarkContext):
+    def op():
+        start = date.today() + timedelta(days=ctx.rng.randint(0, 30))
+        ctx.request("GET", "/appointments/availability", params={
+            "service_id": ctx.rng.choice(ctx.service_ids),
+            "start": start.isoformat(),
+            "end": (start + timedelta(days=6)).isoformat(),
+        })
+    yield op
+
+
+@scenario("appointment_availability_month")
+def appointment_availability_month(ctx: BenchmarkContext):
+    def op():
+        month = date.today().replace(day=1) + timedelta(days=31 * ctx.rng.randint(0, 2))
+        ctx.request("GET", "/appointments/availability/month", params={
+            "service_id": ctx.rng.choice(ctx.service_ids),
+            "month": month.strftime("%Y-%m"),
+        })
+    yield op
+
+
+@scenario("admin_dashboard")
+def admin_dashboard(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/admin/dashboard", headers=ctx.admin_headers)
+
+
+@scenario("admin_chat_sessions")
+def admin_chat_sessions(ctx: BenchmarkContext):
+    yield lambda: ctx.request("GET", "/chat/sessions", headers=ctx.admin_headers)
+
+
+@scenario("chat_ws_roundtrip")
+def chat_ws_roundtrip(ctx: BenchmarkContext):
+    session_id = ctx.rng.choice(ctx.chat_session_ids)
+    path = f"{API}/chat/ws/{session_id}?token={ctx.admin_token}"
+    with ctx.ws_connect(path) as ws:
+        ws.receive_json()  # initial online-status broadcast
+
+        def op():
+            ws.send_json({"type": "message", "sender": "admin", "message": "benchmark ping"})
+            while ws.receive_json().get("type") != "message":
+                pass
+
+        yield op
+
+
+class RemoteWebSocket:
+    """Adapter giving a websockets sync connection the TestClient interface."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def send_json(self, data: dict):
+        self.connection.send(json.dumps(data))
+
+    def receive_json(self) -> dict:
+        return json.loads(self.connection.recv())
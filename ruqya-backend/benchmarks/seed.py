@@ -0,0 +1,246 @@
+"""Seed a benchmark database with realistic data volumes."""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.core import pricing, rollups
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
+from app.models.service import Service
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.article import Article
+from app.models.podcast import Podcast
+from app.models.audio import Audio
+from app.models.product import Product
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.chat import ChatSession, ChatMessage, ChatStatus
+
+
+ADMIN_EMAIL = "bench-admin@benchmark.example.com"
+ADMIN_PASSWORD = "benchmark-admin"
+
+# Row counts at scale 1.0
+VOLUMES = {
+    "users": 2000,
+    "services": 8,
+    "products": 200,
+    "articles": 500,
+    "audio": 300,
+    "podcasts": 150,
+    "orders": 5000,
+    "appointments": 3000,
+    "chat_sessions": 500,
+    "messages_per_session": 12,
+}
+
+CATEGORIES = ["ruqya", "protection", "healing", "knowledge", "duas", "sunnah"]
+
+PARAGRAPH = (
+    "The Prophet (peace be upon him) taught that seeking healing through the Quran and "
+    "authentic supplications is a means of protection for the believer. "
+)
+
+
+def _id() -> str:
+    return str(uuid.uuid4())
+
+
+def _bulk(db, model, rows, chunk_size: int = 1000):
+    """Insert rows in chunks using the ORM bulk insert path."""
+    for start in range(0, len(rows), chunk_size):
+        db.execute(insert(model), rows[start:start + chunk_size])
+
+
+def is_seeded(db) -> bool:
+    """Check whether the benchmark dataset has already been loaded."""
+    return db.query(User).filter(User.email == ADMIN_EMAIL).first() is not None
+
+
+def seed(db, scale: float = 1.0, seed_value: int = 42) -> dict:
+    """Seed all benchmark tables and return the row counts inserted."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    counts = {key: max(1, int(value * scale)) for key, value in VOLUMES.items()}
+    counts["messages_per_session"] = VOLUMES["messages_per_session"]
+
+    def past(days: int = 365) -> datetime:
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    # Hash once; bcrypt per row would dominate seeding time
+    password_hash = get_password_hash("benchmark-user")
+
+    users = [{
+        "id": _id(),
+        "email": ADMIN_EMAIL,
+        "hashed_password": get_password_hash(ADMIN_PASSWORD),
+        "full_name": "Benchmark Admin",
+        "role": UserRole.ADMIN,
+        "is_active": True,
+        "created_at": now - timedelta(days=400),
+    }]
+    for i in range(counts["users"]):
+        users.append({
+            "id": _id(),
+            "email": f"user{i}@benchmark.example.com",
+            "hashed_password": password_hash,
+            "full_name": f"Benchmark User {i}",
+            "phone": f"+1555{i:07d}",
+            "role": UserRole.USER,
+            "is_active": rng.random() > 0.02,
+            "created_at": past(),
+        })
+    _bulk(db, User, users)
+
+    services = [{
+        "id": _id(),
+        "title": f"Service {i}",
+        "description": PARAGRAPH,
+        "icon": "book-open",
+        "duration": rng.choice([30, 45, 60, 90, 120]),
+        "price": pricing.to_money(rng.choice([25, 40, 50, 75, 100, 150])),
+        "is_active": True,
+        "created_at": past(),
+    } for i in range(counts["services"])]
+    _bulk(db, Service, services)
+
+    products = [{
+        "id": _id(),
+        "name": f"Product {i}",
+        "description": PARAGRAPH * 3,
+        "price": pricing.to_money(rng.uniform(5, 120)),
+        "image": f"/uploads/images/product-{i}.jpg",
+        "stock_quantity": 1_000_000,
+        "is_active": rng.random() > 0.05,
+        "created_at": past(),
+    } for i in range(counts["products"])]
+    _bulk(db, Product, products)
+
+    articles = []
+    for i in range(counts["articles"]):
+        published = past()
+        articles.append({
+            "id": _id(),
+            "title": f"Benchmark Article {i}",
+            "slug": f"benchmark-article-{i}",
+            "content": PARAGRAPH * rng.randint(20, 80),
+            "excerpt": PARAGRAPH,
+            "category": rng.choice(CATEGORIES),
+            "author": "Benchmark Author",
+            "read_time": rng.randint(2, 15),
+            "is_published": rng.random() > 0.1,
+            "published_at": published,
+            "created_at": published,
+        })
+    _bulk(db, Article, articles)
+
+    _bulk(db, Audio, [{
+        "id": _id(),
+        "title": f"Recitation {i}",
+        "reciter": f"Reciter {i % 12}",
+        "description": PARAGRAPH * 4,
+        "category": rng.choice(CATEGORIES),
+        "duration": rng.randint(120, 3600),
+        "audio_url": f"/uploads/audio/recitation-{i}.mp3",
+        "downloads": rng.randint(0, 5000),
+        "is_published": rng.random() > 0.1,
+        "created_at": past(),
+    } for i in range(counts["audio"])])
+
+    _bulk(db, Podcast, [{
+        "id": _id(),
+        "title": f"Episode {i}",
+        "description": PARAGRAPH * 6,
+        "duration": rng.randint(600, 5400),
+        "audio_url": f"/uploads/podcasts/episode-{i}.mp3",
+        "cover_image": f"/uploads/images/episode-{i}.jpg",
+        "is_published": rng.random() > 0.1,
+        "published_at": past(),
+        "created_at": past(),
+    } for i in range(counts["podcasts"])])
+
+    order_statuses = list(OrderStatus)
+    orders, order_items = [], []
+    for i in range(counts["orders"]):
+        order_id = _id()
+        quote = pricing.price_cart(
+            (product["id"], rng.randint(1, 3), product["price"])
+            for product in rng.sample(products, rng.randint(1, 4))
+        )
+        order_items.extend({
+            "id": _id(),
+            "order_id": order_id,
+            "product_id": line.product_id,
+            "quantity": line.quantity,
+            "price": line.unit_price,
+        } for line in quote.lines)
+        orders.append({
+            "id": order_id,
+            "order_number": f"ORD-BENCH-{i:08d}",
+            "user_id": rng.choice(users)["id"] if rng.random() > 0.5 else None,
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@benchmark.example.com",
+            "customer_phone": "+15550000000",
+            "shipping_address": "1 Benchmark Way",
+            "payment_method": "card",
+            "total_amount": quote.total,
+            "status": rng.choice(order_statuses),
+            "created_at": past(),
+        })
+    _bulk(db, Order, orders)
+    _bulk(db, OrderItem, order_items)
+
+    appointment_statuses = list(AppointmentStatus)
+    # Distinct two-hour blocks (no service is longer) from 180 days back, so
+    # active bookings never overlap
+    first_block = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=180)
+    blocks = rng.sample(range(max(counts["appointments"], 240 * 12)), counts["appointments"])
+    appointments = []
+    for i, block in enumerate(blocks):
+        service = rng.choice(services)
+        starts_at = first_block + timedelta(hours=2 * block)
+        appointments.append({
+            "id": _id(),
+            "user_id": rng.choice(users)["id"],
+            "service_id": service["id"],
+            "appointment_date": starts_at,
+            "ends_at": starts_at + timedelta(minutes=service["duration"]),
+            "status": rng.choice(appointment_statuses),
+            "notes": "Benchmark appointment",
+            "user_name": f"Client {i}",
+            "user_email": f"client{i}@benchmark.example.com",
+            "created_at": past(),
+        })
+    _bulk(db, Appointment, appointments)
+
+    sessions, messages = [], []
+    for i in range(counts["chat_sessions"]):
+        session_id = _id()
+        started = past(90)
+        sessions.append({
+            "id": session_id,
+            "user_name": f"Visitor {i}",
+            "user_email": f"visitor{i}@benchmark.example.com",
+            "status": ChatStatus.ACTIVE if rng.random() > 0.6 else ChatStatus.CLOSED,
+            "start_time": started,
+            "last_activity": started,
+            "created_at": started,
+        })
+        for j in range(counts["messages_per_session"]):
+            messages.append({
+                "id": f"msg_bench_{i}_{j}",
+                "session_id": session_id,
+                "sender": "user" if j % 2 == 0 else "admin",
+                "message": PARAGRAPH,
+                "read": rng.random() > 0.3,
+                "timestamp": started + timedelta(minutes=j),
+            })
+    _bulk(db, ChatSession, sessions)
+    _bulk(db, ChatMessage, messages)
+
+    # Bulk inserts bypass the API write paths, so build the rollups directly
+    rollups.rebuild(db, (now - timedelta(days=400)).date(), now.date())
+
+    db.commit()
+    return counts
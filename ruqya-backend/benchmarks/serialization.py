@@ -0,0 +1,165 @@
+"""Serialization benchmark: one page of each list schema, rendered three ways.
+
+Loads ``--items`` rows per list endpoint from the seeded database, then times
+turning them into a response body with no HTTP and no SQL in the loop:
+
+- ``fastapi``: ``model_validate`` per row into the page model, then FastAPI's
+  own response handling (dump, revalidate against ``response_model``,
+  ``jsonable_encoder``) and the stdlib JSON encoder. This is how the list
+  endpoints used to respond.
+- ``orjson``: the same, rendered by ORJSONResponse, the app's default
+  response class.
+- ``json_response``: ``app.core.responses.json_response``, one TypeAdapter
+  pass from ORM rows to JSON bytes, as the list endpoints respond now.
+
+Exits 1 if the three bodies for a schema do not decode to the same JSON.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.run import BENCHMARK_DIR, configure_environment
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=f"sqlite:///{BENCHMARK_DIR / 'benchmark.db'}",
+                        help="Database to load rows from (default: local SQLite file)")
+    parser.add_argument("--items", type=int, default=100, help="Rows per page")
+    parser.add_argument("--iterations", type=int, default=200, help="Pages rendered per schema and path")
+    parser.add_argument("--schema", action="append", dest="schemas", help="Only these schemas (repeatable)")
+    return parser.parse_args(argv)
+
+
+def cases():
+    """name -> (page schema, item schema, loader(db, limit))"""
+    from sqlalchemy.orm import joinedload
+    
+    from app.models import (
+        Appointment, Article, Audio, ChatMessage, ChatSession, Order, Podcast, Product, Service, User,
+    )
+    from app.schemas.admin import AdminUserListResponse
+    from app.schemas.appointment import AppointmentDetailResponse, AppointmentListResponse
+    from app.schemas.article import ArticleListResponse, ArticleSummaryResponse
+    from app.schemas.audio import AudioListResponse, AudioResponse
+    from app.schemas.chat import (
+        ChatMessageListResponse, ChatMessageResponse, ChatSessionListResponse, ChatSessionWithUnreadResponse,
+    )
+    from app.schemas.order import OrderListResponse, OrderSummaryResponse
+    from app.schemas.podcast import PodcastListResponse, PodcastResponse
+    from app.schemas.product import ProductListResponse, ProductResponse
+    from app.schemas.service import ServiceListResponse, ServiceResponse
+    from app.schemas.user import UserResponse
+    
+    def rows(model, *options):
+        return lambda db, limit: db.query(model).options(*options).limit(limit).all()
+    
+    return {
+        "products": (ProductListResponse, ProductResponse, rows(Product)),
+        "services": (ServiceListResponse, ServiceResponse, rows(Service)),
+        "articles": (ArticleListResponse, ArticleSummaryResponse, rows(Article)),
+        "audio": (AudioListResponse, AudioResponse, rows(Audio)),
+        "podcasts": (PodcastListResponse, PodcastResponse, rows(Podcast)),
+        "orders": (OrderListResponse, OrderSummaryResponse, rows(Order)),
+        "appointments": (AppointmentListResponse, AppointmentDetailResponse,
+                         rows(Appointment, joinedload(Appointment.user), joinedload(Appointment.service))),
+        "users": (AdminUserListResponse, UserResponse, rows(User)),
+        "chat_sessions": (ChatSessionListResponse, ChatSessionWithUnreadResponse, rows(ChatSession)),
+        "chat_messages": (ChatMessageListResponse, ChatMessageResponse, rows(ChatMessage)),
+    }
+
+
+async def render_all(page_schema, item_schema, items, iterations):
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    
+    from app.core.responses import json_response
+    
+    field = create_response_field(name="response", type_=page_schema)
+    
+    async def via_fastapi(response_class):
+        page = page_schema(total=len(items), items=[item_schema.model_validate(item) for item in items])
+        content = await serialize_response(field=field, response_content=page, is_coroutine=True)
+        return response_class(content).body
+    
+    paths = {
+        "fastapi": lambda: via_fastapi(JSONResponse),
+        "orjson": lambda: via_fastapi(ORJSONResponse),
+    }
+    
+    async def fast():
+        return json_response(page_schema, {"total": len(items), "items": items}).body
+    paths["json_response"] = fast
+    
+    timings, bodies = {}, {}
+    for name, render in paths.items():
+        bodies[name] = await render()  # warm up (builds validators, adapters)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            await render()
+            samples.append((time.perf_counter() - started) * 1_000_000)
+        timings[name] = statistics.median(samples)
+    return timings, bodies
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    
+    from app.database import SessionLocal
+    from benchmarks import seed as seeding
+    
+    selected = cases()
+    names = args.schemas or list(selected)
+    unknown = set(names) - set(selected)
+    if unknown:
+        print(f"❌ Unknown schemas: {', '.join(sorted(unknown))}")
+        return 2
+    
+    db = SessionLocal()
+    try:
+        if not seeding.is_seeded(db):
+            print("❌ No benchmark data; run `python -m benchmarks.run` first to seed it")
+            return 2
+        
+        print(f"📦 {args.items}-item pages, median of {args.iterations} renders (µs per page)")
+        print(f"{'schema':16} {'fastapi':>10} {'orjson':>10} {'json_response':>14} {'speedup':>8} {'bytes':>8}")
+        mismatched = []
+        for name in names:
+            page_schema, item_schema, load = selected[name]
+            items = load(db, args.items)
+            if not items:
+                print(f"{name:16} (no rows)")
+                continue
+            # Small tables (services) are repeated to fill the page
+            items = (items * (args.items // len(items) + 1))[:args.items]
+            if name == "chat_sessions":
+                for session in items:
+                    session.unread_count = 0
+            
+            timings, bodies = asyncio.run(render_all(page_schema, item_schema, items, args.iterations))
+            decoded = [json.loads(body) for body in bodies.values()]
+            if any(other != decoded[0] for other in decoded[1:]):
+                mismatched.append(name)
+            print(f"{name:16} {timings['fastapi']:10.0f} {timings['orjson']:10.0f} {timings['json_response']:14.0f} "
+                  f"{timings['fastapi'] / timings['json_response']:7.1f}x {len(bodies['json_response']):8}")
+    finally:
+        db.close()
+    
+    if mismatched:
+        print(f"❌ Bodies differ between paths for: {', '.join(mismatched)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Rebuild analytics rollups from raw tables."""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.database import SessionLocal
+from app.core import rollups
+
+
+def rebuild_rollups(days: int):
+    """Recompute daily_stats for the last ``days`` days."""
+    db = SessionLocal()
+
+    try:
+        end = datetime.utcnow().date()
+        start = end - timedelta(days=days)
+        print(f"📊 Rebuilding rollups from {start} to {end}...")
+        rollups.rebuild(db, start, end)
+        db.commit()
+        print("✅ Rollups rebuilt!")
+
+    except Exception as e:
+        print(f"❌ Error rebuilding rollups: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=3650, help="Number of trailing days to rebuild")
+    rebuild_rollups(parser.parse_args().days)